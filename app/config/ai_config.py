@@ -12,15 +12,102 @@ class AIConfig:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     OPENAI_LLM_MODEL = "gpt-4o"
     OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
 
     # GROQ
     GROQ_API_KEY = os.getenv("GROQ_API_KEY")
     GROQ_LLM_MODEL = "llama-3.1-8b-instant"
+    GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+
+    # LLM GATEWAY
+    LLM_TEMPERATURE = 0.3
+    LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "30"))
+    LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "60"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_BACKOFF_BASE = 0.5
+    LLM_FAILOVER = os.getenv("LLM_FAILOVER", "true").lower() == "true"
+    LLM_HEDGE = os.getenv("LLM_HEDGE", "false").lower() == "true"
+    LLM_HEDGE_MIN_SAMPLES = 20
+    LLM_POOL_SIZE = 20
+
+    # EMBEDDINGS
+    # Any sentence-transformers model name works; these are the ones with
+    # known prompts and sizes. Compare them with test/embedding_report.py.
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+    EMBEDDING_MODELS = {
+        "sentence-transformers/all-MiniLM-L6-v2": {"dim": 384},
+        "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2": {
+            "dim": 384, "multilingual": True,
+        },
+        "sentence-transformers/paraphrase-multilingual-mpnet-base-v2": {
+            "dim": 768, "multilingual": True,
+        },
+        "intfloat/multilingual-e5-small": {
+            "dim": 384, "multilingual": True,
+            "query_prompt": "query: ", "document_prompt": "passage: ",
+        },
+        "intfloat/multilingual-e5-base": {
+            "dim": 768, "multilingual": True,
+            "query_prompt": "query: ", "document_prompt": "passage: ",
+        },
+        "BAAI/bge-m3": {"dim": 1024, "multilingual": True},
+        "Alibaba-NLP/gte-multilingual-base": {
+            "dim": 768, "multilingual": True, "matryoshka": True, "trust_remote_code": True,
+        },
+        "bkai-foundation-models/vietnamese-bi-encoder": {
+            "dim": 768, "multilingual": True, "segmenter": "pyvi",
+        },
+    }
+    # Reduce vectors to EMBEDDING_DIM (0 keeps the model's size), either by
+    # Matryoshka truncation or with a PCA projection saved by the report.
+    EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "0"))
+    EMBEDDING_REDUCTION = os.getenv("EMBEDDING_REDUCTION", "matryoshka").lower()
+    EMBEDDING_PCA_PATH = os.getenv("EMBEDDING_PCA_PATH", "")
 
     # CHUNKING
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
 
+    # DEDUPLICATION
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_THRESHOLD = 0.85
+    DEDUP_NUM_PERM = 64
+    DEDUP_BANDS = 16
+
+    # ADAPTIVE RETRIEVAL (cosine similarity of unit-length embeddings)
+    RETRIEVAL_MIN_K = int(os.getenv("RETRIEVAL_MIN_K", "3"))
+    RETRIEVAL_MAX_K = int(os.getenv("RETRIEVAL_MAX_K", "12"))
+    RETRIEVAL_MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "0.3"))
+    RETRIEVAL_RELATIVE_SCORE = float(os.getenv("RETRIEVAL_RELATIVE_SCORE", "0.8"))
+
+    # PDF TRIAGE (a few sampled pages decide text / scanned / mixed)
+    PDF_TRIAGE_SAMPLE_PAGES = 5
+    PDF_TEXT_MIN_CHARS = 50
+    PDF_SCANNED_IMAGE_COVERAGE = 0.5
+    PDF_OCR_MAX_PAGES = int(os.getenv("PDF_OCR_MAX_PAGES", "50"))
+    PDF_OCR_RESOLUTION = 200
+    UPLOAD_SPOOL_CHUNK_BYTES = 1024 * 1024
+
+    # QUERY EMBEDDING CACHE
+    QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+
+    # CONTEXT PACKING
+    LLM_CONTEXT_WINDOW = int(os.getenv("LLM_CONTEXT_WINDOW", "8192"))
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+    CONTEXT_DEDUP_THRESHOLD = 0.85
+
+    # CONVERSATION MEMORY
+    MEMORY_RECENT_MESSAGES = 4
+    MEMORY_MESSAGE_TOKENS = 200
+    MEMORY_SUMMARY_TOKENS = 300
+    # Messages that must have left the recent window before they are
+    # summarised, in one background call after the answer.
+    MEMORY_FOLD_BATCH = 4
+    MEMORY_FOLD_WORKERS = 4
+    # Vietnamese runs about two tokens per word; the summary prompt asks
+    # for words, since that is the unit the model can count.
+    MEMORY_TOKENS_PER_WORD = 2.0
+
     # PATHS
     BASE_DIR = os.path.dirname(
         os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -28,6 +115,29 @@ class AIConfig:
     DATA_DIR = os.path.join(BASE_DIR, "data")
     VECTOR_STORE_DIR = os.path.join(DATA_DIR, "vector_store")
     UPLOAD_DIR = os.path.join(DATA_DIR, "uploads")
+    CHUNK_STORE_DIR = os.path.join(DATA_DIR, "chunk_store")
+    SPILL_DIR = os.path.join(DATA_DIR, "spill")
+    PROFILE_DIR = os.path.join(DATA_DIR, "profiles")
+    SNAPSHOT_DIR = os.path.join(DATA_DIR, "snapshots")
+
+    # CHUNK STORE
+    CHUNK_STORE_COMPRESSION = 6
+    CHUNK_STORE_CACHE_CHARS = 8 * 1024 * 1024
+    # Unreferenced blobs are kept this long after their last write or reuse,
+    # so an ingestion in progress never loses the blob it just stored.
+    CHUNK_STORE_SWEEP_GRACE_SECONDS = int(os.getenv("CHUNK_STORE_SWEEP_GRACE_SECONDS", "3600"))
+
+    # SESSION MEMORY
+    MAX_SESSION_MB = int(os.getenv("MAX_SESSION_MB", "512"))
+    MAX_TOTAL_MB = int(os.getenv("MAX_TOTAL_MB", "4096"))
+    SESSION_IDLE_SECONDS = int(os.getenv("SESSION_IDLE_SECONDS", "900"))
+
+    # OBSERVABILITY
+    TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH") or None
+    PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "false").lower() == "true"
+    PROFILE_TOP_FUNCTIONS = 40
+    PROFILE_TOP_ALLOCATIONS = 25
+    PROFILE_SAMPLE_INTERVAL = 0.005
 
     @classmethod
     def validate(cls):
@@ -39,3 +149,4 @@ class AIConfig:
 
         os.makedirs(cls.VECTOR_STORE_DIR, exist_ok=True)
         os.makedirs(cls.UPLOAD_DIR, exist_ok=True)
+        os.makedirs(cls.CHUNK_STORE_DIR, exist_ok=True)
@@ -9,6 +9,7 @@ class AppConfig:
     
     ALLOWED_FILE_TYPES = ["pdf", "png", "jpg", "jpeg"]
     MAX_FILE_SIZE_MB = 10
+    MAX_PDF_PAGES = 500
     
     DEFAULT_MAX_TOKENS = 800
     MIN_MAX_TOKENS = 100
@@ -18,10 +19,18 @@ class AppConfig:
     CHUNK_SIZE = 500
     CHUNK_OVERLAP = 50
     
+    CHAT_PAGE_SIZE = 20
+
     CHAT_MESSAGE_MAX_WIDTH = "70%"
     USER_MESSAGE_BG_COLOR = "#007bff"
     ASSISTANT_MESSAGE_BG_COLOR = "#f1f3f4"
     
+    EXAMPLE_QUESTIONS = [
+        "What are the main policies mentioned in the document?",
+        "Summarize the key points from section 3",
+        "What are the requirements for employee onboarding?",
+    ]
+
     TIMESTAMP_FORMAT = "%H:%M"
     UPLOAD_TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
 
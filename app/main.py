@@ -1,4 +1,4 @@
-from app.services import SessionService
+from app.services import EmbeddingService, SessionService
 from app.ui import (
     apply_custom_styles,
     render_sidebar,
@@ -9,6 +9,7 @@ from app.ui import (
 
 def main():
     SessionService.initialize()
+    EmbeddingService.warm_up()
     
     apply_custom_styles()
     
@@ -1,10 +1,26 @@
+"""
+Service layer. Classes are resolved lazily on first attribute access so that
+importing the package (and therefore the Streamlit entry point) does not pull
+in torch, langchain backends, pdfplumber or pytesseract before they are used.
+"""
+from importlib import import_module
 
-from .session_service import SessionService
-from .file_service import FileService
-from .vector_store_service import VectorStoreService
-from .embedding_service import EmbeddingService
-from .text_splitter_service import TextSplitterService
-from .rag_service import RAGService
+_LAZY_EXPORTS = {
+    "SessionService": ".session_service",
+    "FileService": ".file_service",
+    "VectorStoreService": ".vector_store_service",
+    "EmbeddingService": ".embedding_service",
+    "TextSplitterService": ".text_splitter_service",
+    "RAGService": ".rag_service",
+    "ContextService": ".context_service",
+    "MemoryService": ".memory_service",
+    "LLMGateway": ".llm_gateway",
+    "DedupService": ".dedup_service",
+    "ChunkStore": ".chunk_store",
+    "IngestionService": ".ingestion_service",
+    "SnapshotService": ".snapshot_service",
+    "UploadService": ".upload_service",
+}
 
 __all__ = [
     "SessionService",
@@ -13,4 +29,26 @@ __all__ = [
     "EmbeddingService",
     "TextSplitterService",
     "RAGService",
+    "ContextService",
+    "MemoryService",
+    "LLMGateway",
+    "DedupService",
+    "ChunkStore",
+    "IngestionService",
+    "SnapshotService",
+    "UploadService",
 ]
+
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
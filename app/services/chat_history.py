@@ -0,0 +1,76 @@
+import threading
+from typing import Iterator, List, NamedTuple
+
+
+class ChatMessage(NamedTuple):
+    role: str
+    content: str
+    timestamp: str = ""
+
+
+class ChatHistory:
+    """
+    Append-only chat log stored column-wise: one byte per role plus two
+    string lists, instead of a dict per message. Messages are materialised
+    as lightweight ChatMessage tuples only for the slice being rendered.
+    """
+
+    ROLES = ("user", "assistant")
+
+    __slots__ = ("_roles", "_contents", "_timestamps")
+
+    def __init__(self):
+        self._roles = bytearray()
+        self._contents: List[str] = []
+        self._timestamps: List[str] = []
+
+    def append(self, role: str, content: str, timestamp: str = ""):
+        self._roles.append(self.ROLES.index(role))
+        self._contents.append(content)
+        self._timestamps.append(timestamp)
+
+    def tail(self, count: int) -> List[ChatMessage]:
+        return self.window(max(0, len(self) - count), len(self))
+
+    def window(self, start: int, stop: int) -> List[ChatMessage]:
+        return [self[i] for i in range(start, min(stop, len(self)))]
+
+    def __getitem__(self, index: int) -> ChatMessage:
+        if index < 0:
+            index += len(self)
+        return ChatMessage(
+            self.ROLES[self._roles[index]],
+            self._contents[index],
+            self._timestamps[index],
+        )
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the message texts."""
+        return sum(len(c) for c in self._contents) * 2 + len(self) * 120
+
+    def __len__(self) -> int:
+        return len(self._contents)
+
+    def __bool__(self) -> bool:
+        return bool(self._contents)
+
+    def __iter__(self) -> Iterator[ChatMessage]:
+        for i in range(len(self)):
+            yield self[i]
+
+
+class ConversationMemory:
+    """
+    Rolling summary of the messages before `summarized_until`. Folds run in
+    a background thread that only touches this object, never
+    session_state, so every access goes through `lock`.
+    """
+
+    __slots__ = ("summary", "summarized_until", "folding", "lock")
+
+    def __init__(self):
+        self.summary = ""
+        self.summarized_until = 0
+        self.folding = False
+        self.lock = threading.Lock()
@@ -0,0 +1,200 @@
+import hashlib
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Collection, Dict, Optional
+
+from app.config.ai_config import AIConfig
+from app.utils.logger import logger
+
+
+_BLOB_ID_RE = re.compile(r"[0-9a-f]{64}")
+
+
+class ChunkStore:
+    """
+    Compact, process-wide text store.
+
+    Each extracted document is written once as a zlib-compressed blob under
+    CHUNK_STORE_DIR, named by the SHA-256 of its text (identical uploads in
+    different sessions share one blob). Chunks are referenced by
+    (blob_id, start_index, length) in their metadata instead of carrying their
+    own copy of the text, and are resolved on demand through a small LRU of
+    decompressed blobs.
+
+    Blobs no live session refers to are deleted by `sweep` once they have
+    not been written or reused for CHUNK_STORE_SWEEP_GRACE_SECONDS.
+    """
+
+    _lock = threading.Lock()
+    _files_lock = threading.Lock()
+    _cache: "OrderedDict[str, str]" = OrderedDict()
+    _cache_chars = 0
+
+    # ---------- PUBLIC ----------
+    @classmethod
+    def put(cls, text: str) -> str:
+        blob_id = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        path = cls._path(blob_id)
+
+        if not cls._reuse(path):
+            os.makedirs(AIConfig.CHUNK_STORE_DIR, exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(zlib.compress(text.encode("utf-8"), AIConfig.CHUNK_STORE_COMPRESSION))
+            os.replace(tmp_path, path)
+            logger.info(f"Stored blob {blob_id[:12]} ({len(text):,} chars)")
+
+        cls._remember(blob_id, text)
+        return blob_id
+
+    @classmethod
+    def get(cls, blob_id: str) -> str:
+        with cls._lock:
+            text = cls._cache.get(blob_id)
+            if text is not None:
+                cls._cache.move_to_end(blob_id)
+                return text
+
+        with open(cls._path(blob_id), "rb") as f:
+            text = zlib.decompress(f.read()).decode("utf-8")
+        cls._remember(blob_id, text)
+        return text
+
+    @classmethod
+    def read_compressed(cls, blob_id: str) -> bytes:
+        """The blob exactly as stored on disk, for snapshots."""
+        with open(cls._path(blob_id), "rb") as f:
+            return f.read()
+
+    @classmethod
+    def put_compressed(cls, blob_id: str, data) -> None:
+        """
+        Install a blob taken from `read_compressed` without recompressing it.
+        The data must hash to `blob_id`: blobs are shared by every session,
+        so a mislabelled one would replace other documents' text.
+        """
+        if not cls.is_blob_id(blob_id):
+            raise ValueError(f"Invalid blob id: {blob_id!r}")
+        if cls._content_hash(data) != blob_id:
+            raise ValueError(f"Blob content does not match its id {blob_id[:12]}")
+
+        path = cls._path(blob_id)
+        if cls._reuse(path):
+            return
+        os.makedirs(AIConfig.CHUNK_STORE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def sweep(cls, live: Collection[str]) -> int:
+        """Delete blobs not in `live` and past the grace period; returns how many."""
+        if not os.path.isdir(AIConfig.CHUNK_STORE_DIR):
+            return 0
+
+        cutoff = time.time() - AIConfig.CHUNK_STORE_SWEEP_GRACE_SECONDS
+        deleted = 0
+        for name in os.listdir(AIConfig.CHUNK_STORE_DIR):
+            blob_id, extension = os.path.splitext(name)
+            if extension != ".z" or blob_id in live:
+                continue
+            path = cls._path(blob_id)
+            with cls._files_lock:
+                try:
+                    if os.path.getmtime(path) > cutoff:
+                        continue
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+            cls._forget(blob_id)
+            deleted += 1
+
+        if deleted:
+            logger.info(f"Deleted {deleted} unreferenced blob(s)")
+        return deleted
+
+    @staticmethod
+    def is_blob_id(value) -> bool:
+        return isinstance(value, str) and _BLOB_ID_RE.fullmatch(value) is not None
+
+    @staticmethod
+    def is_reference(metadata: Optional[Dict]) -> bool:
+        return bool(
+            metadata
+            and metadata.get("blob_id")
+            and metadata.get("start_index", -1) >= 0
+            and metadata.get("length")
+        )
+
+    @classmethod
+    def resolve(cls, docs):
+        """
+        Copies of `docs` with the text of referenced chunks filled in.
+        The originals belong to the FAISS docstore and must stay text-free.
+        """
+        resolved = []
+        for doc in docs:
+            if doc.page_content or not cls.is_reference(doc.metadata):
+                resolved.append(doc)
+                continue
+            meta = doc.metadata
+            text = cls.get(meta["blob_id"])
+            resolved.append(type(doc)(
+                page_content=text[meta["start_index"]:meta["start_index"] + meta["length"]],
+                metadata=meta,
+            ))
+        return resolved
+
+    # ---------- INTERNAL ----------
+    @staticmethod
+    def _content_hash(data) -> str:
+        """sha256 of the decompressed blob, inflated in bounded pieces."""
+        digest = hashlib.sha256()
+        decompressor = zlib.decompressobj()
+        pending = bytes(data)
+        while pending:
+            digest.update(decompressor.decompress(pending, 1024 * 1024))
+            pending = decompressor.unconsumed_tail
+        if not decompressor.eof:
+            raise ValueError("Truncated blob")
+        digest.update(decompressor.flush())
+        return digest.hexdigest()
+
+    @staticmethod
+    def _path(blob_id: str) -> str:
+        return os.path.join(AIConfig.CHUNK_STORE_DIR, f"{blob_id}.z")
+
+    @classmethod
+    def _reuse(cls, path: str) -> bool:
+        """Refresh an existing blob's mtime so `sweep` keeps it; False if missing."""
+        with cls._files_lock:
+            try:
+                os.utime(path)
+                return True
+            except FileNotFoundError:
+                return False
+
+    @classmethod
+    def _forget(cls, blob_id: str):
+        with cls._lock:
+            text = cls._cache.pop(blob_id, None)
+            if text is not None:
+                cls._cache_chars -= len(text)
+
+    @classmethod
+    def _remember(cls, blob_id: str, text: str):
+        with cls._lock:
+            if blob_id in cls._cache:
+                cls._cache.move_to_end(blob_id)
+                return
+            cls._cache[blob_id] = text
+            cls._cache_chars += len(text)
+
+            while cls._cache_chars > AIConfig.CHUNK_STORE_CACHE_CHARS and len(cls._cache) > 1:
+                _, evicted = cls._cache.popitem(last=False)
+                cls._cache_chars -= len(evicted)
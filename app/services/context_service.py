@@ -0,0 +1,141 @@
+from typing import Any, Dict, List, Tuple
+
+from app.config.ai_config import AIConfig
+from app.utils.text import shingles
+from app.utils.tokenizer import count_tokens, truncate_to_tokens
+
+# Chunks from the same document whose spans are at most this many characters
+# apart are treated as adjacent (the splitter strips the whitespace between).
+_ADJACENCY_GAP = 2
+
+# Don't bother appending a truncated passage shorter than this.
+_MIN_PARTIAL_TOKENS = 64
+
+_SEPARATOR = "\n\n"
+
+
+class ContextService:
+    """
+    Context Assembler
+    Pack retrieved chunks into a token-bounded prompt context
+    """
+
+    @classmethod
+    def assemble(cls, docs, budget_tokens: int) -> Tuple[str, Dict[str, Any]]:
+        """
+        Merge overlapping/adjacent chunks of the same document, drop
+        near-duplicates and fill `budget_tokens` in relevance order.
+        `docs` must be ordered best match first.
+        """
+        passages = cls._merge_spans(docs)
+        passages, duplicates = cls._drop_near_duplicates(passages)
+
+        parts, used = [], 0
+        separator_tokens = count_tokens(_SEPARATOR)
+
+        for passage in passages:
+            cost = count_tokens(passage) + (separator_tokens if parts else 0)
+            if used + cost <= budget_tokens:
+                parts.append(passage)
+                used += cost
+                continue
+
+            remaining = budget_tokens - used - (separator_tokens if parts else 0)
+            if remaining >= _MIN_PARTIAL_TOKENS:
+                parts.append(truncate_to_tokens(passage, remaining))
+                used += remaining
+            break
+
+        context = _SEPARATOR.join(parts)
+        # Token counts are not additive: BPE merges across the joins, and a
+        # truncation can split a multi-byte character. Trim the tail to fit.
+        while parts and count_tokens(context) > budget_tokens:
+            last = parts.pop()
+            last_tokens = count_tokens(last)
+            keep = last_tokens - (count_tokens(context) - budget_tokens)
+            if keep >= _MIN_PARTIAL_TOKENS:
+                trimmed = truncate_to_tokens(last, keep)
+                if count_tokens(trimmed) < last_tokens:
+                    parts.append(trimmed)
+            context = _SEPARATOR.join(parts)
+
+        return context, {
+            "context_tokens": count_tokens(context),
+            "context_budget_tokens": budget_tokens,
+            "context_passages": len(parts),
+            "merged_passages": len(passages) + duplicates,
+            "dropped_duplicates": duplicates,
+        }
+
+    @staticmethod
+    def budget_for(prompt_overhead_tokens: int, max_output_tokens: int) -> int:
+        """Context budget that still fits the model window after the answer."""
+        available = (
+            AIConfig.LLM_CONTEXT_WINDOW - prompt_overhead_tokens - max_output_tokens
+        )
+        return max(0, min(AIConfig.CONTEXT_TOKEN_BUDGET, available))
+
+    # ---------- INTERNAL ----------
+    @staticmethod
+    def _merge_spans(docs) -> List[str]:
+        """
+        Stitch chunks that overlap or touch within the same document into one
+        passage. A merged passage keeps the best rank of its members.
+        """
+        spans = {}
+        standalone = []
+
+        for rank, doc in enumerate(docs):
+            meta = getattr(doc, "metadata", None) or {}
+            doc_id, start = meta.get("doc_id"), meta.get("start_index")
+            text = doc.page_content
+
+            if doc_id is None or start is None or start < 0:
+                standalone.append((rank, text))
+                continue
+            # Offsets are relative to the blob the chunk was cut from; a
+            # re-ingested document mixes blobs of several versions.
+            key = (doc_id, meta.get("blob_id"))
+            spans.setdefault(key, []).append([start, start + len(text), rank, text])
+
+        merged = list(standalone)
+        for doc_spans in spans.values():
+            doc_spans.sort()
+            current = doc_spans[0]
+
+            for span in doc_spans[1:]:
+                start, end, rank, text = span
+                if start > current[1] + _ADJACENCY_GAP:
+                    merged.append((current[2], current[3]))
+                    current = span
+                    continue
+
+                if end > current[1]:
+                    if start >= current[1]:
+                        current[3] += "\n" + text
+                    else:
+                        current[3] += text[current[1] - start:]
+                    current[1] = end
+                current[2] = min(current[2], rank)
+
+            merged.append((current[2], current[3]))
+
+        merged.sort(key=lambda item: item[0])
+        return [text for _, text in merged]
+
+    @staticmethod
+    def _drop_near_duplicates(passages: List[str]) -> Tuple[List[str], int]:
+        kept, kept_shingles = [], []
+
+        for passage in passages:
+            passage_shingles = shingles(passage)
+            is_duplicate = any(
+                len(passage_shingles & other) / max(1, len(passage_shingles | other))
+                >= AIConfig.CONTEXT_DEDUP_THRESHOLD
+                for other in kept_shingles
+            )
+            if not is_duplicate:
+                kept.append(passage)
+                kept_shingles.append(passage_shingles)
+
+        return kept, len(passages) - len(kept)
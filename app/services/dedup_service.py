@@ -0,0 +1,231 @@
+import hashlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.config.ai_config import AIConfig
+from app.services.session_service import SessionService
+from app.utils.logger import logger
+from app.utils.text import shingles
+from app.utils.tracing import tracer
+
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+ChunkRef = Tuple[int, int]  # (doc_id, chunk_index)
+
+
+class DedupIndex:
+    """
+    MinHash LSH index over every chunk kept in the session so far.
+    Signatures are split into bands; two chunks sharing any band become
+    candidates and are confirmed by their estimated Jaccard similarity.
+
+    Dropped chunks are remembered as copies of the chunk they matched
+    (`duplicates`), with their own chunk metadata (`copies`), so that a
+    copy can stand in for its kept chunk in scoped searches and take its
+    place once the kept chunk is removed.
+    """
+
+    def __init__(self, num_perm: int, bands: int):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.signatures: Dict[ChunkRef, tuple] = {}
+        self.buckets: Dict[tuple, List[ChunkRef]] = {}
+        self.duplicates: Dict[ChunkRef, List[ChunkRef]] = {}
+        self.copies: Dict[ChunkRef, Dict] = {}
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory: signature tuples plus one bucket entry per band."""
+        return (
+            len(self.signatures) * (self.num_perm * 36 + self.bands * 120)
+            + len(self.copies) * 512
+        )
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield (band,) + tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def query(self, signature, threshold: float) -> Optional[ChunkRef]:
+        seen = set()
+        for key in self._band_keys(signature):
+            for ref in self.buckets.get(key, ()):
+                if ref in seen:
+                    continue
+                seen.add(ref)
+                other = self.signatures[ref]
+                matches = sum(a == b for a, b in zip(signature, other))
+                if matches / self.num_perm >= threshold:
+                    return ref
+        return None
+
+    def add(self, ref: ChunkRef, signature):
+        self.signatures[ref] = signature
+        for key in self._band_keys(signature):
+            self.buckets.setdefault(key, []).append(ref)
+
+    def add_duplicate(self, kept: ChunkRef, duplicate: ChunkRef, metadata: Dict):
+        self.duplicates.setdefault(kept, []).append(duplicate)
+        self.copies[duplicate] = metadata
+
+    def copies_for(self, doc_ids: Iterable[int]) -> Dict[int, Dict[int, Dict]]:
+        """
+        Chunks of other documents that `doc_ids` hold copies of, as
+        {kept doc_id: {kept chunk_index: metadata of one copy}}.
+        """
+        doc_ids = set(doc_ids)
+        found: Dict[int, Dict[int, Dict]] = {}
+        for kept, refs in self.duplicates.items():
+            if kept[0] in doc_ids:
+                continue
+            for ref in refs:
+                if ref[0] in doc_ids:
+                    found.setdefault(kept[0], {}).setdefault(kept[1], self.copies[ref])
+                    break
+        return found
+
+    def remove_document(self, doc_id: int) -> Dict[str, Any]:
+        return self._remove(lambda ref: ref[0] == doc_id)
+
+    def remove_chunks(self, doc_id: int, chunk_indexes) -> Dict[str, Any]:
+        chunk_indexes = set(chunk_indexes)
+        return self._remove(lambda ref: ref[0] == doc_id and ref[1] in chunk_indexes)
+
+    def restore(self, removed: Dict[str, Any]):
+        """Put back entries returned by `remove_document` / `remove_chunks`."""
+        for ref, signature in removed["signatures"].items():
+            self.add(ref, signature)
+        for kept, refs in removed["duplicates"].items():
+            self.duplicates.setdefault(kept, []).extend(refs)
+        self.copies.update(removed["copies"])
+
+    def _remove(self, matches) -> Dict[str, Any]:
+        """
+        Drop every entry `matches` selects. Returns what was removed, for
+        `restore`, including `orphans`: metadata of surviving copies whose
+        kept chunk is gone. They are no longer in the index and must be
+        filtered again to be searchable.
+        """
+        removed = {"signatures": {}, "duplicates": {}, "copies": {}, "orphans": []}
+
+        for ref in [ref for ref in self.signatures if matches(ref)]:
+            signature = self.signatures.pop(ref)
+            removed["signatures"][ref] = signature
+            for key in self._band_keys(signature):
+                bucket = self.buckets.get(key)
+                if bucket and ref in bucket:
+                    bucket.remove(ref)
+                    if not bucket:
+                        del self.buckets[key]
+            if ref in self.duplicates:
+                refs = removed["duplicates"][ref] = self.duplicates.pop(ref)
+                for copy in refs:
+                    if not matches(copy):
+                        removed["orphans"].append(self.copies[copy])
+
+        for kept, refs in list(self.duplicates.items()):
+            gone = [ref for ref in refs if matches(ref)]
+            if not gone:
+                continue
+            removed["duplicates"].setdefault(kept, []).extend(gone)
+            refs[:] = [ref for ref in refs if not matches(ref)]
+            if not refs:
+                del self.duplicates[kept]
+
+        orphaned = {(m["doc_id"], m["chunk_index"]) for m in removed["orphans"]}
+        for ref in [ref for ref in self.copies if matches(ref) or ref in orphaned]:
+            removed["copies"][ref] = self.copies.pop(ref)
+
+        return removed
+
+
+class DedupService:
+    """
+    Near-duplicate chunk filter
+    Drop boilerplate repeated within and across documents before embedding
+    """
+
+    _permutations = None
+
+    @classmethod
+    def filter(
+        cls,
+        chunks: List[str],
+        metadatas: List[Dict],
+    ) -> Tuple[List[str], List[Dict], List[Dict]]:
+        """
+        Return (kept chunks, kept metadatas, dropped provenance records).
+        Metadatas must carry `doc_id` and `chunk_index`. Every dropped chunk
+        is recorded in the session's DedupIndex as a copy of the chunk it
+        matched, together with its metadata.
+        """
+        if not AIConfig.DEDUP_ENABLED:
+            return chunks, metadatas, []
+
+        index = SessionService.get_dedup_index()
+        if index is None:
+            index = DedupIndex(AIConfig.DEDUP_NUM_PERM, AIConfig.DEDUP_BANDS)
+            SessionService.set_dedup_index(index)
+
+        kept_chunks, kept_metadatas, dropped = [], [], []
+
+        with tracer.span("dedup", chunks=len(chunks)) as span:
+            for chunk, metadata in zip(chunks, metadatas):
+                ref = (metadata["doc_id"], metadata["chunk_index"])
+                signature = cls._signature(chunk)
+                match = index.query(signature, AIConfig.DEDUP_THRESHOLD)
+
+                if match is None:
+                    index.add(ref, signature)
+                    kept_chunks.append(chunk)
+                    kept_metadatas.append(metadata)
+                    continue
+
+                index.add_duplicate(match, ref, metadata)
+                dropped.append({
+                    "doc_id": ref[0],
+                    "chunk_index": ref[1],
+                    "duplicate_of": {"doc_id": match[0], "chunk_index": match[1]},
+                })
+
+            span.set(dropped=len(dropped))
+
+        if dropped:
+            logger.info(f"Dropped {len(dropped)}/{len(chunks)} near-duplicate chunks")
+
+        return kept_chunks, kept_metadatas, dropped
+
+    @classmethod
+    def copies_for(cls, doc_ids: Iterable[int]) -> Dict[int, Dict[int, Dict]]:
+        """Chunks of other documents that `doc_ids` hold dropped copies of."""
+        index = SessionService.get_dedup_index()
+        if index is None:
+            return {}
+        return index.copies_for(doc_ids)
+
+    # ---------- INTERNAL ----------
+    @classmethod
+    def _signature(cls, text: str) -> tuple:
+        import numpy as np
+
+        if cls._permutations is None:
+            rng = np.random.RandomState(1)
+            cls._permutations = (
+                rng.randint(1, _MERSENNE_PRIME, size=AIConfig.DEDUP_NUM_PERM, dtype=np.uint64),
+                rng.randint(0, _MERSENNE_PRIME, size=AIConfig.DEDUP_NUM_PERM, dtype=np.uint64),
+            )
+        a, b = cls._permutations
+
+        hashes = np.fromiter(
+            (
+                int.from_bytes(
+                    hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little"
+                )
+                for s in shingles(text)
+            ),
+            dtype=np.uint64,
+        )
+        # Universal hashing (a*x + b) mod p, one row per permutation.
+        permuted = (np.outer(a, hashes) + b[:, None]) % _MERSENNE_PRIME
+        return tuple((permuted & _MAX_HASH).min(axis=1).tolist())
@@ -0,0 +1,142 @@
+import heapq
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.chunk_store import ChunkStore
+from app.services.embedding_service import EmbeddingService
+
+
+# Rough per-chunk cost of a docstore entry (Document object + metadata dict).
+_DOCSTORE_ENTRY_BYTES = 512
+
+
+class DocumentIndex:
+    """
+    One FAISS sub-index per uploaded document.
+
+    A search embeds the query once and scores it only against the
+    sub-indexes of the requested documents, so scoping a question to a few
+    files costs time proportional to those files. Results from several
+    sub-indexes are merged by distance (all share one embedding model).
+
+    Chunks that deduplication dropped from a requested document are only
+    indexed in the document that kept them; `copies` (see
+    DedupIndex.copies_for) names those so they can be searched too.
+    """
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.stores: Dict[int, object] = {}
+
+    # ---------- Documents ----------
+    def add_document(self, doc_id: int, store):
+        self.stores[doc_id] = store
+
+    def remove_document(self, doc_id: int):
+        self.stores.pop(doc_id, None)
+
+    def document_ids(self) -> List[int]:
+        return list(self.stores)
+
+    def __len__(self) -> int:
+        return len(self.stores)
+
+    @property
+    def nbytes(self) -> int:
+        total = 0
+        for store in self.stores.values():
+            index = store.index
+            total += index.ntotal * index.d * 4
+            total += len(store.index_to_docstore_id) * _DOCSTORE_ENTRY_BYTES
+        return total
+
+    # ---------- Search ----------
+    def search_by_vector(
+        self,
+        vector: List[float],
+        k: int,
+        doc_ids: Optional[Iterable[int]] = None,
+        copies: Optional[Dict[int, Dict[int, Dict]]] = None,
+    ) -> List[Tuple[object, float]]:
+        """
+        (Document, distance) pairs, closest first. A hit on a chunk listed
+        in `copies` is returned with the metadata of the copy, i.e. as a
+        chunk of the requested document.
+        """
+        selected = self.stores if doc_ids is None else {
+            doc_id: self.stores[doc_id] for doc_id in doc_ids if doc_id in self.stores
+        }
+
+        results = []
+        for store in selected.values():
+            results.extend(store.similarity_search_with_score_by_vector(vector, k))
+
+        for doc_id, chunks in (copies or {}).items():
+            store = self.stores.get(doc_id)
+            if store is None:
+                continue
+            hits = store.similarity_search_with_score_by_vector(
+                vector,
+                min(k, len(chunks)),
+                filter=lambda metadata: metadata.get("chunk_index") in chunks,
+                fetch_k=store.index.ntotal,
+            )
+            for doc, distance in hits:
+                metadata = chunks[doc.metadata["chunk_index"]]
+                # A near-duplicate, not necessarily the same text: resolve
+                # the copy's own span when it has one.
+                text = "" if ChunkStore.is_reference(metadata) else doc.page_content
+                results.append((type(doc)(page_content=text, metadata=metadata), distance))
+
+        return heapq.nsmallest(k, results, key=lambda pair: pair[1])
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        doc_ids: Optional[Iterable[int]] = None,
+        copies: Optional[Dict[int, Dict[int, Dict]]] = None,
+    ):
+        vector = EmbeddingService.embed_query(query, self.embeddings)
+        return self.search_by_vector(vector, k, doc_ids, copies)
+
+    def search_with_similarity(
+        self,
+        query: str,
+        k: int,
+        doc_ids: Optional[Iterable[int]] = None,
+        copies: Optional[Dict[int, Dict[int, Dict]]] = None,
+    ) -> List[Tuple[object, float]]:
+        """
+        (Document, cosine similarity) pairs, best first. Assumes unit-length
+        embeddings, for which FAISS's squared L2 distance d = 2 - 2*cos.
+        """
+        return [
+            (doc, 1.0 - float(distance) / 2.0)
+            for doc, distance in self.search(query, k, doc_ids, copies)
+        ]
+
+    # ---------- Persistence ----------
+    def save_local(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        for doc_id, store in self.stores.items():
+            store.save_local(os.path.join(path, str(doc_id)))
+        with open(os.path.join(path, "documents.json"), "w", encoding="utf-8") as f:
+            json.dump(list(self.stores), f)
+
+    @classmethod
+    def load_local(cls, path: str, embeddings) -> "DocumentIndex":
+        from langchain_community.vectorstores import FAISS
+
+        with open(os.path.join(path, "documents.json"), encoding="utf-8") as f:
+            doc_ids = json.load(f)
+
+        index = cls(embeddings)
+        for doc_id in doc_ids:
+            index.add_document(doc_id, FAISS.load_local(
+                os.path.join(path, str(doc_id)),
+                embeddings,
+                allow_dangerous_deserialization=True,  # written by save_local above
+            ))
+        return index
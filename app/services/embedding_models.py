@@ -0,0 +1,121 @@
+"""
+Model-specific embedding behaviour on top of a LangChain `Embeddings`:
+query/passage prompts, Vietnamese word segmentation and dimension
+reduction (Matryoshka truncation or a PCA projection fitted on a corpus).
+"""
+import hashlib
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class MatryoshkaReducer:
+    """Keep the leading `dim` components. Only sound for Matryoshka-trained models."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.name = f"mrl{dim}"
+
+    def __call__(self, vectors: np.ndarray) -> np.ndarray:
+        return _normalize(vectors[:, :self.dim])
+
+
+class PCAReducer:
+    """Project onto the top `dim` principal components of a corpus."""
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray, model: str):
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)
+        self.model = model
+        self.dim = len(components)
+        digest = hashlib.sha256(self.components.tobytes()).hexdigest()[:8]
+        self.name = f"pca{self.dim}-{digest}"
+
+    @classmethod
+    def fit(cls, vectors, dim: int, model: str) -> "PCAReducer":
+        vectors = np.asarray(vectors, dtype=np.float64)
+        if dim > min(vectors.shape):
+            raise ValueError(
+                f"PCA to {dim} dims needs at least {dim} corpus vectors, got {len(vectors)}"
+            )
+        mean = vectors.mean(axis=0)
+        _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+        return cls(mean, vt[:dim], model)
+
+    @classmethod
+    def load(cls, path: str) -> "PCAReducer":
+        with np.load(path) as data:
+            return cls(data["mean"], data["components"], str(data["model"]))
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            np.savez(f, mean=self.mean, components=self.components, model=self.model)
+
+    def __call__(self, vectors: np.ndarray) -> np.ndarray:
+        return _normalize((vectors - self.mean) @ self.components.T)
+
+
+class ConfiguredEmbeddings(Embeddings):
+    """
+    Wraps a base model with the prompts and input preparation it was
+    trained with, and an optional reducer applied to every vector.
+    `model_name` includes the reducer so that query caches and snapshots
+    never mix full-size and reduced vectors.
+    """
+
+    def __init__(
+        self,
+        base: Embeddings,
+        profile: Optional[Dict] = None,
+        reducer=None,
+    ):
+        profile = profile or {}
+        self.base = base
+        self.query_prompt = profile.get("query_prompt", "")
+        self.document_prompt = profile.get("document_prompt", "")
+        self.segmenter = _segmenter(profile.get("segmenter"))
+        self.reducer = reducer
+
+    @property
+    def model_name(self) -> str:
+        name = getattr(self.base, "model_name", None) or type(self.base).__name__
+        return f"{name}+{self.reducer.name}" if self.reducer else name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, self.document_prompt)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text], self.query_prompt)[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Batch form of embed_query."""
+        return self._embed(texts, self.query_prompt)
+
+    def _embed(self, texts: List[str], prompt: str) -> List[List[float]]:
+        if not texts:
+            return []
+        texts = [prompt + self.segmenter(text) for text in texts]
+        vectors = self.base.embed_documents(texts)
+        if self.reducer is None:
+            return vectors
+        return self.reducer(np.asarray(vectors, dtype=np.float32)).tolist()
+
+
+def _segmenter(name: Optional[str]):
+    if not name:
+        return lambda text: text
+    if name == "pyvi":
+        try:
+            from pyvi import ViTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "This embedding model expects word-segmented Vietnamese: pip install pyvi"
+            ) from e
+        return ViTokenizer.tokenize
+    raise ValueError(f"Unknown segmenter: {name}")
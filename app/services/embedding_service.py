@@ -1,24 +1,220 @@
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_openai import OpenAIEmbeddings
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+
 from app.config.ai_config import AIConfig
+from app.config.app_config import AppConfig
+from app.utils.logger import logger
+from app.utils.tracing import tracer
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
 
 
 class EmbeddingService:
     _embedding = None
+    _lock = threading.Lock()
+    _warm_up_lock = threading.Lock()
+    _warm_up_thread = None
+
+    # Process-wide LRU of normalised query text -> vector, for one model.
+    _query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+    _query_cache_model = None
+    _query_cache_lock = threading.Lock()
+    _query_cache_hits = 0
+    _query_cache_misses = 0
 
     @classmethod
     def get_openai_embedding(cls):
-        if cls._embedding is None:
-            cls._embedding = OpenAIEmbeddings(
-                api_key=AIConfig.OPENAI_API_KEY,
-                model=AIConfig.OPENAI_EMBEDDING_MODEL
-            )
+        with cls._lock:
+            if cls._embedding is None:
+                from langchain_openai import OpenAIEmbeddings
+
+                cls._embedding = OpenAIEmbeddings(
+                    api_key=AIConfig.OPENAI_API_KEY,
+                    model=AIConfig.OPENAI_EMBEDDING_MODEL
+                )
         return cls._embedding
     
     @classmethod
     def get_huggingface_embedding(cls):
-        if cls._embedding is None:
-            cls._embedding = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2"
+        with cls._lock:
+            if cls._embedding is None:
+                from langchain_huggingface import HuggingFaceEmbeddings
+
+                model_name = AIConfig.EMBEDDING_MODEL
+                profile = cls.model_profile(model_name)
+                # Unit-length vectors make FAISS L2 distances map onto cosine
+                # similarity, which adaptive retrieval thresholds rely on.
+                base = HuggingFaceEmbeddings(
+                    model_name=model_name,
+                    model_kwargs=(
+                        {"trust_remote_code": True} if profile.get("trust_remote_code") else {}
+                    ),
+                    encode_kwargs={"normalize_embeddings": True},
+                )
+                cls._embedding = cls.configure(base, model_name)
+                logger.info(f"Embedding model: {cls.model_id(cls._embedding)}")
+        return cls._embedding
+
+    @classmethod
+    def configure(cls, base, model_name: str, dim: int = None, reduction: str = None,
+                  pca_path: str = None):
+        """
+        Apply the prompts, segmentation and dimension reduction configured
+        for `model_name` to `base`. Returns `base` itself when there is
+        nothing to add, so its model id stays unchanged.
+        """
+        profile = cls.model_profile(model_name)
+        dim = AIConfig.EMBEDDING_DIM if dim is None else dim
+        reduction = reduction or AIConfig.EMBEDDING_REDUCTION
+        pca_path = pca_path or AIConfig.EMBEDDING_PCA_PATH
+
+        reducer = None
+        if dim and dim < profile.get("dim", dim + 1):
+            from app.services.embedding_models import MatryoshkaReducer, PCAReducer
+
+            if reduction == "pca":
+                if not pca_path:
+                    raise ValueError("EMBEDDING_REDUCTION=pca needs EMBEDDING_PCA_PATH")
+                reducer = PCAReducer.load(pca_path)
+                if reducer.model != model_name or reducer.dim != dim:
+                    raise ValueError(
+                        f"{pca_path} projects {reducer.model} to {reducer.dim} dims, "
+                        f"expected {model_name} to {dim}"
+                    )
+            elif reduction == "matryoshka":
+                if not profile.get("matryoshka"):
+                    logger.warning(
+                        f"{model_name} is not Matryoshka-trained; truncating it to "
+                        f"{dim} dims will cost recall, consider EMBEDDING_REDUCTION=pca"
+                    )
+                reducer = MatryoshkaReducer(dim)
+            else:
+                raise ValueError(f"Unknown EMBEDDING_REDUCTION: {reduction}")
+
+        if reducer is None and not any(
+            profile.get(key) for key in ("query_prompt", "document_prompt", "segmenter")
+        ):
+            return base
+
+        from app.services.embedding_models import ConfiguredEmbeddings
+
+        return ConfiguredEmbeddings(base, profile, reducer)
+
+    @staticmethod
+    def model_profile(model_name: str) -> Dict:
+        profile = AIConfig.EMBEDDING_MODELS.get(model_name)
+        if profile is None:
+            logger.warning(f"No profile for embedding model {model_name}; using it as-is")
+            return {}
+        return profile
+
+    # ---------- Query embeddings ----------
+    @classmethod
+    def embed_query(cls, text: str, embedding=None) -> List[float]:
+        """
+        Embed a search query through the shared LRU. The cache key is the
+        normalised query (Unicode NFC, lower case, collapsed whitespace), so
+        trivial variants of a hot question share one vector; the model still
+        sees the original text, cased like the passages it is compared to.
+        """
+        embedding = embedding or cls.get_huggingface_embedding()
+        model_id = cls.model_id(embedding)
+        key = cls.normalize_query(text)
+
+        with cls._query_cache_lock:
+            cls._check_model(model_id)
+            vector = cls._query_cache.get(key)
+            if vector is not None:
+                cls._query_cache.move_to_end(key)
+                cls._query_cache_hits += 1
+                return vector
+            cls._query_cache_misses += 1
+
+        with tracer.span("embed_query", chars=len(text)):
+            vector = embedding.embed_query(text)
+
+        cls._remember_queries(model_id, {key: vector})
+        return vector
+
+    @classmethod
+    def precompute_queries(cls, queries: Iterable[str], embedding=None):
+        """Embed `queries` in one batch and seed the LRU with them."""
+        embedding = embedding or cls.get_huggingface_embedding()
+        originals = {}
+        for query in queries:
+            originals.setdefault(cls.normalize_query(query), query)
+        if not originals:
+            return
+        # Models with query prompts embed queries differently from passages.
+        embed_queries = getattr(embedding, "embed_queries", embedding.embed_documents)
+        vectors = embed_queries(list(originals.values()))
+        cls._remember_queries(cls.model_id(embedding), dict(zip(originals, vectors)))
+
+    @classmethod
+    def query_cache_stats(cls) -> Dict[str, int]:
+        with cls._query_cache_lock:
+            return {
+                "size": len(cls._query_cache),
+                "hits": cls._query_cache_hits,
+                "misses": cls._query_cache_misses,
+            }
+
+    @staticmethod
+    def normalize_query(text: str) -> str:
+        text = unicodedata.normalize("NFC", text)
+        return _WHITESPACE_RE.sub(" ", text).strip().lower()
+
+    @classmethod
+    def _remember_queries(cls, model_id: str, vectors: Dict[str, List[float]]):
+        with cls._query_cache_lock:
+            cls._check_model(model_id)
+            for key, vector in vectors.items():
+                cls._query_cache[key] = vector
+                cls._query_cache.move_to_end(key)
+            while len(cls._query_cache) > AIConfig.QUERY_CACHE_SIZE:
+                cls._query_cache.popitem(last=False)
+
+    @classmethod
+    def _check_model(cls, model_id: str):
+        """Drop every cached vector when the embedding model changes. Caller holds the lock."""
+        if cls._query_cache_model != model_id:
+            cls._query_cache.clear()
+            cls._query_cache_model = model_id
+
+    @staticmethod
+    def model_id(embedding) -> str:
+        """Identifier of an embedding model; keys the query cache and snapshots."""
+        name = getattr(embedding, "model_name", None) or getattr(embedding, "model", None)
+        if isinstance(name, str) and name:
+            return f"{type(embedding).__name__}:{name}"
+        # Unknown wrappers: never share vectors between instances.
+        return f"{type(embedding).__name__}@{id(embedding):x}"
+
+    # ---------- Warm-up ----------
+    @classmethod
+    def warm_up(cls):
+        """
+        Load the embedding model in a background thread so the first upload
+        or question does not pay for importing torch and reading weights.
+        Safe to call on every script run; only the first call starts work.
+        """
+        with cls._warm_up_lock:
+            if cls._warm_up_thread is not None or cls._embedding is not None:
+                return
+
+            cls._warm_up_thread = threading.Thread(
+                target=cls._load_in_background, name="embedding-warm-up", daemon=True
             )
-        return cls._embedding
\ No newline at end of file
+            cls._warm_up_thread.start()
+
+    @classmethod
+    def _load_in_background(cls):
+        try:
+            cls.precompute_queries(AppConfig.EXAMPLE_QUESTIONS)
+            logger.info("Embedding model warmed up")
+        except Exception as e:
+            logger.warning(f"Embedding warm-up failed: {e}")
@@ -1,8 +1,9 @@
-import pdfplumber
-import pytesseract
-from PIL import Image
-from typing import Dict, Any
+import hashlib
+from typing import Any, Collection, Dict, List, Optional
+from app.config.ai_config import AIConfig
 from app.utils.logger import logger
+from app.utils.profiling import profiled
+from app.utils.tracing import tracer
 
 
 class FileService:
@@ -14,7 +15,26 @@ class FileService:
 
     # ========= PUBLIC API =========
     @classmethod
-    def extract(cls, uploaded_file) -> Dict[str, Any]:
+    @profiled("extract")
+    def extract(cls, uploaded_file, pages: Optional[Collection[int]] = None) -> Dict[str, Any]:
+        """
+        Extract text. For PDFs, `pages` (1-based) limits extraction to those
+        pages; the text then holds only them and `page_offsets` maps into it.
+        A `triage` attribute on the file (see UploadService) routes scanned
+        and mixed PDFs through OCR.
+        """
+        with tracer.span("extract", bytes=getattr(uploaded_file, "size", 0)) as span:
+            result = cls._extract(uploaded_file, pages)
+            metadata = result["metadata"]
+            span.set(
+                status=result["status_code"],
+                chars=len(result["text"] or ""),
+                pages=metadata.get("total_pages", 1),
+            )
+            return result
+
+    @classmethod
+    def _extract(cls, uploaded_file, pages=None) -> Dict[str, Any]:
         try:
             file_type = uploaded_file.type
             file_name = uploaded_file.name
@@ -28,7 +48,7 @@ class FileService:
                 )
 
             if cls.SUPPORTED_TYPES[file_type] == "pdf":
-                return cls._process_pdf(uploaded_file)
+                return cls._process_pdf(uploaded_file, pages)
 
             logger.info("Processing as image with OCR...")
             return cls._process_image(uploaded_file)
@@ -44,6 +64,34 @@ class FileService:
             logger.exception("Unexpected error processing file")
             return cls._error(500, f"Unexpected error processing file: {e}")
 
+    @classmethod
+    def page_hashes(cls, uploaded_file) -> List[str]:
+        """
+        Content hash of every page, computed from the raw PDF page streams
+        without extracting text. Images count as a single page.
+        """
+        file_to_open = getattr(uploaded_file, "path", uploaded_file)
+
+        with tracer.span("page_hash") as span:
+            if cls.SUPPORTED_TYPES.get(uploaded_file.type) == "pdf":
+                import pdfplumber
+
+                with pdfplumber.open(file_to_open) as pdf:
+                    hashes = [cls._page_hash(page) for page in pdf.pages]
+            else:
+                if isinstance(file_to_open, str):
+                    with open(file_to_open, "rb") as f:
+                        data = f.read()
+                else:
+                    uploaded_file.seek(0)
+                    data = uploaded_file.read()
+                hashes = [hashlib.sha256(data).hexdigest()]
+            span.set(pages=len(hashes))
+
+        if hasattr(uploaded_file, "seek"):
+            uploaded_file.seek(0)
+        return hashes
+
     @classmethod
     def get_file_info(cls, uploaded_file) -> Dict[str, Any]:
         try:
@@ -58,11 +106,19 @@ class FileService:
 
     # ========= INTERNAL =========
     @classmethod
-    def _process_pdf(cls, file) -> Dict[str, Any]:
+    def _process_pdf(cls, file, pages=None) -> Dict[str, Any]:
         text_content = ""
         empty_pages = []
+        page_offsets = []
+        page_hashes = []
+        ocr_pages = []
+
+        import pdfplumber
 
         file_to_open = getattr(file, "path", file)
+        kind = (getattr(file, "triage", None) or {}).get("kind", "text")
+        # Text PDFs never pay for OCR; blank pages there are just blank.
+        ocr_budget = AIConfig.PDF_OCR_MAX_PAGES if kind != "text" else 0
 
         try:
             with pdfplumber.open(file_to_open) as pdf:
@@ -77,35 +133,60 @@ class FileService:
                     )
 
                 for i, page in enumerate(pdf.pages):
+                    page_hashes.append(cls._page_hash(page))
+                    if pages is not None and i + 1 not in pages:
+                        continue
                     try:
-                        page_text = page.extract_text()
-                        if page_text and page_text.strip():
-                            text_content += page_text + "\n"
-                        else:
-                            empty_pages.append(i + 1)
+                        page_text = "" if kind == "scanned" else page.extract_text()
                     except Exception:
+                        page_text = ""
+                    if not (page_text and page_text.strip()) and len(ocr_pages) < ocr_budget:
+                        try:
+                            page_text = cls._ocr_page(page)
+                            ocr_pages.append(i + 1)
+                        except Exception:
+                            # A mixed PDF still has its text layer to index.
+                            if kind == "scanned":
+                                raise
+                            logger.exception("OCR failed, indexing the text layer only")
+                            ocr_budget = 0
+
+                    if page_text and page_text.strip():
+                        page_offsets.append((i + 1, len(text_content)))
+                        text_content += page_text + "\n"
+                    else:
                         empty_pages.append(i + 1)
 
-            if not text_content.strip():
+            # A partial re-extraction may legitimately hit only blank pages.
+            if not text_content.strip() and pages is None:
                 return cls._error(
                     422,
-                    "No text extracted from PDF. This may be a scanned document.",
+                    "No text extracted from PDF. This may be a scanned document."
+                    if kind == "text" else "No text recognised by OCR in the scanned PDF.",
                     total_pages=total_pages,
                     empty_pages=empty_pages
                 )
 
             extracted = text_content.strip()
+            leading = len(text_content) - len(text_content.lstrip())
+            page_offsets = [(page, max(0, start - leading)) for page, start in page_offsets]
+            requested = total_pages if pages is None else len(pages)
             logger.info(
                 f"PDF extraction complete: {len(extracted)} chars "
-                f"from {total_pages - len(empty_pages)}/{total_pages} pages"
+                f"from {requested - len(empty_pages)}/{requested} pages"
+                + (f", {len(ocr_pages)} via OCR" if ocr_pages else "")
             )
 
             return cls._success(
                 extracted,
-                f"Extracted text from {total_pages - len(empty_pages)}/{total_pages} pages",
+                f"Extracted text from {requested - len(empty_pages)}/{requested} pages",
                 total_pages=total_pages,
-                extracted_pages=total_pages - len(empty_pages),
+                extracted_pages=requested - len(empty_pages),
                 empty_pages=empty_pages,
+                page_offsets=page_offsets,
+                page_hashes=page_hashes,
+                pdf_kind=kind,
+                ocr_pages=ocr_pages,
                 character_count=len(extracted)
             )
 
@@ -117,6 +198,9 @@ class FileService:
 
     @classmethod
     def _process_image(cls, file) -> Dict[str, Any]:
+        import pytesseract
+        from PIL import Image
+
         file_to_open = getattr(file, "path", file)
 
         try:
@@ -132,7 +216,9 @@ class FileService:
                     height=height
                 )
 
-            text, lang_used = cls._run_ocr(image)
+            with tracer.span("ocr", pixels=width * height) as span:
+                text, lang_used = cls._run_ocr(image)
+                span.set(chars=len(text))
 
             if not text.strip():
                 return cls._error(
@@ -168,8 +254,46 @@ class FileService:
             logger.exception("Image OCR failed")
             return cls._error(500, f"Image OCR failed: {e}")
 
+    @classmethod
+    def _ocr_page(cls, page) -> str:
+        """Render a PDF page and OCR it."""
+        import pytesseract
+
+        with tracer.span("ocr", page=page.page_number) as span:
+            image = page.to_image(resolution=AIConfig.PDF_OCR_RESOLUTION).original
+            try:
+                text, _ = cls._run_ocr(image)
+            except pytesseract.TesseractNotFoundError:
+                raise RuntimeError("Tesseract OCR not installed") from None
+            span.set(chars=len(text))
+        return text
+
+    @staticmethod
+    def _page_hash(page) -> str:
+        """Hash of a page's content streams, images and geometry."""
+        from pdfminer.pdftypes import resolve1
+
+        page_obj = page.page_obj
+        digest = hashlib.sha256(repr(page_obj.mediabox).encode())
+
+        for stream in page_obj.contents or ():
+            stream = resolve1(stream)
+            if hasattr(stream, "get_rawdata"):
+                digest.update(stream.get_rawdata() or b"")
+
+        xobjects = resolve1((page_obj.resources or {}).get("XObject")) or {}
+        for name in sorted(xobjects):
+            stream = resolve1(xobjects[name])
+            digest.update(str(name).encode())
+            if hasattr(stream, "get_rawdata"):
+                digest.update(stream.get_rawdata() or b"")
+
+        return digest.hexdigest()
+
     @classmethod
     def _run_ocr(cls, image):
+        import pytesseract
+
         try:
             return (
                 pytesseract.image_to_string(image, lang="vie", config="--psm 6"),
@@ -0,0 +1,370 @@
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.config.app_config import AppConfig
+from app.services.chunk_store import ChunkStore
+from app.services.dedup_service import DedupService
+from app.services.embedding_service import EmbeddingService
+from app.services.file_service import FileService
+from app.services.session_service import SessionService
+from app.services.text_splitter_service import TextSplitterService
+from app.services.upload_service import UploadService
+from app.services.vector_store_service import VectorStoreService
+from app.utils.logger import logger
+from app.utils.tracing import tracer
+
+
+class IngestionService:
+    """
+    Ingestion pipeline
+    spool & triage -> extract -> split per page -> dedup -> store text
+    -> embed & index (per document)
+
+    Re-uploading a file with the same name diffs it page by page by content
+    hash: only new or changed pages are extracted and embedded, vectors of
+    pages that disappeared are deleted, and unchanged pages keep theirs.
+
+    Chunks dropped as near-duplicates are embedded later if the chunk they
+    duplicated goes away (document removed or page rewritten), so every
+    document stays searchable on its own.
+    """
+
+    # ========= PUBLIC API =========
+    @classmethod
+    def ingest(cls, uploaded_file, embedding=None) -> Dict[str, Any]:
+        spooled = UploadService.spool(uploaded_file)
+        if spooled["status_code"] != 200:
+            return cls._error(spooled["status_code"], spooled["message"])
+
+        upload = spooled["upload"]
+        try:
+            return cls._ingest(upload, embedding)
+        finally:
+            upload.close()
+
+    @classmethod
+    def remove_document(cls, index: int, embedding=None):
+        """Remove the document at `index` and re-admit copies of its chunks."""
+        orphans = SessionService.remove_document(index)
+        cls._readmit(orphans, embedding)
+
+    # ========= INTERNAL =========
+    @classmethod
+    def _ingest(cls, uploaded_file, embedding) -> Dict[str, Any]:
+        file_name = getattr(uploaded_file, "name", "Unknown")
+
+        existing = SessionService.get_document(file_name)
+        if existing is not None:
+            return cls._reingest(existing, uploaded_file, embedding)
+
+        extracted = FileService.extract(uploaded_file)
+        if extracted["status_code"] != 200:
+            return cls._error(extracted["status_code"], extracted["message"])
+
+        doc_id = SessionService.next_document_id()
+
+        try:
+            page_hashes = (
+                extracted["metadata"].get("page_hashes")
+                or FileService.page_hashes(uploaded_file)
+            )
+            doc_data = cls._new_document(doc_id, file_name, extracted)
+            cls._index_pages(
+                doc_data, extracted, page_hashes,
+                page_numbers=range(1, len(page_hashes) + 1),
+                embedding=embedding,
+            )
+            SessionService.add_document(doc_data)
+
+            return {
+                "status_code": 200,
+                "message": f"Added: {file_name}",
+                "document": doc_data,
+            }
+
+        except Exception as e:
+            logger.exception("Ingestion failed")
+            SessionService.discard_document_data(doc_id)
+            return cls._error(500, str(e))
+
+    @classmethod
+    def _reingest(cls, existing: Dict, uploaded_file, embedding) -> Dict[str, Any]:
+        file_name = existing["name"]
+
+        try:
+            page_hashes = FileService.page_hashes(uploaded_file)
+        except Exception as e:
+            logger.exception("Page hashing failed")
+            return cls._error(500, str(e))
+
+        # Match pages by content, not position, so an inserted page does not
+        # invalidate everything after it.
+        unmatched: Dict[str, List[Dict]] = {}
+        for page in existing["pages"]:
+            unmatched.setdefault(page["hash"], []).append(page)
+
+        kept, changed = [], []
+        for number, page_hash in enumerate(page_hashes, start=1):
+            candidates = unmatched.get(page_hash)
+            if candidates:
+                kept.append((number, candidates.pop(0)))
+            else:
+                changed.append(number)
+        stale = [page for pages in unmatched.values() for page in pages]
+
+        if not changed and not stale and all(n == page["number"] for n, page in kept):
+            return cls._error(409, "Document already uploaded and unchanged!")
+
+        if changed:
+            extracted = FileService.extract(uploaded_file, pages=set(changed))
+            if extracted["status_code"] != 200:
+                return cls._error(extracted["status_code"], extracted["message"])
+        else:
+            extracted = {"text": "", "metadata": {"page_offsets": []}}
+
+        doc_data = dict(existing)
+        doc_data["pages"] = [dict(page, number=number) for number, page in kept]
+        doc_data["uploaded_at"] = cls._now()
+        doc_data["version"] = existing.get("version", 1) + 1
+        doc_data["metadata"] = dict(
+            existing["metadata"], total_pages=len(page_hashes)
+        )
+
+        moved = {
+            chunk_id: {"page": number}
+            for number, page in kept
+            if number != page["number"]
+            for chunk_id in page["chunk_ids"]
+        }
+
+        try:
+            orphans = cls._index_pages(
+                doc_data, extracted, page_hashes,
+                page_numbers=changed,
+                embedding=embedding,
+                stale_pages=stale,
+                metadata_updates=moved,
+            )
+        except Exception as e:
+            logger.exception("Re-ingestion failed")
+            return cls._error(500, str(e))
+
+        dedup_index = SessionService.get_dedup_index()
+        if dedup_index is not None:
+            for number, page in kept:
+                for chunk_index in page["chunk_indexes"]:
+                    copy = dedup_index.copies.get((doc_data["id"], chunk_index))
+                    if copy is not None:
+                        copy["page"] = number
+
+        SessionService.replace_document(doc_data)
+        cls._readmit(orphans, embedding)
+        logger.info(
+            f"Re-ingested {file_name}: {len(changed)} changed, {len(stale)} removed, "
+            f"{len(kept)} unchanged page(s)"
+        )
+
+        return {
+            "status_code": 200,
+            "message": (
+                f"Updated: {file_name} ({len(changed)} of {len(page_hashes)} "
+                f"page(s) re-indexed, {len(stale)} removed)"
+            ),
+            "document": doc_data,
+        }
+
+    @classmethod
+    def _index_pages(
+        cls,
+        doc_data: Dict,
+        extracted: Dict,
+        page_hashes: List[str],
+        page_numbers: Iterable[int],
+        embedding,
+        stale_pages: Iterable[Dict] = (),
+        metadata_updates: Optional[Dict[str, Dict]] = None,
+    ):
+        """
+        Chunk and index `page_numbers` from `extracted`, drop `stale_pages`
+        and record the result in `doc_data["pages"]`. Returns the copies
+        orphaned by dropping the stale chunks, for `_readmit`.
+        """
+        doc_id = doc_data["id"]
+        text = extracted["text"] or ""
+        page_offsets = extracted["metadata"].get("page_offsets") or (
+            [(1, 0)] if text.strip() else []
+        )
+        blob_id = ChunkStore.put(text) if text else None
+
+        records = {
+            number: {
+                "number": number,
+                "hash": page_hashes[number - 1],
+                "blob_id": blob_id,
+                "chars": 0,
+                "duplicates": 0,
+                "chunk_ids": [],
+                "chunk_indexes": [],
+            }
+            for number in page_numbers
+        }
+        bounds = [start for _, start in page_offsets[1:]] + [len(text)]
+        for (number, start), end in zip(page_offsets, bounds):
+            records[number]["chars"] = len(text[start:end].strip())
+
+        chunks, metadatas, page_of = [], [], {}
+        for number, chunk, offset in TextSplitterService.split_pages(text, page_offsets):
+            chunk_index = doc_data["next_chunk_index"]
+            doc_data["next_chunk_index"] += 1
+            records[number]["chunk_indexes"].append(chunk_index)
+            page_of[chunk_index] = number
+            chunks.append(chunk)
+            metadatas.append({
+                "doc_id": doc_id,
+                "doc_name": doc_data["name"],
+                "blob_id": blob_id,
+                "page": number,
+                "uploaded_at": doc_data["uploaded_at"],
+                "chunk_index": chunk_index,
+                "start_index": offset,
+                "length": len(chunk),
+            })
+
+        # Stale entries go before filtering so that a rewritten page is not
+        # dropped as a duplicate of the version it replaces; they are put
+        # back if the index update fails.
+        stale_pages = list(stale_pages)
+        dedup_index = SessionService.get_dedup_index()
+        removed = None
+        if dedup_index is not None and stale_pages:
+            removed = dedup_index.remove_chunks(
+                doc_id, [i for page in stale_pages for i in page["chunk_indexes"]]
+            )
+
+        chunks, metadatas, dropped = DedupService.filter(chunks, metadatas)
+        for record in dropped:
+            records[page_of[record["chunk_index"]]]["duplicates"] += 1
+
+        ids = [uuid.uuid4().hex for _ in chunks]
+        for chunk_id, metadata in zip(ids, metadatas):
+            records[metadata["page"]]["chunk_ids"].append(chunk_id)
+
+        try:
+            with tracer.span("index_pages", pages=len(records), stale=len(stale_pages)):
+                VectorStoreService.update_document(
+                    doc_id,
+                    chunks,
+                    embedding or EmbeddingService.get_huggingface_embedding(),
+                    metadatas,
+                    ids,
+                    stale_ids=[i for page in stale_pages for i in page["chunk_ids"]],
+                    metadata_updates=metadata_updates,
+                )
+        except Exception:
+            dedup_index = SessionService.get_dedup_index()
+            if dedup_index is not None:
+                dedup_index.remove_chunks(
+                    doc_id, [i for r in records.values() for i in r["chunk_indexes"]]
+                )
+                if removed:
+                    dedup_index.restore(removed)
+            raise
+
+        doc_data["pages"] = sorted(
+            doc_data["pages"] + list(records.values()), key=lambda page: page["number"]
+        )
+        doc_data["size"] = sum(page["chars"] for page in doc_data["pages"])
+        doc_data["duplicate_chunks"] = sum(page["duplicates"] for page in doc_data["pages"])
+        return removed["orphans"] if removed else []
+
+    @classmethod
+    def _readmit(cls, orphans: List[Dict], embedding=None):
+        """
+        Index copies whose kept chunk is gone, each in its own document.
+        They go through dedup again, so copies of one another are still
+        embedded only once.
+        """
+        if not orphans:
+            return
+        document_index = SessionService.get_vector_store()
+        if embedding is None and document_index is not None:
+            embedding = document_index.embeddings
+
+        by_doc: Dict[int, List[Dict]] = {}
+        for metadata in orphans:
+            by_doc.setdefault(metadata["doc_id"], []).append(dict(metadata))
+
+        for doc_id, metadatas in by_doc.items():
+            doc_data = SessionService.get_document_by_id(doc_id)
+            if doc_data is None:
+                continue
+            page_of = {
+                chunk_index: page
+                for page in doc_data["pages"]
+                for chunk_index in page["chunk_indexes"]
+            }
+            metadatas = [m for m in metadatas if m["chunk_index"] in page_of]
+            for metadata in metadatas:
+                metadata["page"] = page_of[metadata["chunk_index"]]["number"]
+
+            try:
+                chunks = [
+                    ChunkStore.get(m["blob_id"])[m["start_index"]:m["start_index"] + m["length"]]
+                    for m in metadatas
+                ]
+                chunks, metadatas, _ = DedupService.filter(chunks, metadatas)
+                ids = [uuid.uuid4().hex for _ in chunks]
+                if chunks:
+                    VectorStoreService.update_document(
+                        doc_id,
+                        chunks,
+                        embedding or EmbeddingService.get_huggingface_embedding(),
+                        metadatas,
+                        ids,
+                        stale_ids=[],
+                    )
+            except Exception:
+                logger.exception(f"Could not re-index copies in document {doc_id}")
+                dedup_index = SessionService.get_dedup_index()
+                if dedup_index is not None:
+                    dedup_index.remove_chunks(doc_id, [m["chunk_index"] for m in metadatas])
+                continue
+
+            for chunk_id, metadata in zip(ids, metadatas):
+                page = page_of[metadata["chunk_index"]]
+                page["chunk_ids"].append(chunk_id)
+                page["duplicates"] -= 1
+            doc_data["duplicate_chunks"] = sum(page["duplicates"] for page in doc_data["pages"])
+            logger.info(f"Re-indexed {len(chunks)} former duplicate chunk(s) in document {doc_id}")
+
+    @classmethod
+    def _new_document(cls, doc_id: int, file_name: str, extracted: Dict) -> Dict:
+        metadata = {
+            key: value
+            for key, value in extracted["metadata"].items()
+            if key not in ("page_offsets", "page_hashes")
+        }
+        return {
+            "id": doc_id,
+            "name": file_name,
+            "metadata": metadata,
+            "size": 0,
+            "uploaded_at": cls._now(),
+            "version": 1,
+            "pages": [],
+            "next_chunk_index": 0,
+            "duplicate_chunks": 0,
+        }
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().strftime(AppConfig.UPLOAD_TIMESTAMP_FORMAT)
+
+    @staticmethod
+    def _error(status: int, message: str) -> Dict[str, Any]:
+        return {
+            "status_code": status,
+            "message": message,
+            "document": None,
+        }
@@ -0,0 +1,248 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from app.config.ai_config import AIConfig
+from app.utils.logger import logger
+
+
+class LLMGatewayError(RuntimeError):
+    pass
+
+
+# Transport failures as raised by the OpenAI/Groq SDKs and httpx; matched by
+# name so neither SDK has to be imported.
+_TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError", "TransportError"}
+
+# Rate limiting and server-side failures; other HTTP errors are the request's
+# fault and fail the same way on every attempt and provider.
+_RETRYABLE_STATUS = {408, 429}
+
+
+class GatewayLLM:
+    """Handle returned to callers; `invoke` routes through the gateway."""
+
+    def __init__(self, max_tokens: Optional[int] = None):
+        self.max_tokens = max_tokens
+
+    def invoke(self, prompt):
+        return LLMGateway.invoke(prompt, self.max_tokens)
+
+
+class LLMGateway:
+    """
+    Long-lived, process-wide access point to the chat providers.
+
+    Provider clients are built once per (provider, max_tokens) and share a
+    pooled HTTP client. Each call gets an overall deadline (LLM_DEADLINE);
+    timeouts, connection errors, 429s and 5xx responses are retried with
+    exponential backoff and then fail over to the next configured provider
+    (Groq <-> OpenAI); other errors are raised at once. With LLM_HEDGE on, a
+    second request is raced against the first once it has run longer than
+    the provider's observed p95 latency.
+    """
+
+    _lock = threading.Lock()
+    _clients: Dict[tuple, object] = {}
+    _http_client = None
+    _executor: Optional[ThreadPoolExecutor] = None
+    _latencies: Dict[str, deque] = {}
+
+    # ---------- PUBLIC ----------
+    @classmethod
+    def bind(cls, max_tokens: Optional[int] = None) -> GatewayLLM:
+        return GatewayLLM(max_tokens)
+
+    @classmethod
+    def invoke(cls, prompt, max_tokens: Optional[int] = None):
+        providers = cls.providers()
+        if not providers:
+            raise ValueError("Unsupported LLM provider")
+
+        deadline = time.monotonic() + AIConfig.LLM_DEADLINE
+        last_error = None
+
+        for index, provider in enumerate(providers):
+            fallback = providers[index + 1] if index + 1 < len(providers) else provider
+
+            for attempt in range(AIConfig.LLM_MAX_RETRIES + 1):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise LLMGatewayError(
+                        f"LLM deadline of {AIConfig.LLM_DEADLINE:.0f}s exceeded"
+                    ) from last_error
+
+                try:
+                    return cls._call(provider, fallback, prompt, max_tokens, remaining)
+                except Exception as e:
+                    if not cls._is_retryable(e):
+                        raise
+                    last_error = e
+                    logger.warning(
+                        f"LLM call to {provider} failed "
+                        f"(attempt {attempt + 1}/{AIConfig.LLM_MAX_RETRIES + 1}): {e}"
+                    )
+
+                if attempt < AIConfig.LLM_MAX_RETRIES:
+                    backoff = AIConfig.LLM_BACKOFF_BASE * (2 ** attempt)
+                    backoff *= random.uniform(0.5, 1.0)
+                    time.sleep(max(0.0, min(backoff, deadline - time.monotonic())))
+
+        raise LLMGatewayError(f"All LLM providers failed: {last_error}") from last_error
+
+    @staticmethod
+    def providers() -> List[str]:
+        """Configured provider first, then the others that have credentials."""
+        available = [
+            name for name, key in (
+                ("openai", AIConfig.OPENAI_API_KEY),
+                ("groq", AIConfig.GROQ_API_KEY),
+            )
+            if key
+        ]
+        primary = AIConfig.LLM_PROVIDER
+        if primary not in ("openai", "groq"):
+            return []
+        if not AIConfig.LLM_FAILOVER:
+            return [primary]
+        return [primary] + [name for name in available if name != primary]
+
+    @classmethod
+    def p95(cls, provider: str) -> Optional[float]:
+        samples = cls._latencies.get(provider)
+        if not samples or len(samples) < AIConfig.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    @classmethod
+    def reset(cls):
+        """Drop cached clients and latency history (e.g. after config changes)."""
+        with cls._lock:
+            cls._clients.clear()
+            cls._latencies.clear()
+            if cls._http_client is not None:
+                cls._http_client.close()
+                cls._http_client = None
+
+    # ---------- INTERNAL ----------
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, (TimeoutError, ConnectionError)):
+            return True
+        if any(klass.__name__ in _TRANSIENT_ERRORS for klass in type(error).__mro__):
+            return True
+
+        status = getattr(error, "status_code", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        if not isinstance(status, int):
+            return False
+        return status in _RETRYABLE_STATUS or status >= 500
+
+    @classmethod
+    def _call(cls, provider, fallback, prompt, max_tokens, timeout):
+        executor = cls._get_executor()
+        started = time.monotonic()
+        futures = {executor.submit(cls._timed_invoke, provider, prompt, max_tokens): provider}
+
+        hedge_after = cls.p95(provider) if AIConfig.LLM_HEDGE else None
+        if hedge_after is not None and hedge_after < timeout:
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done:
+                logger.info(f"Hedging {provider} call with {fallback} after {hedge_after:.2f}s")
+                futures[executor.submit(cls._timed_invoke, fallback, prompt, max_tokens)] = fallback
+
+        pending = set(futures)
+        error = None
+        while pending:
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except Exception as e:
+                    error = e
+
+        if error is not None:
+            raise error
+        raise TimeoutError(f"{provider} did not respond within {timeout:.1f}s")
+
+    @classmethod
+    def _timed_invoke(cls, provider, prompt, max_tokens):
+        started = time.monotonic()
+        result = cls._get_client(provider, max_tokens).invoke(prompt)
+        with cls._lock:
+            cls._latencies.setdefault(provider, deque(maxlen=200)).append(
+                time.monotonic() - started
+            )
+        return result
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=AIConfig.LLM_POOL_SIZE, thread_name_prefix="llm"
+                )
+            return cls._executor
+
+    @classmethod
+    def _get_http_client(cls):
+        import httpx
+
+        if cls._http_client is None:
+            cls._http_client = httpx.Client(
+                timeout=AIConfig.LLM_REQUEST_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=AIConfig.LLM_POOL_SIZE,
+                    max_keepalive_connections=AIConfig.LLM_POOL_SIZE,
+                ),
+            )
+        return cls._http_client
+
+    @classmethod
+    def _get_client(cls, provider: str, max_tokens: Optional[int]):
+        key = (provider, max_tokens)
+        with cls._lock:
+            client = cls._clients.get(key)
+            if client is None:
+                client = cls._clients[key] = cls._build_client(provider, max_tokens)
+            return client
+
+    @classmethod
+    def _build_client(cls, provider: str, max_tokens: Optional[int]):
+        common = {
+            "temperature": AIConfig.LLM_TEMPERATURE,
+            "max_tokens": max_tokens,
+            "timeout": AIConfig.LLM_REQUEST_TIMEOUT,
+            "max_retries": 0,
+            "http_client": cls._get_http_client(),
+        }
+
+        if provider == "openai":
+            from langchain_openai import ChatOpenAI
+
+            return ChatOpenAI(
+                model=AIConfig.OPENAI_LLM_MODEL,
+                api_key=AIConfig.OPENAI_API_KEY,
+                base_url=AIConfig.OPENAI_BASE_URL,
+                **common,
+            )
+
+        if provider == "groq":
+            from langchain_groq import ChatGroq
+
+            return ChatGroq(
+                model=AIConfig.GROQ_LLM_MODEL,
+                api_key=AIConfig.GROQ_API_KEY,
+                base_url=AIConfig.GROQ_BASE_URL,
+                **common,
+            )
+
+        raise ValueError("Unsupported LLM provider")
@@ -0,0 +1,200 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Any, List, Optional
+
+from app.config.ai_config import AIConfig
+from app.services.chat_history import ChatMessage, ConversationMemory
+from app.services.session_service import SessionService
+from app.utils.logger import logger
+from app.utils.text import words
+from app.utils.tokenizer import count_tokens, truncate_to_tokens
+from app.utils.tracing import tracer
+
+
+_SPEAKERS = {"user": "Người dùng", "assistant": "Trợ lý"}
+
+_SUMMARY_PROMPT = """
+Tóm tắt cuộc hội thoại hiện tại:
+{summary}
+
+Các lượt hội thoại mới:
+{turns}
+
+Hãy cập nhật bản tóm tắt để bao gồm các lượt hội thoại mới. Giữ lại các
+chủ đề, tên riêng và dữ kiện quan trọng. Trả lời ngắn gọn, tối đa {limit} từ.
+
+Bản tóm tắt mới:
+""".strip()
+
+# Words that point back into the conversation ("nó", "đó", "vậy"...). A
+# follow-up without any of them is already standalone and needs no rewrite.
+_CONTEXT_WORDS = frozenset({
+    "nó", "đó", "đấy", "này", "ấy", "kia", "họ", "vậy", "thế", "trên", "còn", "tiếp",
+    "it", "its", "that", "this", "these", "those", "they", "them", "he", "she", "above",
+})
+_MIN_STANDALONE_WORDS = 4
+
+_REWRITE_PROMPT = """
+Lịch sử hội thoại:
+{history}
+
+Câu hỏi tiếp theo:
+{question}
+
+Hãy viết lại câu hỏi tiếp theo thành một câu hỏi độc lập, đầy đủ ý nghĩa
+mà không cần đọc lịch sử hội thoại. Chỉ trả về câu hỏi đã viết lại.
+
+Câu hỏi độc lập:
+""".strip()
+
+
+class MemoryService:
+    """
+    Bounded conversational memory.
+
+    The last MEMORY_RECENT_MESSAGES messages are kept verbatim (each capped at
+    MEMORY_MESSAGE_TOKENS); older ones are folded into a rolling summary
+    capped at MEMORY_SUMMARY_TOKENS. Folding never delays an answer: `fold`
+    is called once the turn is recorded, waits until MEMORY_FOLD_BATCH
+    messages have left the recent window and summarises them in one
+    background call. Until then they stay in the history verbatim, so the
+    history block holds the summary plus at most
+    MEMORY_RECENT_MESSAGES + MEMORY_FOLD_BATCH messages.
+    """
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+
+    # ---------- PUBLIC ----------
+    @classmethod
+    def prepare(cls, query: str, llm_factory: Callable) -> Dict[str, Any]:
+        """
+        Return the history block for the answer prompt plus a standalone
+        rewrite of `query` for retrieval.
+        """
+        messages = SessionService.get_messages()
+        if not messages:
+            return {"history": "", "standalone_question": query}
+
+        memory = SessionService.get_memory()
+        with memory.lock:
+            summary, summarized_until = memory.summary, memory.summarized_until
+        # Messages of a fold still in flight may be briefly missing; the
+        # history stays bounded either way.
+        start = max(
+            summarized_until,
+            len(messages) - AIConfig.MEMORY_RECENT_MESSAGES - AIConfig.MEMORY_FOLD_BATCH,
+        )
+        history = cls._format_history(summary, messages.window(start, len(messages)))
+
+        standalone = query
+        if history and cls._needs_rewrite(query):
+            standalone = cls._rewrite_question(query, history, llm_factory)
+
+        return {
+            "history": history,
+            "standalone_question": standalone,
+        }
+
+    @classmethod
+    def fold(cls, llm_factory: Callable) -> Optional[Future]:
+        """
+        Summarise the messages that have left the recent window once
+        MEMORY_FOLD_BATCH of them have. Call after a turn's messages are
+        recorded. Returns the background call's future, or None when no
+        fold is due.
+        """
+        messages = SessionService.get_messages()
+        memory = SessionService.get_memory()
+        fold_until = len(messages) - AIConfig.MEMORY_RECENT_MESSAGES
+
+        with memory.lock:
+            if memory.folding or fold_until - memory.summarized_until < AIConfig.MEMORY_FOLD_BATCH:
+                return None
+            memory.folding = True
+            summary, turns = memory.summary, messages.window(memory.summarized_until, fold_until)
+
+        return cls._get_executor().submit(
+            cls._fold, memory, summary, turns, fold_until, llm_factory
+        )
+
+    # ---------- INTERNAL ----------
+    @classmethod
+    def _fold(
+        cls,
+        memory: ConversationMemory,
+        summary: str,
+        turns: List[ChatMessage],
+        fold_until: int,
+        llm_factory: Callable,
+    ):
+        try:
+            prompt = _SUMMARY_PROMPT.format(
+                summary=summary or "(chưa có)",
+                turns=cls._format_turns(turns),
+                limit=int(AIConfig.MEMORY_SUMMARY_TOKENS / AIConfig.MEMORY_TOKENS_PER_WORD),
+            )
+            with tracer.span("memory_update", messages=len(turns)) as span:
+                response = llm_factory(AIConfig.MEMORY_SUMMARY_TOKENS).invoke(prompt)
+                summary = truncate_to_tokens(
+                    str(response.content).strip(), AIConfig.MEMORY_SUMMARY_TOKENS
+                )
+                span.set(tokens=count_tokens(summary))
+        except Exception as e:
+            # Drop the turns rather than retrying them forever: the memory
+            # must stay bounded even when summarisation is unavailable.
+            logger.warning(f"Conversation summary update failed: {e}")
+        finally:
+            with memory.lock:
+                memory.summary = summary
+                memory.summarized_until = fold_until
+                memory.folding = False
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(
+                    max_workers=AIConfig.MEMORY_FOLD_WORKERS, thread_name_prefix="memory"
+                )
+            return cls._executor
+
+    @classmethod
+    def _rewrite_question(cls, query: str, history: str, llm_factory: Callable) -> str:
+        with tracer.span("query_rewrite") as span:
+            try:
+                prompt = _REWRITE_PROMPT.format(history=history, question=query)
+                response = llm_factory(AIConfig.MEMORY_MESSAGE_TOKENS).invoke(prompt)
+                rewritten = str(response.content).strip()
+            except Exception as e:
+                logger.warning(f"Question rewrite failed, using original: {e}")
+                rewritten = ""
+            span.set(tokens=count_tokens(rewritten))
+
+        return rewritten or query
+
+    @staticmethod
+    def _needs_rewrite(query: str) -> bool:
+        """Very short follow-ups and ones referring back need the history."""
+        query_words = words(query)
+        return (
+            len(query_words) < _MIN_STANDALONE_WORDS
+            or any(w in _CONTEXT_WORDS for w in query_words)
+        )
+
+    @staticmethod
+    def _format_turns(messages: List[ChatMessage]) -> str:
+        return "\n".join(
+            f"{_SPEAKERS.get(m.role, m.role)}: "
+            f"{truncate_to_tokens(m.content, AIConfig.MEMORY_MESSAGE_TOKENS)}"
+            for m in messages
+        )
+
+    @classmethod
+    def _format_history(cls, summary: str, recent: List[ChatMessage]) -> str:
+        parts = []
+        if summary:
+            parts.append(f"Tóm tắt: {summary}")
+        if recent:
+            parts.append(cls._format_turns(recent))
+        return "\n".join(parts)
@@ -1,40 +1,28 @@
-from typing import Dict, Any
-
-from langchain_core.runnables import RunnablePassthrough
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import PromptTemplate
-
+from typing import Any, Dict, List, Optional
+
+from app.config.ai_config import AIConfig
+from app.services.chunk_store import ChunkStore
+from app.services.context_service import ContextService
+from app.services.dedup_service import DedupService
+from app.services.llm_gateway import LLMGateway
+from app.services.memory_service import MemoryService
 from app.services.session_service import SessionService
-from app.config import AIConfig
 from app.utils.logger import logger
+from app.utils.profiling import profiled
+from app.utils.tokenizer import count_tokens
+from app.utils.tracing import tracer
 
 
 class RAGService:
 
     @classmethod
-    def _init_llm(cls):
-        if AIConfig.LLM_PROVIDER == "openai":
-            from langchain_openai import ChatOpenAI
-
-            return ChatOpenAI(
-                model=AIConfig.OPENAI_LLM_MODEL,
-                temperature=0.3,
-                api_key=AIConfig.OPENAI_API_KEY,
-            )
-
-        if AIConfig.LLM_PROVIDER == "groq":
-            from langchain_groq import ChatGroq
-
-            return ChatGroq(
-                model=AIConfig.GROQ_LLM_MODEL,
-                api_key=AIConfig.GROQ_API_KEY,
-                temperature=0.3,
-            )
-
-        raise ValueError("Unsupported LLM provider")
+    def _init_llm(cls, max_tokens: int = None):
+        return LLMGateway.bind(max_tokens)
 
     @classmethod
     def _init_prompt(cls):
+        from langchain_core.prompts import PromptTemplate
+
         return PromptTemplate.from_template(
             """
             Bạn là một trợ lý AI hữu ích.
@@ -51,6 +39,9 @@ class RAGService:
             hãy nói:
             "Tôi không tìm thấy thông tin này trong tài liệu."".
 
+            Lịch sử hội thoại:
+            {history}
+
             Ngữ cảnh:
             {context}
 
@@ -61,13 +52,11 @@ class RAGService:
             """.strip()
         )
 
-    @staticmethod
-    def _format_docs(docs):
-        return "\n\n".join(doc.page_content for doc in docs)
-
     # ---------- PUBLIC ----------
     @classmethod
-    def get_answer(cls, query: str) -> Dict[str, Any]:
+    @profiled("get_answer")
+    def get_answer(cls, query: str, doc_ids: Optional[List[int]] = None) -> Dict[str, Any]:
+        """Answer `query`, searching only `doc_ids` when given (default: all documents)."""
         if not query.strip():
             return cls._error(400, "Query is empty")
 
@@ -77,32 +66,67 @@ class RAGService:
             return cls._error(400, "No documents uploaded yet")
 
         try:
-            retriever = vector_store.as_retriever(
-                search_kwargs={"k": 10}
-            )
+            memory = MemoryService.prepare(query, cls._init_llm)
+            history = memory["history"] or "(chưa có)"
+
+            scope = "all" if doc_ids is None else len(doc_ids)
+            copies = DedupService.copies_for(doc_ids) if doc_ids is not None else None
+            with tracer.span("retrieve", candidates=AIConfig.RETRIEVAL_MAX_K, scope=scope) as span:
+                results = cls._adaptive_cut(vector_store.search_with_similarity(
+                    memory["standalone_question"], AIConfig.RETRIEVAL_MAX_K, doc_ids, copies
+                ))
+                docs = [doc for doc, _ in results]
+                scores = [round(score, 4) for _, score in results]
+                span.set(k=len(docs), top_score=scores[0] if scores else 0.0)
 
-            docs = retriever.invoke(query)
             if not docs:
                 return cls._error(404, "No relevant documents found")
 
-            rag_chain = (
-                {
-                    "context": retriever | cls._format_docs,
-                    "question": RunnablePassthrough(),
-                }
-                | cls._init_prompt()
-                | cls._init_llm()
-                | StrOutputParser()
-            )
-
-            answer = rag_chain.invoke(query)
+            max_tokens = SessionService.get_max_tokens()
+
+            with tracer.span("prompt_build") as span:
+                docs = ChunkStore.resolve(docs)
+                prompt_template = cls._init_prompt()
+                overhead = count_tokens(
+                    prompt_template.format(context="", history=history, question=query)
+                )
+                context, packing = ContextService.assemble(
+                    docs, ContextService.budget_for(overhead, max_tokens)
+                )
+                prompt = prompt_template.invoke({
+                    "context": context,
+                    "history": history,
+                    "question": query,
+                })
+                span.set(
+                    tokens=overhead + packing["context_tokens"],
+                    passages=packing["context_passages"],
+                )
+
+            with tracer.span("llm_call") as span:
+                message = cls._init_llm(max_tokens).invoke(prompt)
+                usage = getattr(message, "usage_metadata", None) or {}
+                span.set(
+                    input_tokens=usage.get("input_tokens", 0),
+                    output_tokens=usage.get("output_tokens", 0),
+                )
+
+            from langchain_core.output_parsers import StrOutputParser
+
+            answer = StrOutputParser().invoke(message)
 
             return {
                 "status_code": 200,
                 "answer": answer.strip(),
                 "message": "OK",
                 "metadata": {
-                    "retrieved_docs_count": len(docs)
+                    "retrieved_docs_count": len(docs),
+                    "retrieval_k": len(docs),
+                    "retrieval_scores": scores,
+                    "standalone_question": memory["standalone_question"],
+                    "history_tokens": count_tokens(memory["history"]),
+                    **packing,
+                    "request_id": tracer.current_request_id(),
                 },
             }
 
@@ -110,6 +134,25 @@ class RAGService:
             logger.exception("RAG failed")
             return cls._error(500, str(e))
 
+    @staticmethod
+    def _adaptive_cut(results):
+        """
+        Keep the best candidates: always RETRIEVAL_MIN_K, then stop at the
+        first one below RETRIEVAL_MIN_SCORE or below RETRIEVAL_RELATIVE_SCORE
+        times the top score. Confident matches yield short prompts, vague
+        questions keep up to RETRIEVAL_MAX_K chunks.
+        """
+        if not results:
+            return results
+
+        top = results[0][1]
+        cutoff = max(AIConfig.RETRIEVAL_MIN_SCORE, top * AIConfig.RETRIEVAL_RELATIVE_SCORE)
+
+        k = AIConfig.RETRIEVAL_MIN_K
+        while k < min(len(results), AIConfig.RETRIEVAL_MAX_K) and results[k][1] >= cutoff:
+            k += 1
+        return results[:k]
+
     @staticmethod
     def _error(code: int, msg: str):
         return {
@@ -0,0 +1,223 @@
+import os
+import shutil
+import threading
+import time
+import uuid
+import weakref
+from typing import Dict, Optional, Set
+
+from app.config.ai_config import AIConfig
+from app.services.chunk_store import ChunkStore
+from app.utils.logger import logger
+
+
+_MB = 1024 * 1024
+
+
+class SessionResources:
+    """
+    Heavy per-session objects, kept in session_state so their lifetime is the
+    session's. The governor only holds weak references to these, which lets
+    it spill idle sessions without keeping closed ones alive.
+    """
+
+    def __init__(self):
+        self.session_id = uuid.uuid4().hex
+        self.vector_store = None
+        self.spill_path: Optional[str] = None
+        self.spill_embedding = None
+        self.spill_bytes = 0
+        self.other_bytes = 0
+        self.blob_ids: Set[str] = set()
+        self.last_access = time.monotonic()
+        self.lock = threading.RLock()
+
+    @property
+    def is_spilled(self) -> bool:
+        return self.spill_path is not None
+
+    def index_bytes(self) -> int:
+        store = self.vector_store
+        return store.nbytes if store is not None else 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.index_bytes() + self.other_bytes
+
+
+class SessionGovernor:
+    """
+    Process-wide memory governor for Streamlit sessions.
+
+    Tracks the approximate footprint of every live session, refuses growth
+    beyond MAX_SESSION_MB per session, and spills vector indexes of sessions
+    idle for SESSION_IDLE_SECONDS (or least recently used ones when the
+    total exceeds MAX_TOTAL_MB) to SPILL_DIR. A spilled index is reloaded
+    transparently the next time its session asks for it.
+
+    It also owns ChunkStore cleanup: blobs that no live session's documents
+    use are deleted when a document is removed or a session is discarded.
+    """
+
+    _lock = threading.Lock()
+    _sessions: "weakref.WeakValueDictionary[str, SessionResources]" = (
+        weakref.WeakValueDictionary()
+    )
+    _blob_sweep_due = False
+
+    # ---------- PUBLIC ----------
+    @classmethod
+    def register(cls, resources: SessionResources):
+        with cls._lock:
+            cls._sessions[resources.session_id] = resources
+        # Remove spill files and saved snapshots once Streamlit discards the
+        # session.
+        for directory in (AIConfig.SPILL_DIR, AIConfig.SNAPSHOT_DIR):
+            weakref.finalize(
+                resources,
+                shutil.rmtree,
+                os.path.join(directory, resources.session_id),
+                True,
+            )
+        # Finalizers can run inside any lock; the blob sweep waits for the
+        # next `sweep` instead.
+        weakref.finalize(resources, setattr, cls, "_blob_sweep_due", True)
+
+    @classmethod
+    def touch(cls, resources: SessionResources, other_bytes: Optional[int] = None):
+        resources.last_access = time.monotonic()
+        if other_bytes is not None:
+            resources.other_bytes = other_bytes
+
+    @classmethod
+    def ensure_capacity(cls, resources: SessionResources, extra_bytes: int):
+        """Raise ValueError if adding `extra_bytes` would exceed the session cap."""
+        limit = AIConfig.MAX_SESSION_MB * _MB
+        projected = resources.nbytes + extra_bytes
+        if projected > limit:
+            raise ValueError(
+                f"Session memory limit reached ({projected / _MB:.0f} MB of "
+                f"{AIConfig.MAX_SESSION_MB} MB). Remove some documents first."
+            )
+        cls._enforce_global_cap(current=resources, extra_bytes=extra_bytes)
+
+    @classmethod
+    def sweep(cls, current: Optional[SessionResources] = None):
+        """Spill idle sessions, then enforce the global cap."""
+        now = time.monotonic()
+        for resources in cls._snapshot():
+            if resources is current or resources.is_spilled:
+                continue
+            if now - resources.last_access >= AIConfig.SESSION_IDLE_SECONDS:
+                cls.spill(resources)
+
+        cls._enforce_global_cap(current=current)
+
+        if cls._blob_sweep_due:
+            cls.sweep_blobs()
+
+    @classmethod
+    def sweep_blobs(cls) -> int:
+        """Delete ChunkStore blobs that no live session's documents use."""
+        cls._blob_sweep_due = False
+        live = set()
+        for resources in cls._snapshot():
+            live.update(resources.blob_ids)
+        return ChunkStore.sweep(live)
+
+    @classmethod
+    def replace(cls, resources: SessionResources, vector_store):
+        """Install a new index for the session, discarding any spilled one."""
+        with resources.lock:
+            if resources.is_spilled:
+                shutil.rmtree(resources.spill_path, ignore_errors=True)
+                resources.spill_path = None
+                resources.spill_embedding = None
+                resources.spill_bytes = 0
+            resources.vector_store = vector_store
+
+    @classmethod
+    def spill(cls, resources: SessionResources) -> bool:
+        with resources.lock:
+            store = resources.vector_store
+            if store is None or resources.is_spilled:
+                return False
+
+            path = os.path.join(AIConfig.SPILL_DIR, resources.session_id)
+            try:
+                os.makedirs(path, exist_ok=True)
+                store.save_local(path)
+            except Exception as e:
+                logger.warning(f"Could not spill session {resources.session_id[:8]}: {e}")
+                return False
+
+            resources.spill_bytes = resources.index_bytes()
+            resources.spill_embedding = store.embeddings
+            resources.spill_path = path
+            resources.vector_store = None
+
+        logger.info(
+            f"Spilled session {resources.session_id[:8]} index "
+            f"({resources.spill_bytes / _MB:.1f} MB) to disk"
+        )
+        return True
+
+    @classmethod
+    def load(cls, resources: SessionResources):
+        """Bring a spilled index back into memory; no-op otherwise."""
+        with resources.lock:
+            if not resources.is_spilled:
+                return resources.vector_store
+
+            from app.services.document_index import DocumentIndex
+
+            resources.vector_store = DocumentIndex.load_local(
+                resources.spill_path, resources.spill_embedding
+            )
+            shutil.rmtree(resources.spill_path, ignore_errors=True)
+            resources.spill_path = None
+            resources.spill_embedding = None
+            resources.spill_bytes = 0
+
+        logger.info(f"Reloaded session {resources.session_id[:8]} index from disk")
+        return resources.vector_store
+
+    @classmethod
+    def stats(cls) -> Dict[str, float]:
+        sessions = cls._snapshot()
+        return {
+            "sessions": len(sessions),
+            "spilled_sessions": sum(1 for r in sessions if r.is_spilled),
+            "total_mb": sum(r.nbytes for r in sessions) / _MB,
+        }
+
+    # ---------- INTERNAL ----------
+    @classmethod
+    def _snapshot(cls):
+        with cls._lock:
+            return list(cls._sessions.values())
+
+    @classmethod
+    def _enforce_global_cap(cls, current=None, extra_bytes: int = 0):
+        limit = AIConfig.MAX_TOTAL_MB * _MB
+        sessions = cls._snapshot()
+        total = sum(r.nbytes for r in sessions) + extra_bytes
+        if total <= limit:
+            return
+
+        candidates = sorted(
+            (r for r in sessions if r is not current and r.vector_store is not None),
+            key=lambda r: r.last_access,
+        )
+        for resources in candidates:
+            if total <= limit:
+                break
+            freed = resources.index_bytes()
+            if cls.spill(resources):
+                total -= freed
+
+        if total > limit:
+            logger.warning(
+                f"Global session memory {total / _MB:.0f} MB still above "
+                f"{AIConfig.MAX_TOTAL_MB} MB after spilling"
+            )
@@ -1,114 +1,412 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 import streamlit as st
 from streamlit.runtime.scriptrunner import get_script_run_ctx
 
+from app.config.app_config import AppConfig
+from app.services.chat_history import ChatHistory, ConversationMemory
+from app.services.session_governor import SessionGovernor, SessionResources
+
+
+class HeadlessState(dict):
+    """
+    Stand-in for st.session_state when services run outside Streamlit
+    (benchmarks, load tests). Supports both item and attribute access.
+    """
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError as e:
+            raise AttributeError(key) from e
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
+_bound_state: ContextVar = ContextVar("bound_session_state", default=None)
+
 
 class SessionService:
     # ---------- Internal ----------
     @staticmethod
     def _has_context():
+        if _bound_state.get() is not None:
+            return True
         try:
             return get_script_run_ctx() is not None
         except Exception:
             return False
 
+    @staticmethod
+    def _state():
+        state = _bound_state.get()
+        return state if state is not None else st.session_state
+
+    @classmethod
+    @contextmanager
+    def bind_state(cls, state: HeadlessState = None):
+        """
+        Run service calls against a private session state without a
+        Streamlit script context. Binding is per thread / asyncio task.
+        """
+        state = state if state is not None else HeadlessState()
+        token = _bound_state.set(state)
+        try:
+            cls.initialize()
+            yield state
+        finally:
+            _bound_state.reset(token)
+
     # ---------- Init ----------
     @classmethod
     def initialize(cls):
         if not cls._has_context():
             return
         
-        if "vector_store" not in st.session_state:
-            st.session_state.vector_store = None
+        state = cls._state()
+
+        if "resources" not in state:
+            state.resources = SessionResources()
+            SessionGovernor.register(state.resources)
+
+        if "documents" not in state:
+            state.documents = []
+            state.next_document_id = 0
+            state.document_scope = []
+
+        if "messages" not in state:
+            state.messages = ChatHistory()
+
+        if "chat_window" not in state:
+            state.chat_window = AppConfig.CHAT_PAGE_SIZE
+
+        if "memory" not in state:
+            state.memory = ConversationMemory()
+
+        if "processing" not in state:
+            state.processing = False
 
-        if "documents" not in st.session_state:
-            st.session_state.documents = []
+        if "temperature" not in state:
+            state.temperature = 0.3
 
-        if "messages" not in st.session_state:
-            st.session_state.messages = []
+        if "max_tokens" not in state:
+            state.max_tokens = 800
 
-        if "processing" not in st.session_state:
-            st.session_state.processing = False
+        if "dedup_index" not in state:
+            state.dedup_index = None
 
-        if "temperature" not in st.session_state:
-            st.session_state.temperature = 0.3
+        if "last_trace" not in state:
+            state.last_trace = None
 
-        if "max_tokens" not in st.session_state:
-            st.session_state.max_tokens = 800
+        SessionGovernor.sweep(current=state.resources)
 
     # ---------- Vector Store ----------
     @classmethod
     def set_vector_store(cls, vector_store):
         if cls._has_context():
-            st.session_state.vector_store = vector_store
+            resources = cls._resources()
+            SessionGovernor.replace(resources, vector_store)
+            SessionGovernor.touch(resources, cls._other_bytes())
 
     @classmethod
     def get_vector_store(cls):
         if not cls._has_context():
             return None
-        return st.session_state.get("vector_store")
+        resources = cls._resources()
+        SessionGovernor.touch(resources)
+        return SessionGovernor.load(resources)
 
     @classmethod
     def clear_vector_store(cls):
         if cls._has_context():
-            st.session_state.vector_store = None
+            cls.set_vector_store(None)
+
+    # ---------- Memory Governor ----------
+    @classmethod
+    def get_session_id(cls) -> str:
+        return cls._resources().session_id
+
+    @classmethod
+    def _resources(cls) -> SessionResources:
+        state = cls._state()
+        if "resources" not in state:
+            cls.initialize()
+        return state.resources
+
+    @classmethod
+    def _other_bytes(cls) -> int:
+        """Approximate size of everything but the vector index."""
+        state = cls._state()
+        total = len(state.get("documents", [])) * 1024
+        messages = state.get("messages")
+        if messages is not None:
+            total += messages.nbytes
+        dedup_index = state.get("dedup_index")
+        if dedup_index is not None:
+            total += dedup_index.nbytes
+        return total
+
+    @classmethod
+    def ensure_capacity(cls, extra_bytes: int):
+        """Raise ValueError if the session cannot grow by `extra_bytes`."""
+        if cls._has_context():
+            resources = cls._resources()
+            SessionGovernor.touch(resources, cls._other_bytes())
+            SessionGovernor.ensure_capacity(resources, extra_bytes)
+
+    @classmethod
+    def get_memory_usage(cls) -> dict:
+        if not cls._has_context():
+            return {}
+        resources = cls._resources()
+        SessionGovernor.touch(resources, cls._other_bytes())
+        return {
+            "session_mb": resources.nbytes / (1024 * 1024),
+            "index_mb": resources.index_bytes() / (1024 * 1024),
+            **SessionGovernor.stats(),
+        }
 
     # ---------- Documents ----------
     @classmethod
     def add_document(cls, doc_data: dict):
         if cls._has_context():
-            st.session_state.documents.append(doc_data)
+            cls._state().documents.append(doc_data)
+            cls._track_blobs(sweep=False)
 
     @classmethod
-    def remove_document(cls, index: int):
-        if cls._has_context() and 0 <= index < len(st.session_state.documents):
-            st.session_state.documents.pop(index)
+    def remove_document(cls, index: int) -> list:
+        """
+        Remove the document at `index`. Returns the metadata of copies that
+        other documents held of its chunks; see `discard_document_data`.
+        """
+        if not cls._has_context() or not 0 <= index < len(cls._state().documents):
+            return []
+        doc = cls._state().documents.pop(index)
+        cls._state().document_scope = [
+            doc_id for doc_id in cls.get_document_scope() if doc_id != doc.get("id")
+        ]
+        return cls.discard_document_data(doc.get("id"))
+
+    @classmethod
+    def discard_document_data(cls, doc_id: int) -> list:
+        """
+        Drop a document's sub-index and dedup entries. Returns the metadata
+        of chunks in other documents that were dropped as copies of this
+        one's; they are in no index now (IngestionService re-admits them).
+        """
+        if not cls._has_context():
+            return []
+
+        orphans = []
+        dedup_index = cls._state().get("dedup_index")
+        if dedup_index is not None:
+            orphans = dedup_index.remove_document(doc_id)["orphans"]
+
+        document_index = cls.get_vector_store()
+        if document_index is not None:
+            document_index.remove_document(doc_id)
+            if not len(document_index):
+                cls.clear_vector_store()
+        cls._track_blobs()
+        return orphans
+
+    @classmethod
+    def next_document_id(cls) -> int:
+        """Ids are never reused, so stale references cannot alias a new upload."""
+        if not cls._has_context():
+            return 0
+        state = cls._state()
+        doc_id = state.get("next_document_id", 0)
+        state.next_document_id = doc_id + 1
+        return doc_id
+
+    @classmethod
+    def peek_next_document_id(cls) -> int:
+        """The id the next upload will get, without reserving it."""
+        if not cls._has_context():
+            return 0
+        return cls._state().get("next_document_id", 0)
+
+    @classmethod
+    def get_document_scope(cls):
+        """Ids of the documents questions are restricted to; empty means all."""
+        if not cls._has_context():
+            return []
+        return list(cls._state().get("document_scope", []))
 
     @classmethod
     def clear_documents(cls):
         if cls._has_context():
-            st.session_state.documents = []
+            cls._state().documents = []
+
+    @classmethod
+    def clear_all_documents(cls, sweep: bool = True):
+        """Drop documents together with the index and dedup state built from them."""
+        if cls._has_context():
+            cls.clear_documents()
+            cls._state().document_scope = []
+            cls._state().dedup_index = None
+            cls.clear_vector_store()
+            cls._track_blobs(sweep)
+
+    @classmethod
+    def restore_documents(cls, documents, next_document_id: int, vector_store, dedup_index):
+        """Replace the whole knowledge base, e.g. from a snapshot."""
+        if not cls._has_context():
+            return
+        # Sweep only once the new documents claim their blobs.
+        cls.clear_all_documents(sweep=False)
+        state = cls._state()
+        state.documents = list(documents)
+        state.next_document_id = max(next_document_id, state.get("next_document_id", 0))
+        state.dedup_index = dedup_index
+        cls.set_vector_store(vector_store)
+        cls._track_blobs()
 
     @classmethod
     def get_documents(cls):
         if not cls._has_context():
             return []
 
-        if "documents" not in st.session_state:
-            st.session_state.documents = []
+        if "documents" not in cls._state():
+            cls._state().documents = []
 
-        return st.session_state.documents
+        return cls._state().documents
+
+    @classmethod
+    def get_document_by_id(cls, doc_id: int):
+        if not cls._has_context():
+            return None
+
+        return next(
+            (doc for doc in cls._state().get("documents", []) if doc.get("id") == doc_id),
+            None,
+        )
 
     @classmethod
     def document_exists(cls, filename: str) -> bool:
+        return cls.get_document(filename) is not None
+
+    @classmethod
+    def get_document(cls, filename: str):
         if not cls._has_context():
-            return False
+            return None
 
-        return any(
-            doc.get("name") == filename
-            for doc in st.session_state.get("documents", [])
+        return next(
+            (doc for doc in cls._state().get("documents", []) if doc.get("name") == filename),
+            None,
         )
 
+    @classmethod
+    def replace_document(cls, doc_data: dict):
+        """Swap in a new version of the document with the same id."""
+        if not cls._has_context():
+            return
+        documents = cls._state().documents
+        for i, doc in enumerate(documents):
+            if doc.get("id") == doc_data["id"]:
+                documents[i] = doc_data
+                break
+        else:
+            documents.append(doc_data)
+        cls._track_blobs()
+
+    @classmethod
+    def _track_blobs(cls, sweep: bool = True):
+        """
+        Publish the ChunkStore blobs this session's pages use to the
+        governor and, with `sweep`, delete the ones no session uses.
+        """
+        cls._resources().blob_ids = {
+            page["blob_id"]
+            for doc in cls._state().get("documents", [])
+            for page in doc.get("pages", [])
+            if page.get("blob_id")
+        }
+        if sweep:
+            SessionGovernor.sweep_blobs()
+
+    # ---------- Deduplication ----------
+    @classmethod
+    def get_dedup_index(cls):
+        if not cls._has_context():
+            return None
+        return cls._state().get("dedup_index")
+
+    @classmethod
+    def set_dedup_index(cls, index):
+        if cls._has_context():
+            cls._state().dedup_index = index
+
     # ---------- Messages ----------
     @classmethod
     def add_message(cls, role: str, content: str, timestamp: str):
         if cls._has_context():
-            st.session_state.messages.append({
-                "role": role,
-                "content": content,
-                "timestamp": timestamp
-            })
+            cls._state().messages.append(role, content, timestamp)
 
     @classmethod
     def clear_chat_history(cls):
         if cls._has_context():
-            st.session_state.messages = []
+            cls._state().messages = ChatHistory()
+            cls._state().chat_window = AppConfig.CHAT_PAGE_SIZE
+            cls._state().memory = ConversationMemory()
 
     @classmethod
     def get_messages(cls):
         if not cls._has_context():
             return []
 
-        if "messages" not in st.session_state:
-            st.session_state.messages = []
+        if "messages" not in cls._state():
+            cls._state().messages = ChatHistory()
 
-        return st.session_state.messages
+        return cls._state().messages
+
+    @classmethod
+    def get_chat_window(cls) -> int:
+        if not cls._has_context():
+            return AppConfig.CHAT_PAGE_SIZE
+        return cls._state().get("chat_window", AppConfig.CHAT_PAGE_SIZE)
+
+    @classmethod
+    def show_earlier_messages(cls):
+        if cls._has_context():
+            cls._state().chat_window = cls.get_chat_window() + AppConfig.CHAT_PAGE_SIZE
+
+    # ---------- Conversation Memory ----------
+    @classmethod
+    def get_memory(cls) -> ConversationMemory:
+        """The session's rolling summary; a detached empty one without a session."""
+        if not cls._has_context():
+            return ConversationMemory()
+        state = cls._state()
+        if "memory" not in state:
+            state.memory = ConversationMemory()
+        return state.memory
+
+    # ---------- Settings ----------
+    @classmethod
+    def get_max_tokens(cls) -> int:
+        if not cls._has_context():
+            return 800
+        return cls._state().get("max_tokens", 800)
+
+    # ---------- Tracing ----------
+    @classmethod
+    def set_last_trace(cls, trace: dict):
+        if cls._has_context():
+            cls._state().last_trace = trace
+
+    @classmethod
+    def get_last_trace(cls):
+        if not cls._has_context():
+            return None
+        return cls._state().get("last_trace")
+
+    @classmethod
+    def is_profiling_requested(cls) -> bool:
+        """Set by the debug panel's profiling toggle."""
+        if not cls._has_context():
+            return False
+        return bool(cls._state().get("profile_requests", False))
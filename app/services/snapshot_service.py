@@ -0,0 +1,381 @@
+import json
+import mmap
+import os
+import re
+import struct
+import time
+from typing import Any, BinaryIO, Dict, List, Tuple
+
+from app.config.ai_config import AIConfig
+from app.services.chunk_store import ChunkStore
+from app.services.dedup_service import DedupIndex
+from app.services.document_index import DocumentIndex
+from app.services.embedding_service import EmbeddingService
+from app.services.session_service import SessionService
+from app.utils.logger import logger
+from app.utils.tracing import tracer
+
+
+SNAPSHOT_VERSION = 2
+SNAPSHOT_EXTENSION = ".ragsnap"
+
+_MAGIC = b"RAGSNAP\0"
+_PREAMBLE = struct.Struct("<8sIQ")  # magic, format version, header length
+_ALIGN = 64
+_NAME_RE = re.compile(r"[^\w.-]+")
+
+
+class SnapshotService:
+    """
+    Single-file knowledge-base snapshots.
+
+    Layout: a fixed preamble, a JSON header (documents, chunk metadata,
+    segment table) and a data section of 64-byte aligned segments holding
+    raw float32 vectors, the ChunkStore blobs exactly as compressed on disk
+    and the MinHash signatures. Restoring a saved file memory-maps it and
+    hands the vector segments to FAISS as-is: nothing is re-extracted,
+    re-embedded or recompressed.
+
+    Saved snapshots live in a per-session folder, are listed and restorable
+    only by that session and are deleted with it; downloading is the way to
+    keep one.
+    """
+
+    # ========= PUBLIC API =========
+    @classmethod
+    def write(cls, out: BinaryIO, embedding=None) -> Dict[str, Any]:
+        """Write the current session's knowledge base to `out`."""
+        document_index = SessionService.get_vector_store()
+        documents = SessionService.get_documents()
+        if not documents:
+            raise ValueError("No documents to snapshot")
+
+        embedding = embedding or (
+            document_index.embeddings if document_index is not None
+            else EmbeddingService.get_huggingface_embedding()
+        )
+
+        with tracer.span("snapshot_write", documents=len(documents)) as span:
+            segments: List[Any] = []
+            header = {
+                "version": SNAPSHOT_VERSION,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                "embedding_model": EmbeddingService.model_id(embedding),
+                "next_document_id": SessionService.peek_next_document_id(),
+                "documents": documents,
+                "indexes": {},
+                "blobs": {},
+                "dedup": None,
+            }
+
+            blob_ids = {
+                page["blob_id"]
+                for doc in documents
+                for page in doc.get("pages", [])
+                if page.get("blob_id")
+            }
+            for doc_id, store in (document_index.stores.items() if document_index else ()):
+                entry, vectors = cls._export_store(store)
+                entry["vectors"] = cls._add_segment(segments, vectors.tobytes())
+                header["indexes"][str(doc_id)] = entry
+                blob_ids.update(m["blob_id"] for m in entry["metadatas"] if m.get("blob_id"))
+
+            dedup_index = SessionService.get_dedup_index()
+            if dedup_index is not None:
+                blob_ids.update(
+                    m["blob_id"] for m in dedup_index.copies.values() if m.get("blob_id")
+                )
+
+            for blob_id in sorted(blob_ids):
+                header["blobs"][blob_id] = cls._add_segment(
+                    segments, ChunkStore.read_compressed(blob_id)
+                )
+
+            if dedup_index is not None and dedup_index.signatures:
+                import numpy as np
+
+                refs = list(dedup_index.signatures)
+                signatures = np.array(
+                    [dedup_index.signatures[ref] for ref in refs], dtype=np.uint32
+                )
+                header["dedup"] = {
+                    "num_perm": dedup_index.num_perm,
+                    "bands": dedup_index.bands,
+                    "refs": refs,
+                    "signatures": cls._add_segment(segments, signatures.tobytes()),
+                    "duplicates": [[kept, refs] for kept, refs in dedup_index.duplicates.items()],
+                    "copies": [[ref, metadata] for ref, metadata in dedup_index.copies.items()],
+                }
+
+            size = cls._write_file(out, header, segments)
+            span.set(bytes=size, vectors=sum(e["count"] for e in header["indexes"].values()))
+
+        logger.info(f"Snapshot written: {len(documents)} document(s), {size / 1024:.0f} KB")
+        return {"documents": len(documents), "bytes": size}
+
+    @classmethod
+    def save(cls, name: str = None, embedding=None) -> Dict[str, Any]:
+        """Write a snapshot into this session's folder under SNAPSHOT_DIR."""
+        name = _NAME_RE.sub("_", name or time.strftime("snapshot-%Y%m%d-%H%M%S"))
+        directory = cls._session_dir()
+        path = os.path.join(directory, name + SNAPSHOT_EXTENSION)
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                info = cls.write(f, embedding)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.exception("Snapshot export failed")
+            return cls._error(500, str(e))
+
+        return {
+            "status_code": 200,
+            "message": f"Snapshot saved: {os.path.basename(path)}",
+            "path": path,
+            **info,
+        }
+
+    @classmethod
+    def list_saved(cls) -> List[str]:
+        """Snapshots saved by the current session, newest first."""
+        directory = cls._session_dir()
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            (
+                os.path.join(directory, name)
+                for name in os.listdir(directory)
+                if name.endswith(SNAPSHOT_EXTENSION)
+            ),
+            reverse=True,
+        )
+
+    @classmethod
+    def restore(cls, source, embedding=None) -> Dict[str, Any]:
+        """
+        Replace the session's knowledge base with a snapshot. `source` is a
+        path saved by this session (memory-mapped) or an uploaded file-like
+        object.
+        """
+        if isinstance(source, (str, os.PathLike)) and not cls._is_own(source):
+            return cls._error(403, "Snapshot belongs to another session")
+
+        try:
+            embedding = embedding or EmbeddingService.get_huggingface_embedding()
+        except Exception as e:
+            logger.exception("Embedding model unavailable")
+            return cls._error(500, str(e))
+
+        with tracer.span("snapshot_restore") as span:
+            if isinstance(source, (str, os.PathLike)):
+                with open(source, "rb") as f, \
+                        mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    result = cls._restore(mapped, embedding)
+            else:
+                data = source.getvalue() if hasattr(source, "getvalue") else source.read()
+                result = cls._restore(data, embedding)
+            span.set(status=result["status_code"])
+
+        return result
+
+    # ========= INTERNAL =========
+    @classmethod
+    def _restore(cls, buffer, embedding) -> Dict[str, Any]:
+        # Errors are turned into results here so that no traceback keeps
+        # numpy views of a memory map alive past its close().
+        try:
+            header, data_start = cls._read_header(buffer)
+
+            model = EmbeddingService.model_id(embedding)
+            if header["embedding_model"] != model:
+                return cls._error(
+                    409,
+                    f"Snapshot was built with {header['embedding_model']}, "
+                    f"current model is {model}",
+                )
+
+            cls._check_blob_references(header)
+
+            indexes = header["indexes"]
+            SessionService.ensure_capacity(
+                sum(entry["vectors"][1] for entry in indexes.values())
+            )
+
+            for blob_id, (offset, length) in header["blobs"].items():
+                start = data_start + offset
+                ChunkStore.put_compressed(blob_id, buffer[start:start + length])
+
+            document_index = DocumentIndex(embedding)
+            for doc_id, entry in indexes.items():
+                document_index.add_document(
+                    int(doc_id), cls._import_store(buffer, data_start, entry, embedding)
+                )
+
+            SessionService.restore_documents(
+                header["documents"],
+                header["next_document_id"],
+                document_index if len(document_index) else None,
+                cls._import_dedup(buffer, data_start, header.get("dedup")),
+            )
+
+        except Exception as e:
+            logger.exception("Snapshot restore failed")
+            return cls._error(422, f"Invalid snapshot: {e}")
+
+        documents = header["documents"]
+        logger.info(f"Snapshot restored: {len(documents)} document(s)")
+        return {
+            "status_code": 200,
+            "message": f"Restored {len(documents)} document(s)",
+            "documents": len(documents),
+        }
+
+    @staticmethod
+    def _check_blob_references(header: Dict[str, Any]):
+        """
+        Every blob id in the file must be well-formed and shipped with it:
+        ids become ChunkStore paths, and a snapshot must not reach blobs of
+        other sessions.
+        """
+        shipped = set(header["blobs"])
+        if not all(ChunkStore.is_blob_id(blob_id) for blob_id in shipped):
+            raise ValueError("malformed blob id")
+
+        dedup = header.get("dedup") or {}
+        metadatas = [m for entry in header["indexes"].values() for m in entry["metadatas"]]
+        metadatas += [metadata for _, metadata in dedup.get("copies", [])]
+        metadatas += [page for doc in header["documents"] for page in doc.get("pages", [])]
+        for metadata in metadatas:
+            blob_id = metadata.get("blob_id")
+            if blob_id is not None and blob_id not in shipped:
+                raise ValueError(f"reference to a blob not in the snapshot: {blob_id!r}")
+
+    @staticmethod
+    def _session_dir() -> str:
+        return os.path.join(AIConfig.SNAPSHOT_DIR, SessionService.get_session_id())
+
+    @classmethod
+    def _is_own(cls, path) -> bool:
+        directory = os.path.realpath(cls._session_dir())
+        return os.path.dirname(os.path.realpath(path)) == directory
+
+    @staticmethod
+    def _export_store(store) -> Tuple[Dict[str, Any], Any]:
+        index = store.index
+        ids = [store.index_to_docstore_id[i] for i in range(index.ntotal)]
+        documents = [store.docstore.search(doc_id) for doc_id in ids]
+        entry = {
+            "dim": index.d,
+            "count": index.ntotal,
+            "ids": ids,
+            "texts": [doc.page_content for doc in documents],
+            "metadatas": [doc.metadata for doc in documents],
+        }
+        return entry, index.reconstruct_n(0, index.ntotal)
+
+    @staticmethod
+    def _import_store(buffer, data_start: int, entry: Dict[str, Any], embedding):
+        import faiss
+        import numpy as np
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+        from langchain_core.documents import Document
+
+        offset, length = entry["vectors"]
+        count, dim = entry["count"], entry["dim"]
+        if length != count * dim * 4:
+            raise ValueError("vector segment size mismatch")
+
+        index = faiss.IndexFlatL2(dim)
+        if count:
+            vectors = np.frombuffer(
+                buffer, dtype=np.float32, count=count * dim, offset=data_start + offset
+            ).reshape(count, dim)
+            index.add(vectors)
+            del vectors
+
+        docstore = InMemoryDocstore({
+            doc_id: Document(page_content=text, metadata=metadata)
+            for doc_id, text, metadata in zip(entry["ids"], entry["texts"], entry["metadatas"])
+        })
+        return FAISS(
+            embedding_function=embedding,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=dict(enumerate(entry["ids"])),
+        )
+
+    @staticmethod
+    def _import_dedup(buffer, data_start: int, dedup):
+        if not dedup:
+            return None
+        if (dedup["num_perm"], dedup["bands"]) != (AIConfig.DEDUP_NUM_PERM, AIConfig.DEDUP_BANDS):
+            logger.warning("Snapshot dedup settings differ; starting a fresh dedup index")
+            return None
+
+        import numpy as np
+
+        offset, _ = dedup["signatures"]
+        refs = [tuple(ref) for ref in dedup["refs"]]
+        signatures = np.frombuffer(
+            buffer, dtype=np.uint32, count=len(refs) * dedup["num_perm"],
+            offset=data_start + offset,
+        ).reshape(len(refs), dedup["num_perm"])
+
+        index = DedupIndex(dedup["num_perm"], dedup["bands"])
+        for ref, signature in zip(refs, signatures.tolist()):
+            index.add(ref, tuple(signature))
+        del signatures
+        for kept, duplicates in dedup["duplicates"]:
+            index.duplicates[tuple(kept)] = [tuple(ref) for ref in duplicates]
+        for ref, metadata in dedup["copies"]:
+            index.copies[tuple(ref)] = metadata
+        return index
+
+    @staticmethod
+    def _add_segment(segments: List[Any], data) -> List[int]:
+        """Queue `data` for the data section; returns its [offset, length]."""
+        offset = sum(_padded(len(segment)) for segment in segments)
+        segments.append(data)
+        return [offset, len(data)]
+
+    @staticmethod
+    def _write_file(out: BinaryIO, header: Dict[str, Any], segments: List[Any]) -> int:
+        header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        # Pad with JSON-neutral spaces so the data section starts aligned.
+        end = _PREAMBLE.size + len(header_bytes)
+        header_bytes += b" " * (_padded(end) - end)
+
+        out.write(_PREAMBLE.pack(_MAGIC, SNAPSHOT_VERSION, len(header_bytes)))
+        out.write(header_bytes)
+        size = _PREAMBLE.size + len(header_bytes)
+        for segment in segments:
+            out.write(segment)
+            out.write(b"\0" * (_padded(len(segment)) - len(segment)))
+            size += _padded(len(segment))
+        return size
+
+    @staticmethod
+    def _read_header(buffer) -> Tuple[Dict[str, Any], int]:
+        magic, version, header_len = _PREAMBLE.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError("not a snapshot file")
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {version}")
+
+        start = _PREAMBLE.size
+        header = json.loads(bytes(buffer[start:start + header_len]).decode("utf-8"))
+        return header, start + header_len
+
+    @staticmethod
+    def _error(status: int, message: str) -> Dict[str, Any]:
+        return {
+            "status_code": status,
+            "message": message,
+        }
+
+
+def _padded(length: int) -> int:
+    return (length + _ALIGN - 1) // _ALIGN * _ALIGN
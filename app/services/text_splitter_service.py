@@ -1,8 +1,8 @@
-from typing import List
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing import List, Sequence, Tuple
 
 from app.config import AIConfig
 from app.utils.logger import logger
+from app.utils.tracing import tracer
 
 
 class TextSplitterService:
@@ -16,7 +16,72 @@ class TextSplitterService:
         if not text or not text.strip():
             raise ValueError("Text is empty, cannot split")
 
-        splitter = RecursiveCharacterTextSplitter(
+        splitter = cls._splitter()
+
+        with tracer.span("split", chars=len(text)) as span:
+            chunks = splitter.split_text(text)
+            span.set(chunks=len(chunks))
+
+        logger.info(
+            f"Split text into {len(chunks)} chunks "
+            f"(chunk_size={AIConfig.CHUNK_SIZE}, overlap={AIConfig.CHUNK_OVERLAP})"
+        )
+
+        return chunks
+
+    @classmethod
+    def split_pages(
+        cls,
+        text: str,
+        page_offsets: Sequence[Tuple[int, int]],
+    ) -> List[Tuple[int, str, int]]:
+        """
+        Split each page on its own so no chunk spans two pages, which lets a
+        changed page be re-indexed without touching its neighbours.
+        Returns (page_number, chunk, start offset in `text`) triples.
+        """
+        splitter = cls._splitter()
+        bounds = [start for _, start in page_offsets[1:]] + [len(text)]
+        result = []
+
+        with tracer.span("split", chars=len(text), pages=len(page_offsets)) as span:
+            for (page, start), end in zip(page_offsets, bounds):
+                page_text = text[start:end]
+                if not page_text.strip():
+                    continue
+                chunks = splitter.split_text(page_text)
+                for chunk, offset in zip(chunks, cls.locate(page_text, chunks)):
+                    result.append((page, chunk, start + offset if offset >= 0 else -1))
+            span.set(chunks=len(result))
+
+        logger.info(f"Split {len(page_offsets)} page(s) into {len(result)} chunks")
+        return result
+
+    @classmethod
+    def locate(cls, text: str, chunks: List[str]) -> List[int]:
+        """
+        Start offset of each chunk in the source text, so overlapping
+        neighbours can be stitched back together at prompt-build time.
+        """
+        offsets = []
+        index, previous_len = 0, 0
+
+        for chunk in chunks:
+            search_from = max(0, index + previous_len - AIConfig.CHUNK_OVERLAP)
+            found = text.find(chunk, search_from)
+            if found < 0:
+                found = text.find(chunk)
+            offsets.append(found)
+            if found >= 0:
+                index, previous_len = found, len(chunk)
+
+        return offsets
+
+    @staticmethod
+    def _splitter():
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+        return RecursiveCharacterTextSplitter(
             chunk_size=AIConfig.CHUNK_SIZE,
             chunk_overlap=AIConfig.CHUNK_OVERLAP,
             separators=[
@@ -27,12 +92,3 @@ class TextSplitterService:
                 ""
             ],
         )
-
-        chunks = splitter.split_text(text)
-
-        logger.info(
-            f"Split text into {len(chunks)} chunks "
-            f"(chunk_size={AIConfig.CHUNK_SIZE}, overlap={AIConfig.CHUNK_OVERLAP})"
-        )
-
-        return chunks
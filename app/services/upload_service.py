@@ -0,0 +1,231 @@
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from app.config.ai_config import AIConfig
+from app.config.app_config import AppConfig
+from app.utils.logger import logger
+from app.utils.tracing import tracer
+
+
+class SpooledUpload:
+    """
+    An upload streamed to a file under UPLOAD_DIR. Exposes the parts of
+    Streamlit's UploadedFile that FileService uses, plus `path` so that
+    pdfplumber and PIL read from disk instead of an in-memory buffer.
+    """
+
+    def __init__(self, name: str, file_type: str, size: int, path: str, owned: bool):
+        self.name = name
+        self.type = file_type
+        self.size = size
+        self.path = path
+        self.triage: Optional[Dict[str, Any]] = None
+        self._owned = owned
+        self._file_handle = None
+
+    def __fspath__(self):
+        return self.path
+
+    def read(self, size=-1):
+        if self._file_handle is None:
+            self._file_handle = open(self.path, "rb")
+        return self._file_handle.read(size)
+
+    def seek(self, pos):
+        if self._file_handle is None:
+            self._file_handle = open(self.path, "rb")
+        return self._file_handle.seek(pos)
+
+    def close(self):
+        """Close the handle and delete the spool file if this upload made it."""
+        if self._file_handle:
+            self._file_handle.close()
+            self._file_handle = None
+        if self._owned:
+            self._owned = False
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class UploadService:
+    """
+    Upload intake
+    spool to disk (byte limit) -> PDF triage (page limit, text / scanned / mixed)
+
+    Runs before any extraction so oversized files are refused early and
+    scanned PDFs are routed to OCR, while the body is never held in RAM
+    as a whole.
+    """
+
+    # ========= PUBLIC API =========
+    @classmethod
+    def spool(cls, uploaded_file) -> Dict[str, Any]:
+        name = getattr(uploaded_file, "name", "Unknown")
+        file_type = getattr(uploaded_file, "type", "Unknown")
+        max_bytes = AppConfig.MAX_FILE_SIZE_MB * 1024 * 1024
+
+        size = getattr(uploaded_file, "size", None)
+        if size is not None and size > max_bytes:
+            return cls._too_large(name, size)
+
+        with tracer.span("spool", bytes=size or 0) as span:
+            existing = getattr(uploaded_file, "path", None)
+            if existing:
+                # Already on disk (e.g. a file picked from a folder): no copy.
+                upload = SpooledUpload(
+                    name, file_type, os.path.getsize(existing), existing, owned=False
+                )
+            else:
+                try:
+                    upload = cls._write_spool(uploaded_file, name, file_type, max_bytes)
+                except OSError as e:
+                    logger.exception("Spooling upload failed")
+                    return cls._error(500, f"Could not store upload: {e}")
+                if upload is None:
+                    return cls._too_large(name)
+            span.set(bytes=upload.size)
+
+        if file_type == "application/pdf":
+            result = cls._check_pdf(upload)
+            if result is not None:
+                upload.close()
+                return result
+
+        return {
+            "status_code": 200,
+            "message": f"Received: {name} ({upload.size / (1024 * 1024):.1f} MB)",
+            "upload": upload,
+        }
+
+    @classmethod
+    def triage(cls, path: str) -> Dict[str, Any]:
+        """
+        Classify a PDF from a handful of evenly spaced pages: a page is
+        text if it has a text layer, image if a picture covers most of it
+        without one, blank otherwise. Only the sampled pages are parsed.
+        """
+        import pdfplumber
+
+        with tracer.span("triage") as span, pdfplumber.open(path) as pdf:
+            total_pages = len(pdf.pages)
+            sampled = cls._sample_pages(total_pages, AIConfig.PDF_TRIAGE_SAMPLE_PAGES)
+            kinds = {}
+            for index in sampled:
+                page = pdf.pages[index]
+                kinds[index + 1] = cls._page_kind(page)
+                page.close()
+
+            text_pages = sum(kind == "text" for kind in kinds.values())
+            image_pages = sum(kind == "image" for kind in kinds.values())
+            if image_pages and not text_pages:
+                kind = "scanned"
+            elif image_pages:
+                kind = "mixed"
+            else:
+                kind = "text"
+            span.set(kind=kind, pages=total_pages, sampled=len(sampled))
+
+        logger.info(
+            f"PDF triage: {kind} ({text_pages} text / {image_pages} image "
+            f"of {len(sampled)} sampled, {total_pages} page(s))"
+        )
+        return {
+            "kind": kind,
+            "total_pages": total_pages,
+            "sampled_pages": kinds,
+        }
+
+    # ========= INTERNAL =========
+    @staticmethod
+    def _write_spool(uploaded_file, name: str, file_type: str, max_bytes: int):
+        """Stream the upload to UPLOAD_DIR; None once it exceeds `max_bytes`."""
+        os.makedirs(AIConfig.UPLOAD_DIR, exist_ok=True)
+        suffix = os.path.splitext(name)[1].lower()
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix="upload-", dir=AIConfig.UPLOAD_DIR)
+
+        written = 0
+        try:
+            if hasattr(uploaded_file, "seek"):
+                uploaded_file.seek(0)
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    block = uploaded_file.read(AIConfig.UPLOAD_SPOOL_CHUNK_BYTES)
+                    if not block:
+                        break
+                    written += len(block)
+                    if written > max_bytes:
+                        break
+                    out.write(block)
+        except BaseException:
+            os.remove(path)
+            raise
+
+        if written > max_bytes:
+            os.remove(path)
+            return None
+        return SpooledUpload(name, file_type, written, path, owned=True)
+
+    @classmethod
+    def _check_pdf(cls, upload: SpooledUpload) -> Optional[Dict[str, Any]]:
+        try:
+            upload.triage = cls.triage(upload.path)
+        except Exception as e:
+            logger.exception("PDF triage failed")
+            return cls._error(422, f"Unreadable PDF: {e}")
+
+        total_pages = upload.triage["total_pages"]
+        if total_pages > AppConfig.MAX_PDF_PAGES:
+            return cls._error(
+                413,
+                f"PDF has {total_pages} pages; the limit is {AppConfig.MAX_PDF_PAGES}",
+            )
+        if upload.triage["kind"] == "scanned" and total_pages > AIConfig.PDF_OCR_MAX_PAGES:
+            return cls._error(
+                413,
+                f"Scanned PDF has {total_pages} pages; OCR is limited to "
+                f"{AIConfig.PDF_OCR_MAX_PAGES} pages per document",
+            )
+        return None
+
+    @staticmethod
+    def _sample_pages(total_pages: int, samples: int) -> List[int]:
+        """0-based indexes of up to `samples` pages, first and last included."""
+        if total_pages <= samples:
+            return list(range(total_pages))
+        if samples <= 1:
+            return [0]
+        step = (total_pages - 1) / (samples - 1)
+        return sorted({round(i * step) for i in range(samples)})
+
+    @staticmethod
+    def _page_kind(page) -> str:
+        if len(page.chars) >= AIConfig.PDF_TEXT_MIN_CHARS:
+            return "text"
+
+        page_area = float(page.width * page.height) or 1.0
+        image_area = sum(
+            abs((image["x1"] - image["x0"]) * (image["bottom"] - image["top"]))
+            for image in page.images
+        )
+        if image_area / page_area >= AIConfig.PDF_SCANNED_IMAGE_COVERAGE:
+            return "image"
+        return "blank"
+
+    @classmethod
+    def _too_large(cls, name: str, size: Optional[int] = None) -> Dict[str, Any]:
+        actual = f" ({size / (1024 * 1024):.1f} MB)" if size else ""
+        return cls._error(
+            413, f"{name}{actual} exceeds the {AppConfig.MAX_FILE_SIZE_MB} MB upload limit"
+        )
+
+    @staticmethod
+    def _error(status: int, message: str) -> Dict[str, Any]:
+        logger.error(message)
+        return {
+            "status_code": status,
+            "message": message,
+            "upload": None,
+        }
@@ -1,35 +1,117 @@
-from typing import List
-from langchain_community.vectorstores import FAISS
-from langchain_core.documents import Document
-
+from typing import Dict, List, Optional
 
+from app.services.chunk_store import ChunkStore
+from app.services.document_index import DocumentIndex
 from app.services.session_service import SessionService
 from app.utils.logger import logger
+from app.utils.tracing import tracer
 
 
 class VectorStoreService:
     """
     RAM-only Vector Store Service
+    One FAISS sub-index per document, grouped in a session DocumentIndex
     """
 
     @classmethod
-    def build_from_chunks(cls, chunks: List[str], embedding):
+    def build_from_chunks(
+        cls,
+        chunks: List[str],
+        embedding,
+        metadatas: Optional[List[Dict]] = None,
+        doc_id: Optional[int] = None,
+        ids: Optional[List[str]] = None,
+    ):
         """
-        Build FAISS vector store from text chunks
+        Build the FAISS sub-index for one document from its text chunks and
+        add it to the session's DocumentIndex. `doc_id` defaults to the
+        `doc_id` in the first chunk's metadata.
+        Chunks whose metadata references a ChunkStore blob are stored
+        without their text; it is resolved at prompt-build time.
         """
         if not chunks:
             raise ValueError("Chunks is empty")
 
         logger.info(f"Building vector store from {len(chunks)} chunks")
 
-        docs = [Document(page_content=chunk) for chunk in chunks]
-        vector_store = FAISS.from_documents(docs, embedding)
+        metadatas = metadatas or [{} for _ in chunks]
+        if doc_id is None:
+            doc_id = metadatas[0].get("doc_id", 0)
+
+        text_embeddings = cls._embed(chunks, embedding, metadatas)
+
+        from langchain_community.vectorstores import FAISS
+
+        with tracer.span("index_build", vectors=len(text_embeddings)):
+            vector_store = FAISS.from_embeddings(
+                text_embeddings=text_embeddings,
+                embedding=embedding,
+                metadatas=metadatas,
+                ids=ids,
+            )
 
-        SessionService.set_vector_store(vector_store)
+        document_index = SessionService.get_vector_store()
+        if document_index is None:
+            document_index = DocumentIndex(embedding)
+        document_index.add_document(doc_id, vector_store)
+        SessionService.set_vector_store(document_index)
 
-        logger.info("Vector store stored in session (RAM)")
+        logger.info(
+            f"Document {doc_id} indexed in session (RAM), "
+            f"{len(document_index)} document(s) searchable"
+        )
 
-        return vector_store
+        return document_index
+
+    @classmethod
+    def update_document(
+        cls,
+        doc_id: int,
+        chunks: List[str],
+        embedding,
+        metadatas: List[Dict],
+        ids: List[str],
+        stale_ids: List[str],
+        metadata_updates: Optional[Dict[str, Dict]] = None,
+    ):
+        """
+        Replace part of a document's sub-index in place: embed and add
+        `chunks`, delete the vectors in `stale_ids`, and patch the metadata
+        of kept vectors (e.g. page numbers shifted by an amendment).
+        """
+        document_index = SessionService.get_vector_store()
+        store = document_index.stores.get(doc_id) if document_index is not None else None
+
+        if store is None:
+            if chunks:
+                return cls.build_from_chunks(chunks, embedding, metadatas, doc_id, ids)
+            return document_index
+
+        with tracer.span("index_update", added=len(chunks), removed=len(stale_ids)):
+            if chunks:
+                store.add_embeddings(
+                    cls._embed(chunks, embedding, metadatas),
+                    metadatas=metadatas,
+                    ids=ids,
+                )
+            if stale_ids:
+                store.delete(stale_ids)
+            for docstore_id, fields in (metadata_updates or {}).items():
+                document = store.docstore.search(docstore_id)
+                if hasattr(document, "metadata"):
+                    document.metadata.update(fields)
+
+        if not len(store.index_to_docstore_id):
+            document_index.remove_document(doc_id)
+        if len(document_index):
+            SessionService.set_vector_store(document_index)
+        else:
+            SessionService.clear_vector_store()
+
+        logger.info(
+            f"Document {doc_id} updated: +{len(chunks)} / -{len(stale_ids)} vectors"
+        )
+        return document_index
 
     @classmethod
     def get_vector_store(cls):
@@ -45,3 +127,20 @@ class VectorStoreService:
         """
         SessionService.clear_vector_store()
         logger.info("Vector store cleared from session")
+
+    # ---------- INTERNAL ----------
+    @staticmethod
+    def _embed(chunks: List[str], embedding, metadatas: List[Dict]):
+        """(stored text, vector) pairs, after checking the session memory cap."""
+        with tracer.span("embed", chunks=len(chunks)):
+            vectors = embedding.embed_documents(chunks)
+
+        SessionService.ensure_capacity(
+            len(vectors) * len(vectors[0]) * 4 if vectors else 0
+        )
+
+        texts = [
+            "" if ChunkStore.is_reference(metadata) else chunk
+            for chunk, metadata in zip(chunks, metadatas)
+        ]
+        return list(zip(texts, vectors))
@@ -1,5 +1,6 @@
 
 import streamlit as st
+from app.config import AppConfig
 from app.services.session_service import SessionService
 
 
@@ -29,7 +30,8 @@ def render_chat_messages():
 
 
 def _render_welcome_message():
-    st.info("""
+    examples = "\n".join(f'    - "{question}"' for question in AppConfig.EXAMPLE_QUESTIONS)
+    st.info(f"""
     I'm here to help you find information from your departmental documents.
     
     **How to start:**
@@ -38,52 +40,60 @@ def _render_welcome_message():
     3. I'll provide comprehensive answers based on the documents
     
     **Example questions:**
-    - "What are the main policies mentioned in the document?"
-    - "Summarize the key points from section 3"
-    - "What are the requirements for employee onboarding?"
+{examples}
     """)
 
 
 def _render_message_history(messages):
-    """Render the complete message history."""
-    for message in messages:
-        if message["role"] == "user":
-            _render_user_message(message)
-        else:
-            _render_assistant_message(message)
+    """Render the most recent window of the message history."""
+    window = SessionService.get_chat_window()
+    hidden = len(messages) - window
 
+    if hidden > 0:
+        if st.button(
+            f"⬆ Load earlier messages ({hidden} hidden)",
+            key="load_earlier",
+            use_container_width=True,
+        ):
+            SessionService.show_earlier_messages()
+            st.rerun()
 
-def _render_user_message(message):
-    """Render a user message bubble."""
     st.markdown(
-        f"""<div class="message-container">
+        "".join(_message_html(*message) for message in messages.tail(window)),
+        unsafe_allow_html=True
+    )
+
+
+def _message_html(role, content, timestamp):
+    """Build the HTML bubble for one message."""
+    if role == "user":
+        return _user_message_html(content, timestamp)
+    return _assistant_message_html(content, timestamp)
+
+
+def _user_message_html(content, timestamp):
+    return f"""<div class="message-container">
         <div style="text-align: right; margin-bottom: 4px;">
             <small style="color: #666;">👤 You</small>
         </div>
         <div class="user-message">
-            {message["content"]}
+            {content}
         </div>
         <div style="text-align: right; margin-top: 2px;">
-            <small style="color: #999;">{message.get("timestamp", "")}</small>
+            <small style="color: #999;">{timestamp}</small>
         </div>
-        </div>""",
-        unsafe_allow_html=True
-    )
+        </div>"""
 
 
-def _render_assistant_message(message):
-    """Render an assistant message bubble."""
-    st.markdown(
-        f"""<div class="message-container">
+def _assistant_message_html(content, timestamp):
+    return f"""<div class="message-container">
         <div style="text-align: left; margin-bottom: 4px;">
             <small style="color: #666;">🤖 Assistant</small>
         </div>
         <div class="assistant-message">
-            {message["content"]}
+            {content}
         </div>
         <div style="text-align: left; margin-top: 2px;">
-            <small style="color: #999;">{message.get("timestamp", "")}</small>
+            <small style="color: #999;">{timestamp}</small>
         </div>
-        </div>""",
-        unsafe_allow_html=True
-    )
+        </div>"""
@@ -3,7 +3,10 @@ import streamlit as st
 from datetime import datetime
 from app.services import RAGService
 from app.services import SessionService
+from app.services import LLMGateway, MemoryService
 from app.config import AppConfig
+from app.utils.profiling import profiling
+from app.utils.tracing import tracer
 
 def render_chat_input():
     st.divider()
@@ -34,13 +37,26 @@ def render_chat_input():
 
 def _process_user_message(user_input: str):
     timestamp = datetime.now().strftime(AppConfig.TIMESTAMP_FORMAT)
-    SessionService.add_message("user", user_input, timestamp)
     
     with st.spinner("🤔 Thinking..."):
         try:
-            answer = RAGService.get_answer(user_input)
+            # Answer before recording the question: the conversation memory
+            # reads the history and must not see the current turn in it.
+            with tracer.request("query") as trace, \
+                    profiling(SessionService.is_profiling_requested()):
+                answer = RAGService.get_answer(
+                    user_input, SessionService.get_document_scope() or None
+                )
+            SessionService.set_last_trace(trace.to_dict())
             
-            SessionService.add_message("assistant", answer, timestamp)
+            SessionService.add_message("user", user_input, timestamp)
+            SessionService.add_message(
+                "assistant",
+                answer["answer"] or f"⚠️ {answer['message']}",
+                datetime.now().strftime(AppConfig.TIMESTAMP_FORMAT),
+            )
+            # Summarise older turns in the background, off the next question's path.
+            MemoryService.fold(LLMGateway.bind)
             
             st.rerun()
             
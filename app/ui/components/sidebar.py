@@ -1,19 +1,22 @@
-from unittest import result
+import os
 import streamlit as st
-from datetime import datetime
-from app.services import EmbeddingService
-from app.services import FileService
 from app.services import SessionService
 from app.config import AppConfig
-from app.services import VectorStoreService
-from app.services import TextSplitterService
+from app.config import AIConfig
+from app.services import IngestionService
+from app.services import EmbeddingService
+from app.services import SnapshotService
+from app.utils.profiling import profiling
+from app.utils.tracing import tracer
 
 def render_sidebar():
     with st.sidebar:
         _render_upload_section()
         st.divider()
         _render_document_list()
-
+        st.divider()
+        _render_snapshot_section()
+        _render_debug_panel()
 
 
 def _render_upload_section():
@@ -22,7 +25,8 @@ def _render_upload_section():
     uploaded_file = st.file_uploader(
         "Choose a file (PDF or Image)",
         type=AppConfig.ALLOWED_FILE_TYPES,
-        help=f"Upload internal departmental documents (up to {AppConfig.MAX_FILE_SIZE_MB} pages)",
+        help=f"Upload internal departmental documents (up to {AppConfig.MAX_FILE_SIZE_MB} MB, "
+             f"{AppConfig.MAX_PDF_PAGES} pages)",
         key="file_uploader"
     )
     
@@ -33,29 +37,26 @@ def _render_upload_section():
 
 def _process_and_add_document(uploaded_file):
     with st.spinner("Processing document..."):
-        try:
-            extracted_text = FileService.extract(uploaded_file)
-            
-            if SessionService.document_exists(uploaded_file.name):
-                st.warning("Document already uploaded!")
-            else:
-                doc_data = {
-                    "id": len(SessionService.get_documents()),
-                    "name": uploaded_file.name,
-                    "text": extracted_text,
-                    "size": len(extracted_text),
-                    "uploaded_at": datetime.now().strftime(AppConfig.UPLOAD_TIMESTAMP_FORMAT)
-                }
-                SessionService.add_document(doc_data)
-                chunks = TextSplitterService.split(doc_data["text"]["text"])
-                VectorStoreService.build_from_chunks(
-                    chunks=chunks,
-                    embedding=EmbeddingService.get_huggingface_embedding(),
-                )
-                st.success(f"✅ Added: {uploaded_file.name}")
-                st.rerun()
-        except Exception as e:
-            st.error(f"Error: {str(e)}")
+        with tracer.request("ingest") as trace, \
+                profiling(SessionService.is_profiling_requested()):
+            added = _ingest_document(uploaded_file)
+        SessionService.set_last_trace(trace.to_dict())
+
+    if added:
+        st.rerun()
+
+
+def _ingest_document(uploaded_file):
+    result = IngestionService.ingest(uploaded_file)
+
+    if result["status_code"] == 200:
+        st.success(f"✅ {result['message']}")
+        return True
+    if result["status_code"] == 409:
+        st.warning(result["message"])
+    else:
+        st.error(f"Error: {result['message']}")
+    return False
 
 
 def _render_document_list():
@@ -69,14 +70,24 @@ def _render_document_list():
         for idx, doc in enumerate(documents):
             with st.expander(f"{doc['name']}", expanded=False):
                 st.caption(f"Uploaded: {doc['uploaded_at']}")
+                if doc.get("version", 1) > 1:
+                    st.caption(f"Version {doc['version']} · {len(doc['pages'])} page(s)")
                 st.caption(f"Size: {doc['size']:,} characters")
+                if doc["metadata"].get("ocr_pages"):
+                    st.caption(
+                        f"{doc['metadata']['pdf_kind'].capitalize()} PDF · "
+                        f"OCR on {len(doc['metadata']['ocr_pages'])} page(s)"
+                    )
+                if doc.get("duplicate_chunks"):
+                    st.caption(f"Skipped {doc['duplicate_chunks']} duplicate chunk(s)")
                 
                 if st.button("Remove", key=f"del_{idx}", use_container_width=True):
-                    SessionService.remove_document(idx)
+                    IngestionService.remove_document(idx)
                     st.rerun()
         
         st.divider()
         _render_action_buttons()
+        _render_scope_selector(documents)
     else:
         st.info("No documents yet\n\nUpload documents to start asking questions!")
 
@@ -94,3 +105,124 @@ def _render_action_buttons():
             SessionService.clear_chat_history()
             st.rerun()
 
+
+def _render_scope_selector(documents):
+    # Rendered after every button that edits the scope, as Streamlit forbids
+    # changing a widget's state once the widget exists in the current run.
+    names = {doc["id"]: doc["name"] for doc in documents}
+    st.multiselect(
+        "Search in",
+        options=list(names),
+        format_func=names.get,
+        key="document_scope",
+        placeholder="All documents",
+        help="Restrict answers to the selected documents",
+    )
+
+
+def _render_snapshot_section():
+    with st.expander("💾 Knowledge base snapshot", expanded=False):
+        message = st.session_state.pop("snapshot_message", None)
+        if message:
+            (st.success if message[0] == 200 else st.error)(message[1])
+
+        if SessionService.get_documents():
+            st.button("Save snapshot", on_click=_save_snapshot, use_container_width=True)
+            st.caption("Saved snapshots last for this session only; download one to keep it")
+
+        saved = SnapshotService.list_saved()
+        if saved:
+            path = st.selectbox(
+                "Saved snapshots", saved, format_func=os.path.basename, key="snapshot_choice"
+            )
+            col1, col2 = st.columns(2)
+            with col1:
+                # Callbacks run before the script, so replacing the documents
+                # cannot clash with widgets already drawn in this run.
+                st.button("Restore", on_click=_restore_snapshot, args=(path,),
+                          use_container_width=True)
+            with col2:
+                st.download_button(
+                    "Download",
+                    data=lambda: _read_file(path),
+                    file_name=os.path.basename(path),
+                    mime="application/octet-stream",
+                    use_container_width=True,
+                )
+
+        uploaded = st.file_uploader("Restore from file", type=["ragsnap"], key="snapshot_uploader")
+        if uploaded:
+            st.button("Restore uploaded snapshot", on_click=_restore_snapshot, args=(uploaded,),
+                      use_container_width=True)
+
+
+def _save_snapshot():
+    result = SnapshotService.save()
+    st.session_state.snapshot_message = (result["status_code"], result["message"])
+
+
+def _restore_snapshot(source):
+    with tracer.request("snapshot_restore") as trace:
+        result = SnapshotService.restore(source)
+    SessionService.set_last_trace(trace.to_dict())
+    st.session_state.snapshot_message = (result["status_code"], result["message"])
+
+
+def _read_file(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _render_debug_panel():
+    with st.expander("🛠 Debug: last request", expanded=False):
+        st.toggle(
+            "Profile requests",
+            key="profile_requests",
+            help=f"Save cProfile, memory and stack profiles of uploads and "
+                 f"questions under {AIConfig.PROFILE_DIR}",
+        )
+
+        usage = SessionService.get_memory_usage()
+        if usage:
+            st.caption(
+                f"Session memory: {usage['session_mb']:.1f} MB "
+                f"(index {usage['index_mb']:.1f} MB) · "
+                f"{usage['sessions']} session(s), {usage['spilled_sessions']} spilled, "
+                f"{usage['total_mb']:.1f} MB total"
+            )
+        cache = EmbeddingService.query_cache_stats()
+        st.caption(
+            f"Query vectors cached: {cache['size']} · "
+            f"{cache['hits']} hit(s), {cache['misses']} miss(es)"
+        )
+
+        trace = SessionService.get_last_trace()
+
+        if not trace:
+            st.caption("No request traced yet")
+            return
+
+        st.caption(
+            f"**{trace['name']}** · id `{trace['request_id']}` · "
+            f"{trace['duration_ms']:.0f} ms"
+        )
+        st.dataframe(
+            [
+                {
+                    "stage": "  " * span["depth"] + span["name"],
+                    "start (ms)": span["offset_ms"],
+                    "duration (ms)": span["duration_ms"],
+                    "details": ", ".join(f"{k}={v}" for k, v in span["attrs"].items()),
+                }
+                for span in trace["spans"]
+            ],
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.download_button(
+            "Export metrics (Prometheus)",
+            data=tracer.export_prometheus(),
+            file_name="rag_metrics.prom",
+            mime="text/plain",
+            use_container_width=True,
+        )
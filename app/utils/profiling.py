@@ -0,0 +1,158 @@
+import functools
+import io
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.config.ai_config import AIConfig
+from app.utils.logger import logger
+from app.utils.tracing import tracer
+
+
+_requested: ContextVar = ContextVar("profiling_requested", default=False)
+_active: ContextVar = ContextVar("profiling_active", default=False)
+
+
+@contextmanager
+def profiling(enabled: bool = True):
+    """Profile `@profiled` calls made inside this block (e.g. one UI request)."""
+    token = _requested.set(enabled)
+    try:
+        yield
+    finally:
+        _requested.reset(token)
+
+
+def profiled(name: str):
+    """
+    Run the wrapped call under cProfile, tracemalloc and a stack sampler when
+    profiling is requested (PROFILE_REQUESTS or a `profiling()` block).
+    Otherwise the call goes straight through.
+    """
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not (AIConfig.PROFILE_REQUESTS or _requested.get()) or _active.get():
+                return fn(*args, **kwargs)
+            return _profile_call(name, fn, args, kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ---------- INTERNAL ----------
+class _StackSampler(threading.Thread):
+    """Samples one thread's Python stack into flamegraph 'folded' counts."""
+
+    def __init__(self, thread_id: int, interval: float):
+        super().__init__(daemon=True, name="profile-sampler")
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _profile_call(name: str, fn, args, kwargs):
+    import cProfile
+    import tracemalloc
+
+    request_id = tracer.current_request_id() or "adhoc"
+    out_dir = os.path.join(
+        AIConfig.PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}_{name}_{request_id}"
+    )
+
+    owns_tracemalloc = not tracemalloc.is_tracing()
+    if owns_tracemalloc:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+
+    profile = cProfile.Profile()
+    sampler = _StackSampler(threading.get_ident(), AIConfig.PROFILE_SAMPLE_INTERVAL)
+    token = _active.set(True)
+
+    with tracer.span("profile", target=name, output=out_dir):
+        start = time.perf_counter()
+        sampler.start()
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            sampler.stop()
+            elapsed = time.perf_counter() - start
+            _active.reset(token)
+
+            _, peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            if owns_tracemalloc:
+                tracemalloc.stop()
+
+            try:
+                _write_report(out_dir, name, request_id, elapsed, profile,
+                              before, after, peak, sampler)
+                logger.info(f"Profile of {name} written to {out_dir}")
+            except OSError as e:
+                logger.warning(f"Could not write profile: {e}")
+
+
+def _write_report(out_dir, name, request_id, elapsed, profile,
+                  before, after, peak, sampler):
+    import pstats
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    profile.dump_stats(os.path.join(out_dir, "profile.pstats"))
+
+    buffer = io.StringIO()
+    stats = pstats.Stats(profile, stream=buffer)
+    stats.sort_stats("cumulative").print_stats(AIConfig.PROFILE_TOP_FUNCTIONS)
+    _write(out_dir, "top_functions.txt", buffer.getvalue())
+
+    growth = after.compare_to(before, "lineno")
+    lines = [f"Peak traced memory: {peak / 1024 / 1024:.2f} MB", ""]
+    lines += [str(stat) for stat in growth[:AIConfig.PROFILE_TOP_ALLOCATIONS]]
+    _write(out_dir, "allocations.txt", "\n".join(lines) + "\n")
+
+    _write(out_dir, "stacks.folded", sampler.folded())
+
+    _write(out_dir, "summary.json", json.dumps({
+        "target": name,
+        "request_id": request_id,
+        "duration_ms": round(elapsed * 1000, 3),
+        "peak_memory_bytes": peak,
+        "stack_samples": sum(sampler.stacks.values()),
+        "sample_interval_ms": AIConfig.PROFILE_SAMPLE_INTERVAL * 1000,
+    }, indent=2))
+
+
+def _write(out_dir: str, filename: str, content: str):
+    with open(os.path.join(out_dir, filename), "w", encoding="utf-8") as f:
+        f.write(content)
@@ -0,0 +1,18 @@
+import re
+from typing import List
+
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def words(text: str) -> List[str]:
+    """Lower-cased words of `text`."""
+    return _WORD_RE.findall(text.lower())
+
+
+def shingles(text: str, size: int = 3) -> set:
+    """Word `size`-grams of `text`; shorter texts yield one shingle."""
+    tokens = words(text)
+    if len(tokens) < size:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
@@ -0,0 +1,43 @@
+from functools import lru_cache
+
+from app.utils.logger import logger
+
+
+# Rough chars-per-token for mixed Vietnamese/English text, used when the
+# tiktoken encoding cannot be loaded (e.g. offline first run).
+_FALLBACK_CHARS_PER_TOKEN = 3
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, estimating tokens from length: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+
+    encoding = _encoding()
+    if encoding is None:
+        return -(-len(text) // _FALLBACK_CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0:
+        return ""
+
+    encoding = _encoding()
+    if encoding is None:
+        return text[: max_tokens * _FALLBACK_CHARS_PER_TOKEN]
+
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.config.ai_config import AIConfig
+from app.utils.logger import logger
+
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+SIZE_BUCKETS = tuple(4 ** i for i in range(13))  # 1 .. ~16M
+
+# Span attributes that are sizes and get a histogram. Others (status codes,
+# scores, page numbers, scope counts) only appear in traces.
+HISTOGRAM_ATTRIBUTES = frozenset({
+    "bytes", "chars", "chunks", "pages", "pixels", "vectors",
+    "added", "removed", "dropped", "tokens", "input_tokens", "output_tokens",
+})
+
+
+class Span:
+    __slots__ = ("name", "start", "duration", "depth", "attrs")
+
+    def __init__(self, name: str, depth: int, attrs: Dict[str, Any]):
+        self.name = name
+        self.start = time.perf_counter()
+        self.duration = None
+        self.depth = depth
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "offset_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "depth": self.depth,
+            "attrs": self.attrs,
+        }
+
+
+class Trace:
+    """All spans recorded while handling one user request."""
+
+    def __init__(self, name: str, request_id: Optional[str] = None):
+        self.name = name
+        self.request_id = request_id or uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.spans: List[Span] = []
+        self.depth = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "request_id": self.request_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((self.duration or 0.0) * 1000, 3),
+            "spans": [span.to_dict(self.start) for span in self.spans],
+        }
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+_current_trace: ContextVar = ContextVar("current_trace", default=None)
+
+
+class Tracer:
+    """
+    Lightweight in-process tracer.
+
+    `request()` opens a trace carrying a request id; `span()` times a stage
+    inside it. Every finished span feeds process-wide histograms (duration
+    plus the size attributes in HISTOGRAM_ATTRIBUTES) which can be
+    exported in Prometheus text format. Finished traces are appended as JSONL
+    when TRACE_JSONL_PATH is set.
+    """
+
+    def __init__(self, jsonl_path: Optional[str] = None):
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._histograms: Dict[tuple, Histogram] = {}
+
+    # ---------- Recording ----------
+    @contextmanager
+    def request(self, name: str, request_id: Optional[str] = None):
+        trace = Trace(name, request_id)
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            trace.duration = time.perf_counter() - trace.start
+            _current_trace.reset(token)
+            self.observe("request_duration_seconds", name, trace.duration)
+            self._write_jsonl(trace)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        trace = _current_trace.get()
+        span = Span(name, trace.depth if trace else 0, attrs)
+        if trace is not None:
+            trace.spans.append(span)
+            trace.depth += 1
+        try:
+            yield span
+        finally:
+            span.duration = time.perf_counter() - span.start
+            if trace is not None:
+                trace.depth -= 1
+            self._record(span)
+
+    @staticmethod
+    def current_request_id() -> Optional[str]:
+        trace = _current_trace.get()
+        return trace.request_id if trace else None
+
+    def observe(self, metric: str, stage: str, value: float):
+        buckets = DURATION_BUCKETS if metric.endswith("_seconds") else SIZE_BUCKETS
+        with self._lock:
+            histogram = self._histograms.get((metric, stage))
+            if histogram is None:
+                histogram = self._histograms[(metric, stage)] = Histogram(buckets)
+            histogram.observe(value)
+
+    def _record(self, span: Span):
+        self.observe("stage_duration_seconds", span.name, span.duration)
+        for key, value in span.attrs.items():
+            if key not in HISTOGRAM_ATTRIBUTES:
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.observe(f"stage_{key}", span.name, value)
+
+    # ---------- Export ----------
+    def export_prometheus(self, prefix: str = "rag") -> str:
+        lines = []
+        with self._lock:
+            items = sorted(self._histograms.items())
+
+        declared = set()
+        for (metric, stage), histogram in items:
+            name = f"{prefix}_{metric}"
+            if name not in declared:
+                lines.append(f"# TYPE {name} histogram")
+                declared.add(name)
+
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+        return "\n".join(lines) + "\n"
+
+    def _write_jsonl(self, trace: Trace):
+        if not self.jsonl_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+            with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write trace: {e}")
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+tracer = Tracer(jsonl_path=AIConfig.TRACE_JSONL_PATH)
@@ -0,0 +1,247 @@
+"""
+End-to-end performance benchmarks for the ingestion and query pipeline.
+
+Runs fully offline on CPU: embeddings and the LLM are replaced by the stubs
+in `stubs.py`. Results are written as JSON so runs can be compared across
+commits.
+
+    python test/benchmark.py --output bench.json
+    python test/benchmark.py --sizes 1000 10000 --llm-delay 0.2
+"""
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from langchain_community.vectorstores import FAISS
+
+from app.services import (
+    FileService,
+    RAGService,
+    SessionService,
+    TextSplitterService,
+    VectorStoreService,
+)
+from stubs import MockFile, StubChatModel, StubEmbeddings
+
+
+SCHEMA_VERSION = 1
+SAMPLE_PDF = current_dir / "pdf to test" / "test1.pdf"
+
+_SAMPLE_PARAGRAPH = (
+    "Quy định về chế độ làm việc của cán bộ, công chức trong phòng ban. "
+    "Nhân viên mới phải hoàn thành khóa đào tạo hội nhập trong 30 ngày đầu. "
+    "Thời gian làm việc từ 8 giờ sáng đến 5 giờ chiều, nghỉ trưa một tiếng. "
+    "Mọi yêu cầu nghỉ phép cần được trưởng phòng phê duyệt trước ba ngày.\n\n"
+)
+
+_QUERIES = [
+    "Thời gian làm việc là khi nào?",
+    "Nhân viên mới cần đào tạo bao lâu?",
+    "Ai phê duyệt yêu cầu nghỉ phép?",
+    "Quy định về chế độ làm việc",
+]
+
+
+# ---------- helpers ----------
+def _percentiles(samples):
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pick(0.50) * 1000,
+        "p95_ms": pick(0.95) * 1000,
+        "p99_ms": pick(0.99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def _synthetic_corpus(n_chunks):
+    return [
+        f"[{i}] " + _SAMPLE_PARAGRAPH.strip().replace("30", str(i % 97))
+        for i in range(n_chunks)
+    ]
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"], cwd=parent_dir, text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return None
+
+
+# ---------- benchmarks ----------
+def bench_pdf_extraction(repeat):
+    if not SAMPLE_PDF.exists():
+        return {"skipped": f"missing {SAMPLE_PDF.name}"}
+
+    pages, elapsed = 0, 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = FileService.extract(MockFile(SAMPLE_PDF))
+        elapsed += time.perf_counter() - start
+        if result["status_code"] != 200:
+            return {"skipped": result["message"]}
+        pages += result["metadata"]["total_pages"]
+
+    return {"pages": pages, "seconds": elapsed, "pages_per_sec": pages / elapsed}
+
+
+def bench_ocr(repeat):
+    if shutil.which("tesseract") is None:
+        return {"skipped": "tesseract binary not installed"}
+
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (1200, 400), "white")
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(_SAMPLE_PARAGRAPH.split(". ")):
+        draw.text((20, 20 + row * 40), line, fill="black")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        FileService._run_ocr(image)
+    elapsed = time.perf_counter() - start
+
+    return {"images": repeat, "seconds": elapsed, "images_per_sec": repeat / elapsed}
+
+
+def bench_chunking(target_mb):
+    text = _SAMPLE_PARAGRAPH * int(target_mb * 1024 * 1024 / len(_SAMPLE_PARAGRAPH.encode()))
+    size_mb = len(text.encode("utf-8")) / (1024 * 1024)
+
+    start = time.perf_counter()
+    chunks = TextSplitterService.split(text)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mb": size_mb,
+        "chunks": len(chunks),
+        "seconds": elapsed,
+        "mb_per_sec": size_mb / elapsed,
+    }
+
+
+def bench_embedding(embedding, n_chunks):
+    chunks = _synthetic_corpus(n_chunks)
+
+    start = time.perf_counter()
+    embedding.embed_documents(chunks)
+    elapsed = time.perf_counter() - start
+
+    return {"chunks": n_chunks, "seconds": elapsed, "chunks_per_sec": n_chunks / elapsed}
+
+
+def bench_faiss_query(embedding, sizes, n_queries):
+    results = {}
+    query_vectors = [embedding.embed_query(q) for q in _QUERIES]
+
+    for size in sizes:
+        chunks = _synthetic_corpus(size)
+        vectors = embedding.embed_documents(chunks)
+
+        start = time.perf_counter()
+        store = FAISS.from_embeddings(list(zip(chunks, vectors)), embedding)
+        build_seconds = time.perf_counter() - start
+
+        samples = []
+        for i in range(n_queries):
+            vector = query_vectors[i % len(query_vectors)]
+            start = time.perf_counter()
+            store.similarity_search_by_vector(vector, k=10)
+            samples.append(time.perf_counter() - start)
+
+        results[str(size)] = {"build_seconds": build_seconds, **_percentiles(samples)}
+
+    return results
+
+
+def bench_rag(embedding, llm_delay, n_queries):
+    chunks = _synthetic_corpus(500)
+    llm = StubChatModel(delay=llm_delay)
+    original_init_llm = RAGService._init_llm
+    RAGService._init_llm = classmethod(lambda cls, max_tokens=None: llm)
+
+    try:
+        with SessionService.bind_state():
+            VectorStoreService.build_from_chunks(chunks, embedding)
+
+            samples = []
+            for i in range(n_queries):
+                start = time.perf_counter()
+                result = RAGService.get_answer(_QUERIES[i % len(_QUERIES)])
+                samples.append(time.perf_counter() - start)
+                if result["status_code"] != 200:
+                    return {"skipped": result["message"]}
+    finally:
+        RAGService._init_llm = original_init_llm
+
+    return {"llm_delay_ms": llm_delay * 1000, **_percentiles(samples)}
+
+
+# ---------- entry point ----------
+def run(args):
+    embedding = StubEmbeddings(dim=args.dim, delay=args.embed_delay)
+
+    results = {
+        "pdf_extraction": bench_pdf_extraction(args.repeat),
+        "ocr": bench_ocr(args.repeat),
+        "chunking": bench_chunking(args.chunk_mb),
+        "embedding": bench_embedding(embedding, args.embed_chunks),
+        "faiss_query": bench_faiss_query(embedding, args.sizes, args.queries),
+        "rag_get_answer": bench_rag(embedding, args.llm_delay, args.queries),
+    }
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--chunk-mb", type=float, default=2.0)
+    parser.add_argument("--embed-chunks", type=int, default=2000)
+    parser.add_argument("--embed-delay", type=float, default=0.0,
+                        help="artificial stub embedding cost per text (s)")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--llm-delay", type=float, default=0.05,
+                        help="stub LLM latency per call (s)")
+    args = parser.parse_args()
+
+    report = run(args)
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+
+    if args.output:
+        Path(args.output).write_text(payload, encoding="utf-8")
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Shared pytest setup: makes `app` and the helpers in this folder importable
+and keeps every on-disk store of the services inside the test's tmp_path.
+"""
+import sys
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+for path in (str(parent_dir), str(current_dir)):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import pytest
+
+from app.config import AIConfig
+
+
+@pytest.fixture(autouse=True)
+def isolated_stores(tmp_path, monkeypatch):
+    """Blob store, spill, snapshot and upload folders under tmp_path."""
+    for name in ("CHUNK_STORE_DIR", "SPILL_DIR", "SNAPSHOT_DIR", "UPLOAD_DIR"):
+        directory = tmp_path / name.lower()
+        monkeypatch.setattr(AIConfig, name, str(directory))
+    return tmp_path
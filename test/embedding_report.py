@@ -0,0 +1,292 @@
+"""
+Retrieval quality vs. latency report for embedding models and reduced dimensions.
+
+Embeds the Vietnamese fixture set in `fixtures/retrieval_vi.json` with each
+model and scores recall@1, recall@k and MRR for the full-size vectors and
+for every requested dimension, both Matryoshka-truncated and PCA-projected.
+Encode latency, search latency on an index of `--index-size` vectors and
+index memory are reported alongside. Models are loaded through
+sentence-transformers, so they must be cached locally or downloadable;
+`--stub` runs the same report offline with hashing embeddings.
+
+    python test/embedding_report.py --output embed.json
+    python test/embedding_report.py --models intfloat/multilingual-e5-small --dims 128 256
+    python test/embedding_report.py --models intfloat/multilingual-e5-small --dims 256 \\
+        --corpus docs/ --save-pca data/pca/e5-small-256.npz
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+import faiss
+import numpy as np
+
+from app.config import AIConfig
+from app.services import FileService, TextSplitterService
+from app.services.embedding_models import ConfiguredEmbeddings, MatryoshkaReducer, PCAReducer
+from benchmark import _git_commit, _percentiles
+from stubs import MockFile, StubEmbeddings
+
+
+SCHEMA_VERSION = 1
+FIXTURE = current_dir / "fixtures" / "retrieval_vi.json"
+
+
+# ---------- inputs ----------
+def load_corpus(path):
+    """Chunks of every .txt and .pdf under `path`, as the app would index them."""
+    chunks = []
+    for file in sorted(Path(path).rglob("*")):
+        if file.suffix.lower() == ".txt":
+            text = file.read_text(encoding="utf-8")
+        elif file.suffix.lower() == ".pdf":
+            result = FileService.extract(MockFile(file))
+            if result["status_code"] != 200:
+                print(f"skipping {file}: {result['message']}", file=sys.stderr)
+                continue
+            text = result["text"]
+        else:
+            continue
+        if text.strip():
+            chunks.extend(TextSplitterService.split(text))
+    return chunks
+
+
+def build_model(name, args):
+    """(embedding with prompts but no reduction, model profile)."""
+    if args.stub:
+        return StubEmbeddings(dim=args.stub_dim), {"dim": args.stub_dim}
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    profile = AIConfig.EMBEDDING_MODELS.get(name, {})
+    base = HuggingFaceEmbeddings(
+        model_name=name,
+        model_kwargs={"trust_remote_code": True} if profile.get("trust_remote_code") else {},
+        encode_kwargs={"normalize_embeddings": True},
+    )
+    return ConfiguredEmbeddings(base, profile), profile
+
+
+# ---------- measurements ----------
+def encode(embedding, passages, queries):
+    start = time.perf_counter()
+    doc_vectors = np.asarray(embedding.embed_documents(passages), dtype=np.float32)
+    passage_seconds = time.perf_counter() - start
+
+    # One query at a time, as a user's question is embedded.
+    query_vectors, samples = [], []
+    for query in queries:
+        start = time.perf_counter()
+        query_vectors.append(embedding.embed_query(query))
+        samples.append(time.perf_counter() - start)
+
+    return doc_vectors, np.asarray(query_vectors, dtype=np.float32), {
+        "passages_per_sec": len(passages) / passage_seconds,
+        "query": _percentiles(samples),
+    }
+
+
+def evaluate(doc_vectors, query_vectors, relevant, k):
+    """recall@1, recall@k, MRR@k and cosine score separation."""
+    index = faiss.IndexFlatL2(doc_vectors.shape[1])
+    index.add(doc_vectors)
+    distances, ranks = index.search(query_vectors, len(doc_vectors))
+    similarities = 1 - distances / 2
+
+    hits_1 = hits_k = reciprocal = 0.0
+    relevant_top, irrelevant_top = [], []
+    for row, wanted in enumerate(relevant):
+        positions = [i for i, doc in enumerate(ranks[row]) if doc in wanted]
+        first = positions[0] if positions else len(doc_vectors)
+        hits_1 += first == 0
+        hits_k += first < k
+        reciprocal += 1 / (first + 1) if first < k else 0.0
+        relevant_top.append(float(similarities[row][first]) if positions else 0.0)
+        irrelevant_top.append(float(next(
+            similarities[row][i] for i, doc in enumerate(ranks[row]) if doc not in wanted
+        )))
+
+    n = len(relevant)
+    return {
+        "recall@1": round(hits_1 / n, 4),
+        f"recall@{k}": round(hits_k / n, 4),
+        f"mrr@{k}": round(reciprocal / n, 4),
+        # Where relevant and irrelevant matches sit; guides RETRIEVAL_MIN_SCORE.
+        "relevant_score_mean": round(statistics.fmean(relevant_top), 4),
+        "best_irrelevant_score_mean": round(statistics.fmean(irrelevant_top), 4),
+    }
+
+
+def search_latency(doc_vectors, query_vectors, index_size, k, seed=0):
+    """Search time and memory of a flat index of `index_size` vectors."""
+    rng = np.random.default_rng(seed)
+    dim = doc_vectors.shape[1]
+    reps = -(-index_size // len(doc_vectors))
+    vectors = np.tile(doc_vectors, (reps, 1))[:index_size]
+    vectors = vectors + rng.normal(0, 0.05, vectors.shape).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    index = faiss.IndexFlatL2(dim)
+    index.add(vectors)
+    samples = []
+    for vector in query_vectors:
+        start = time.perf_counter()
+        index.search(vector[None, :], k)
+        samples.append(time.perf_counter() - start)
+
+    return {
+        "index_size": index_size,
+        "index_mb": round(index_size * dim * 4 / (1024 * 1024), 2),
+        **_percentiles(samples),
+    }
+
+
+def report_model(name, args, fixture, corpus):
+    embedding, profile = build_model(name, args)
+    passages = [p["text"] for p in fixture["passages"]]
+    queries = [q["query"] for q in fixture["queries"]]
+    position = {p["id"]: i for i, p in enumerate(fixture["passages"])}
+    relevant = [{position[r] for r in q["relevant"]} for q in fixture["queries"]]
+
+    doc_vectors, query_vectors, encoding = encode(embedding, passages, queries)
+    full_dim = doc_vectors.shape[1]
+
+    fit_vectors, fit_source = doc_vectors, "fixture passages (optimistic)"
+    if corpus:
+        fit_vectors = np.asarray(embedding.embed_documents(corpus), dtype=np.float32)
+        fit_source = f"{len(corpus)} corpus chunks"
+
+    variants = [("none", full_dim, None)]
+    for dim in sorted(d for d in args.dims if d < full_dim):
+        variants.append(("matryoshka", dim, MatryoshkaReducer(dim)))
+        try:
+            variants.append(("pca", dim, PCAReducer.fit(fit_vectors, dim, name)))
+        except ValueError as e:
+            variants.append(("pca", dim, f"{e}; fit on a larger --corpus"))
+
+    rows = []
+    for reduction, dim, reducer in variants:
+        row = {"reduction": reduction, "dim": dim}
+        if isinstance(reducer, str):
+            rows.append({**row, "skipped": reducer})
+            continue
+        docs = reducer(doc_vectors) if reducer else doc_vectors
+        found = reducer(query_vectors) if reducer else query_vectors
+        row.update(evaluate(docs, found, relevant, args.k))
+        row["search"] = search_latency(docs, found, args.index_size, args.k)
+        rows.append(row)
+
+    return {
+        "full_dim": full_dim,
+        "multilingual": bool(profile.get("multilingual")),
+        "matryoshka_trained": bool(profile.get("matryoshka")),
+        "pca_fit_on": fit_source,
+        "encoding": encoding,
+        "variants": rows,
+    }, (embedding, fit_vectors)
+
+
+def save_pca(args, fit_vectors):
+    if len(args.models) != 1 or len(args.dims) != 1:
+        raise SystemExit("--save-pca needs exactly one --models entry and one --dims value")
+    reducer = PCAReducer.fit(fit_vectors, args.dims[0], args.models[0])
+    Path(args.save_pca).parent.mkdir(parents=True, exist_ok=True)
+    reducer.save(args.save_pca)
+    print(
+        f"PCA saved. Use it with EMBEDDING_MODEL={args.models[0]} "
+        f"EMBEDDING_DIM={args.dims[0]} EMBEDDING_REDUCTION=pca "
+        f"EMBEDDING_PCA_PATH={args.save_pca}",
+        file=sys.stderr,
+    )
+
+
+def print_table(results, k):
+    print(f"{'model':<58}{'reduction':<12}{'dim':>5}{'R@1':>7}{f'R@{k}':>7}"
+          f"{'MRR':>7}{'query ms':>10}{'search ms':>11}{'index MB':>10}", file=sys.stderr)
+    for name, result in results.items():
+        if "skipped" in result:
+            print(f"{name:<58}skipped: {result['skipped']}", file=sys.stderr)
+            continue
+        query_ms = result["encoding"]["query"]["p50_ms"]
+        for row in result["variants"]:
+            if "skipped" in row:
+                continue
+            print(
+                f"{name:<58}{row['reduction']:<12}{row['dim']:>5}"
+                f"{row['recall@1']:>7.2f}{row[f'recall@{k}']:>7.2f}{row[f'mrr@{k}']:>7.2f}"
+                f"{query_ms:>10.1f}{row['search']['p50_ms']:>11.2f}"
+                f"{row['search']['index_mb']:>10.1f}",
+                file=sys.stderr,
+            )
+
+
+# ---------- entry point ----------
+def run(args):
+    fixture = json.loads(Path(args.fixture).read_text(encoding="utf-8"))
+    corpus = load_corpus(args.corpus) if args.corpus else None
+
+    results = {}
+    for name in args.models:
+        try:
+            results[name], (_, fit_vectors) = report_model(name, args, fixture, corpus)
+        except Exception as e:
+            results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+            continue
+        if args.save_pca:
+            save_pca(args, fit_vectors)
+
+    return {
+        "schema_version": SCHEMA_VERSION,
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "fixture": {
+            "passages": len(fixture["passages"]),
+            "queries": len(fixture["queries"]),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--models", nargs="+", default=list(AIConfig.EMBEDDING_MODELS))
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 128, 256])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--index-size", type=int, default=50000,
+                        help="vectors in the index used to time searches")
+    parser.add_argument("--fixture", default=str(FIXTURE))
+    parser.add_argument("--corpus",
+                        help="folder of .pdf/.txt files to fit PCA on (default: the fixture)")
+    parser.add_argument("--save-pca", help="save the fitted PCA projection to this path")
+    parser.add_argument("--stub", action="store_true",
+                        help="use offline hashing embeddings instead of the models")
+    parser.add_argument("--stub-dim", type=int, default=384)
+    args = parser.parse_args()
+    if args.stub:
+        args.models = ["stub"]
+
+    report = run(args)
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+
+    if args.output:
+        Path(args.output).write_text(payload, encoding="utf-8")
+    print(payload)
+    print_table(report["results"], args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Concurrent-user load test for the ingestion and query service layer.
+
+Simulates N users, each with its own headless session (see
+`SessionService.bind_state`), issuing a mix of uploads and questions
+against one process. PDF parsing, embeddings and the LLM are replaced by
+the stubs in `stubs.py` with log-normal latencies, so the run is offline
+and CPU-only. Reports throughput, p50/p95/p99 latency per operation, the
+slowest stages, and CPU / RSS sampled from /proc over time, as JSON.
+
+    python test/loadtest.py --users 20 --duration 60 --output load.json
+    python test/loadtest.py --users 50 --upload-ratio 0.05 --llm-delay 1.5
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from app.services import (
+    FileService, IngestionService, MemoryService, RAGService, SessionService, UploadService,
+)
+from app.utils.tracing import tracer
+from benchmark import _QUERIES, _SAMPLE_PARAGRAPH, _git_commit, _percentiles
+from stubs import StubChatModel, StubEmbeddings, sample_delay
+
+
+SCHEMA_VERSION = 1
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+# ---------- stand-ins ----------
+class SyntheticUpload:
+    """A generated multi-page 'PDF' whose text is unique to its upload."""
+
+    type = "application/pdf"
+
+    def __init__(self, name: str, pages: int, seed: int):
+        rng = random.Random(seed)
+        self.name = name
+        self.pages = [
+            " ".join(
+                f"[{seed}.{page}.{i}] "
+                + _SAMPLE_PARAGRAPH.strip().replace("30", str(rng.randint(1, 999)))
+                for i in range(8)
+            )
+            for page in range(pages)
+        ]
+        self.size = sum(len(page.encode("utf-8")) for page in self.pages)
+
+    def close(self):
+        pass
+
+
+def _stub_spool(cls, upload):
+    # Synthetic uploads have no bytes to spool; hand them straight through.
+    return {"status_code": 200, "message": "", "upload": upload}
+
+
+def _stub_process_pdf(extract_delay, sigma):
+    def process_pdf(cls, file, pages=None):
+        time.sleep(sample_delay(extract_delay * len(file.pages), sigma))
+        page_offsets, text = [], ""
+        for number, page in enumerate(file.pages, start=1):
+            page_offsets.append((number, len(text)))
+            text += page + "\n"
+        return cls._success(
+            text.strip(),
+            f"Extracted text from {len(file.pages)}/{len(file.pages)} pages",
+            total_pages=len(file.pages),
+            extracted_pages=len(file.pages),
+            empty_pages=[],
+            page_offsets=page_offsets,
+            page_hashes=[hashlib.sha256(page.encode()).hexdigest() for page in file.pages],
+            character_count=len(text.strip()),
+        )
+
+    return classmethod(process_pdf)
+
+
+# ---------- resource sampling ----------
+def _read_proc():
+    """(cpu seconds used by this process, resident set size in MB)."""
+    with open("/proc/self/stat") as f:
+        # Fields after the parenthesised command name; utime/stime are 14/15.
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+
+    with open("/proc/self/statm") as f:
+        rss_pages = int(f.read().split()[1])
+    return cpu, rss_pages * _PAGE_SIZE / (1024 * 1024)
+
+
+class ResourceSampler(threading.Thread):
+    def __init__(self, interval: float, active_users):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.active_users = active_users
+        self.samples = []
+        self._stop_event = threading.Event()
+
+    def run(self):
+        origin = time.perf_counter()
+        last_wall, (last_cpu, _) = origin, _read_proc()
+        while not self._stop_event.wait(self.interval):
+            now = time.perf_counter()
+            cpu, rss_mb = _read_proc()
+            self.samples.append({
+                "t_s": round(now - origin, 2),
+                "cpu_percent": round(100 * (cpu - last_cpu) / (now - last_wall), 1),
+                "rss_mb": round(rss_mb, 1),
+                "active_users": self.active_users(),
+            })
+            last_wall, last_cpu = now, cpu
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+# ---------- simulated users ----------
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.embedding = StubEmbeddings(
+            dim=args.dim, delay=args.embed_delay, sigma=args.sigma
+        )
+        self.llm = StubChatModel(delay=args.llm_delay, sigma=args.sigma)
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.stages = defaultdict(lambda: defaultdict(list))
+        self.active = 0
+
+    def active_users(self) -> int:
+        with self.lock:
+            return self.active
+
+    def _record(self, op: str, seconds: float, status: int, trace):
+        with self.lock:
+            self.latencies[op].append(seconds)
+            self.statuses[op][str(status)] += 1
+            for span in trace.to_dict()["spans"]:
+                self.stages[op][span["name"]].append(span["duration_ms"] / 1000)
+
+    def _upload(self, user: int, n: int):
+        upload = SyntheticUpload(
+            f"user{user}_doc{n}.pdf", self.args.pages, seed=user * 100_003 + n
+        )
+        with tracer.request("ingest") as trace:
+            start = time.perf_counter()
+            result = IngestionService.ingest(upload, self.embedding)
+            elapsed = time.perf_counter() - start
+        self._record("ingest", elapsed, result["status_code"], trace)
+
+    def _ask(self, rng: random.Random):
+        question = rng.choice(_QUERIES)
+        with tracer.request("query") as trace:
+            start = time.perf_counter()
+            result = RAGService.get_answer(question)
+            elapsed = time.perf_counter() - start
+        self._record("query", elapsed, result["status_code"], trace)
+        if result["status_code"] == 200:
+            SessionService.add_message("user", question, "")
+            SessionService.add_message("assistant", result["answer"], "")
+            MemoryService.fold(RAGService._init_llm)
+
+    def user(self, user: int, deadline: float):
+        rng = random.Random(user)
+        time.sleep(rng.uniform(0, self.args.ramp_up))
+        with self.lock:
+            self.active += 1
+
+        try:
+            with SessionService.bind_state():
+                uploads = 0
+                while time.perf_counter() < deadline:
+                    if uploads == 0 or rng.random() < self.args.upload_ratio:
+                        self._upload(user, uploads)
+                        uploads += 1
+                    else:
+                        self._ask(rng)
+                    if self.args.think_time:
+                        time.sleep(rng.expovariate(1 / self.args.think_time))
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    def run(self):
+        args = self.args
+        original_init_llm = RAGService._init_llm
+        original_process_pdf = FileService.__dict__["_process_pdf"]
+        original_spool = UploadService.__dict__["spool"]
+        RAGService._init_llm = classmethod(lambda cls, max_tokens=None: self.llm)
+        FileService._process_pdf = _stub_process_pdf(args.extract_delay, args.sigma)
+        UploadService.spool = classmethod(_stub_spool)
+
+        sampler = ResourceSampler(args.sample_interval, self.active_users)
+        _, rss_before = _read_proc()
+        sampler.start()
+        start = time.perf_counter()
+        deadline = start + args.ramp_up + args.duration
+
+        try:
+            threads = [
+                threading.Thread(target=self.user, args=(i, deadline), name=f"user-{i}")
+                for i in range(args.users)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+            RAGService._init_llm = original_init_llm
+            FileService._process_pdf = original_process_pdf
+            UploadService.spool = original_spool
+
+        return self._report(elapsed, sampler.samples, rss_before)
+
+    def _report(self, elapsed, samples, rss_before):
+        operations = {}
+        for op, latencies in self.latencies.items():
+            stages = {
+                name: _percentiles(durations)
+                for name, durations in self.stages[op].items()
+            }
+            operations[op] = {
+                "throughput_per_sec": len(latencies) / elapsed,
+                "status_codes": dict(self.statuses[op]),
+                **_percentiles(latencies),
+                "stages": dict(
+                    sorted(stages.items(), key=lambda item: -item[1]["p95_ms"])
+                ),
+            }
+
+        total = sum(len(latencies) for latencies in self.latencies.values())
+        return {
+            "elapsed_seconds": elapsed,
+            "throughput_per_sec": total / elapsed,
+            "operations": operations,
+            "resources": {
+                "rss_before_mb": rss_before,
+                "rss_peak_mb": max((s["rss_mb"] for s in samples), default=rss_before),
+                "cpu_percent_mean": (
+                    sum(s["cpu_percent"] for s in samples) / len(samples) if samples else 0.0
+                ),
+                "samples": samples,
+            },
+        }
+
+
+# ---------- entry point ----------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="write JSON results to this path")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=30.0,
+                        help="seconds of load after ramp-up")
+    parser.add_argument("--ramp-up", type=float, default=5.0,
+                        help="users start uniformly within this many seconds")
+    parser.add_argument("--upload-ratio", type=float, default=0.1,
+                        help="share of operations that are uploads (first is always one)")
+    parser.add_argument("--think-time", type=float, default=1.0,
+                        help="mean pause between a user's operations (s)")
+    parser.add_argument("--pages", type=int, default=5, help="pages per uploaded document")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--extract-delay", type=float, default=0.05,
+                        help="median stub PDF parsing cost per page (s)")
+    parser.add_argument("--embed-delay", type=float, default=0.002,
+                        help="median stub embedding cost per text (s)")
+    parser.add_argument("--llm-delay", type=float, default=0.8,
+                        help="median stub LLM latency per call (s)")
+    parser.add_argument("--sigma", type=float, default=0.5,
+                        help="log-normal spread of all stub latencies")
+    parser.add_argument("--sample-interval", type=float, default=1.0,
+                        help="CPU / RSS sampling period (s)")
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/stat"):
+        parser.error("needs Linux /proc for CPU and RSS sampling")
+
+    report = {
+        "schema_version": SCHEMA_VERSION,
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "results": LoadTest(args).run(),
+    }
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+
+    if args.output:
+        Path(args.output).write_text(payload, encoding="utf-8")
+    print(payload)
+
+
+if __name__ == "__main__":
+    main()
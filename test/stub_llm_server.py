@@ -0,0 +1,136 @@
+"""
+Local OpenAI-compatible chat completions server with fault injection.
+
+Answers POST .../chat/completions (the path used by both the OpenAI and Groq
+SDKs) after an artificial delay, and can be told to fail a share of requests.
+Used by the gateway tests and the load-test harness.
+
+    python test/stub_llm_server.py --port 8901 --latency 0.3 --error-rate 0.1
+    OPENAI_BASE_URL=http://127.0.0.1:8901/v1 python -m streamlit run app/main.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubLLMServer:
+    """
+    `latency` is the base delay in seconds, `jitter` a uniform extra delay,
+    `error_rate` the probability of failing a request, `fail_next` a number
+    of upcoming requests that fail unconditionally and `error_status` the
+    HTTP status failed requests get.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, fail_next=0, error_status=500, reply="Stub answer."):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.fail_next = fail_next
+        self.error_status = error_status
+        self.reply = reply
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _should_fail(self):
+        with self._lock:
+            self.requests += 1
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return True
+        return random.random() < self.error_rate
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+
+                time.sleep(server.latency + random.uniform(0, server.jitter))
+
+                if not self.path.endswith("/chat/completions"):
+                    return self._send(404, {"error": {"message": "not found"}})
+                if server._should_fail():
+                    return self._send(server.error_status, {"error": {"message": "injected failure"}})
+
+                prompt = " ".join(str(m.get("content", "")) for m in body.get("messages", []))
+                prompt_tokens = len(prompt.split())
+                completion_tokens = len(server.reply.split())
+                self._send(200, {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": server.reply},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                })
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.host, args.port, args.latency, args.jitter, args.error_rate)
+    print(f"Stub LLM server listening on {server.url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
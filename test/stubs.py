@@ -0,0 +1,158 @@
+"""
+Offline stand-ins for the network/GPU backed pieces of the pipeline.
+Used by the benchmark and test scripts so they run on CPU without API keys.
+"""
+import hashlib
+import io
+import os
+import random
+import re
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+SAMPLE_PDF = Path(__file__).parent / "pdf to test" / "test1.pdf"
+
+
+def sample_delay(median: float, sigma: float = 0.0) -> float:
+    """
+    Log-normal latency with the given median (s). `sigma` is the spread of
+    log(latency); 0 gives a constant delay, ~0.5 a realistic long tail.
+    """
+    if median <= 0:
+        return 0.0
+    if sigma <= 0:
+        return median
+    return random.lognormvariate(0.0, sigma) * median
+
+
+class MockFile:
+    """Mimics the parts of Streamlit's UploadedFile that FileService uses."""
+
+    def __init__(self, file_path):
+        self.name = os.path.basename(file_path)
+        self.path = str(file_path)
+        self.size = os.path.getsize(self.path)
+        self._file_handle = None
+
+        ext = os.path.splitext(self.name)[1].lower()
+        if ext == '.pdf':
+            self.type = "application/pdf"
+        elif ext in ['.jpg', '.jpeg']:
+            self.type = "image/jpeg"
+        elif ext == '.png':
+            self.type = "image/png"
+        else:
+            self.type = "unknown"
+
+    def __str__(self):
+        return self.path
+
+    def __fspath__(self):
+        return self.path
+
+    def read(self, size=-1):
+        if self._file_handle is None:
+            self._file_handle = open(self.path, 'rb')
+        return self._file_handle.read(size)
+
+    def seek(self, pos):
+        if self._file_handle is None:
+            self._file_handle = open(self.path, 'rb')
+        return self._file_handle.seek(pos)
+
+    def close(self):
+        if self._file_handle:
+            self._file_handle.close()
+            self._file_handle = None
+
+
+class Upload(io.BytesIO):
+    """In-memory upload, like Streamlit's UploadedFile."""
+
+    def __init__(self, data: bytes, name: str = "handbook.pdf", file_type: str = "application/pdf"):
+        super().__init__(data)
+        self.name = name
+        self.type = file_type
+        self.size = len(data)
+
+
+class StubEmbeddings(Embeddings):
+    """
+    Deterministic hashing embeddings: each word is hashed into one of `dim`
+    buckets and the result is L2-normalised. Texts sharing words land close
+    together, which is enough to make retrieval behave plausibly.
+    `delay` is an artificial per-text cost in seconds (median when `sigma`
+    is set, see `sample_delay`).
+    """
+
+    def __init__(self, dim: int = 384, delay: float = 0.0, sigma: float = 0.0):
+        self.dim = dim
+        self.delay = delay
+        self.sigma = sigma
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest, "little")
+            vec[bucket % self.dim] += 1.0 if bucket & (1 << 63) else -1.0
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec /= norm
+        return vec.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.delay:
+            time.sleep(sample_delay(self.delay * len(texts), self.sigma))
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.delay:
+            time.sleep(sample_delay(self.delay, self.sigma))
+        return self._embed(text)
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model that sleeps for `delay` seconds (median when `sigma` is set)
+    and answers with a short, deterministic summary of the prompt it received.
+    """
+
+    delay: float = 0.0
+    sigma: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def _generate(
+        self,
+        messages,
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.delay:
+            time.sleep(sample_delay(self.delay, self.sigma))
+        prompt = "\n".join(str(m.content) for m in messages)
+        prompt_tokens = len(prompt.split())
+        answer = f"Stub answer based on {prompt_tokens} prompt words."
+        message = AIMessage(
+            content=answer,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": len(answer.split()),
+                "total_tokens": prompt_tokens + len(answer.split()),
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -1,4 +1,3 @@
-import os
 import sys
 from pathlib import Path
 
@@ -7,49 +6,12 @@ parent_dir = current_dir.parent
 if str(parent_dir) not in sys.path:
     sys.path.insert(0, str(parent_dir))
 
-from app.services.file_service import extract_text_from_file
-
-
-class MockFile:
-    def __init__(self, file_path):
-        self.name = os.path.basename(file_path)
-        self.path = str(file_path)
-        self._file_handle = None
-        
-        ext = os.path.splitext(self.name)[1].lower()
-        if ext == '.pdf':
-            self.type = "application/pdf"
-        elif ext in ['.jpg', '.jpeg']:
-            self.type = "image/jpeg"
-        elif ext == '.png':
-            self.type = "image/png"
-        else:
-            self.type = "unknown"
-    
-    def __str__(self):
-        return self.path
-    
-    def __fspath__(self):
-        return self.path
-    
-    def read(self, size=-1):
-        if self._file_handle is None:
-            self._file_handle = open(self.path, 'rb')
-        return self._file_handle.read(size)
-    
-    def seek(self, pos):
-        if self._file_handle is None:
-            self._file_handle = open(self.path, 'rb')
-        return self._file_handle.seek(pos)
-    
-    def close(self):
-        if self._file_handle:
-            self._file_handle.close()
-            self._file_handle = None
+from app.services.file_service import FileService
+from stubs import MockFile
 
 
 def test():
-    pdf_file = Path(__file__).parent / "image to test" / "image1.png"
+    pdf_file = Path(__file__).parent / "pdf to test" / "test1.pdf"
     
     if not pdf_file.exists():
         print(f"PDF file not found: {pdf_file}")
@@ -62,8 +24,12 @@ def test():
         mock_file = MockFile(str(pdf_file))
         
         print("Extracting text...")
-        text = extract_text_from_file(mock_file)
-        
+        result = FileService.extract(mock_file)
+        if result["status_code"] != 200:
+            print(f"Extraction failed: {result['message']}")
+            return
+        text = result["text"]
+
         print(f"\nExtraction successful!")
         print(f"Extracted {len(text)} characters")
         print(f"\nFirst 500 characters:")
@@ -0,0 +1,48 @@
+"""
+RAGService._adaptive_cut on fixed similarity scores.
+
+    python -m pytest test/test_adaptive_retrieval.py
+"""
+import pytest
+
+from app.config import AIConfig
+from app.services.rag_service import RAGService
+
+
+@pytest.fixture(autouse=True)
+def retrieval_config(monkeypatch):
+    monkeypatch.setattr(AIConfig, "RETRIEVAL_MIN_K", 3)
+    monkeypatch.setattr(AIConfig, "RETRIEVAL_MAX_K", 12)
+    monkeypatch.setattr(AIConfig, "RETRIEVAL_MIN_SCORE", 0.3)
+    monkeypatch.setattr(AIConfig, "RETRIEVAL_RELATIVE_SCORE", 0.8)
+
+
+def _cut(scores):
+    results = [(f"doc{i}", score) for i, score in enumerate(scores)]
+    return [score for _, score in RAGService._adaptive_cut(results)]
+
+
+def test_empty_results():
+    assert _cut([]) == []
+
+
+def test_min_k_is_kept_even_below_the_thresholds():
+    assert _cut([0.9, 0.2, 0.1, 0.05]) == [0.9, 0.2, 0.1]
+
+
+def test_fewer_results_than_min_k():
+    assert _cut([0.9, 0.1]) == [0.9, 0.1]
+
+
+def test_stops_at_relative_ratio_of_top_score():
+    # cutoff = max(0.3, 0.9 * 0.8) = 0.72
+    assert _cut([0.9, 0.85, 0.8, 0.75, 0.73, 0.71, 0.7]) == [0.9, 0.85, 0.8, 0.75, 0.73]
+
+
+def test_stops_at_absolute_floor_when_top_score_is_low():
+    # 0.35 * 0.8 = 0.28, so the 0.3 floor decides
+    assert _cut([0.35, 0.34, 0.33, 0.31, 0.3, 0.29, 0.29]) == [0.35, 0.34, 0.33, 0.31, 0.3]
+
+
+def test_capped_at_max_k():
+    assert _cut([0.9] * 20) == [0.9] * 12
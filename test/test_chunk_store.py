@@ -0,0 +1,84 @@
+"""
+ChunkStore cleanup: blobs are deleted once no live session's documents
+use them, after a grace period that protects ingestions in progress.
+
+    python -m pytest test/test_chunk_store.py
+"""
+import gc
+import os
+
+import pytest
+
+from app.config import AIConfig
+from app.services import ChunkStore, IngestionService, SessionService, VectorStoreService
+from app.services.session_service import HeadlessState
+from stubs import SAMPLE_PDF, StubEmbeddings, Upload
+
+
+@pytest.fixture
+def embedding(monkeypatch):
+    if not SAMPLE_PDF.exists():
+        pytest.skip(f"missing {SAMPLE_PDF.name}")
+    monkeypatch.setattr(AIConfig, "CHUNK_STORE_SWEEP_GRACE_SECONDS", 0)
+    return StubEmbeddings(dim=64)
+
+
+def _ingest(embedding):
+    result = IngestionService.ingest(Upload(SAMPLE_PDF.read_bytes()), embedding)
+    assert result["status_code"] == 200
+    return result["document"]["pages"][0]["blob_id"]
+
+
+def _blobs():
+    if not os.path.isdir(AIConfig.CHUNK_STORE_DIR):
+        return []
+    return os.listdir(AIConfig.CHUNK_STORE_DIR)
+
+
+def test_shared_blob_lives_until_the_last_session_drops_it(embedding):
+    first, second = HeadlessState(), HeadlessState()
+    with SessionService.bind_state(first):
+        blob_id = _ingest(embedding)
+    with SessionService.bind_state(second):
+        assert _ingest(embedding) == blob_id
+
+    with SessionService.bind_state(first):
+        IngestionService.remove_document(0, embedding)
+    assert os.path.exists(ChunkStore._path(blob_id))
+
+    with SessionService.bind_state(second):
+        SessionService.clear_all_documents()
+    assert not os.path.exists(ChunkStore._path(blob_id))
+
+
+def test_failed_ingestion_leaves_no_blob(embedding, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(VectorStoreService, "update_document", fail)
+    with SessionService.bind_state():
+        result = IngestionService.ingest(Upload(SAMPLE_PDF.read_bytes()), embedding)
+
+    assert result["status_code"] == 500
+    assert _blobs() == []
+
+
+def test_discarded_session_releases_its_blobs(embedding):
+    with SessionService.bind_state():
+        _ingest(embedding)
+    assert _blobs()
+
+    gc.collect()
+    with SessionService.bind_state():
+        pass  # the next session's script run sweeps
+
+    assert _blobs() == []
+
+
+def test_recent_blobs_survive_the_grace_period(embedding, monkeypatch):
+    monkeypatch.setattr(AIConfig, "CHUNK_STORE_SWEEP_GRACE_SECONDS", 3600)
+    with SessionService.bind_state():
+        blob_id = _ingest(embedding)
+        IngestionService.remove_document(0, embedding)
+
+    assert os.path.exists(ChunkStore._path(blob_id))
@@ -0,0 +1,122 @@
+"""
+Context assembly: span merging and the token budget.
+
+    python -m pytest test/test_context.py
+"""
+import random
+
+import pytest
+from langchain_core.documents import Document
+
+from app.services import context_service
+from app.services.context_service import ContextService
+from app.utils.tokenizer import count_tokens
+
+
+SOURCE = " ".join(
+    f"Điều {n}. Người lao động làm việc {n % 9 + 1} giờ mỗi ngày, nghỉ trưa {n % 4 + 1} giờ."
+    for n in range(200)
+)
+
+
+def _chunk(start: int, end: int, doc_id: int = 0, blob_id: str = "a" * 64) -> Document:
+    return Document(
+        page_content=SOURCE[start:end],
+        metadata={"doc_id": doc_id, "blob_id": blob_id, "start_index": start},
+    )
+
+
+def test_overlapping_chunks_merge_into_the_source_span():
+    docs = [_chunk(150, 400), _chunk(0, 200), _chunk(350, 500), _chunk(180, 260)]
+
+    assert ContextService._merge_spans(docs) == [SOURCE[0:500]]
+
+
+def test_adjacency_gap():
+    # The splitter strips the whitespace between chunks: a one-space gap is
+    # adjacent, a wider one is not.
+    first = SOURCE.index(" ", 100)
+    second = SOURCE.index(" ", 300)
+    docs = [_chunk(0, first), _chunk(first + 1, 300), _chunk(second + 4, 600)]
+
+    assert ContextService._merge_spans(docs) == [
+        SOURCE[0:first] + "\n" + SOURCE[first + 1:300],
+        SOURCE[second + 4:600],
+    ]
+
+
+def test_chunks_of_different_blobs_or_documents_are_not_merged():
+    docs = [
+        _chunk(0, 200),
+        _chunk(100, 300, blob_id="b" * 64),
+        _chunk(150, 350, doc_id=1),
+    ]
+
+    assert ContextService._merge_spans(docs) == [
+        SOURCE[0:200], SOURCE[100:300], SOURCE[150:350]
+    ]
+
+
+def test_merged_passage_keeps_the_best_rank():
+    docs = [_chunk(1000, 1200), _chunk(0, 200), _chunk(2000, 2200), _chunk(150, 400)]
+
+    assert ContextService._merge_spans(docs) == [
+        SOURCE[1000:1200], SOURCE[0:400], SOURCE[2000:2200]
+    ]
+
+
+def test_last_passage_is_truncated_to_fill_the_budget():
+    docs = [_chunk(0, 600), _chunk(2000, 2600)]
+    first = count_tokens(SOURCE[0:600])
+    budget = first + count_tokens("\n\n") + context_service._MIN_PARTIAL_TOKENS
+
+    context, stats = ContextService.assemble(docs, budget)
+
+    head, tail = context.split("\n\n")
+    assert head == SOURCE[0:600]
+    assert tail and SOURCE[2000:2600].startswith(tail) and tail != SOURCE[2000:2600]
+    assert stats["context_passages"] == 2
+    assert stats["context_tokens"] <= budget
+
+
+def test_short_remainder_is_not_appended():
+    docs = [_chunk(0, 600), _chunk(2000, 2600)]
+    budget = count_tokens(SOURCE[0:600]) + context_service._MIN_PARTIAL_TOKENS // 2
+
+    context, stats = ContextService.assemble(docs, budget)
+
+    assert context == SOURCE[0:600]
+    assert stats["context_passages"] == 1
+
+
+def _random_docs(rng: random.Random):
+    docs = []
+    for _ in range(rng.randrange(1, 12)):
+        start = rng.randrange(0, len(SOURCE) - 50)
+        docs.append(_chunk(
+            start, start + rng.randrange(20, 800),
+            doc_id=rng.randrange(3), blob_id=rng.choice(["a" * 64, "b" * 64]),
+        ))
+    return docs
+
+
+def test_budget_is_never_exceeded():
+    rng = random.Random(7)
+    for budget in [0, 1, 10, 63, 64, 65, 100, 250, 500, 1000, 3000]:
+        for _ in range(20):
+            context, stats = ContextService.assemble(_random_docs(rng), budget)
+            assert count_tokens(context) <= budget
+            assert stats["context_tokens"] <= budget
+
+
+def test_budget_holds_when_truncation_overshoots(monkeypatch):
+    # A tokenizer whose truncation can land mid-character, as BPE can on
+    # Vietnamese text: counts bytes, truncates characters.
+    monkeypatch.setattr(context_service, "count_tokens", lambda text: len(text.encode("utf-8")))
+    monkeypatch.setattr(context_service, "truncate_to_tokens", lambda text, n: text[:max(0, n)])
+
+    rng = random.Random(11)
+    for budget in [64, 200, 700, 1500]:
+        for _ in range(20):
+            context, _ = ContextService.assemble(_random_docs(rng), budget)
+            assert len(context.encode("utf-8")) <= budget
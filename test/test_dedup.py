@@ -0,0 +1,109 @@
+"""
+MinHash LSH near-duplicate index: matching, copy provenance, removal and
+restore.
+
+    python -m pytest test/test_dedup.py
+"""
+import copy
+import random
+
+import pytest
+
+from app.config import AIConfig
+from app.services import DedupService, SessionService
+from app.services.dedup_service import DedupIndex
+
+
+def _text(seed: int, words: int = 60) -> str:
+    rng = random.Random(seed)
+    return " ".join(f"w{rng.randrange(5000)}" for _ in range(words))
+
+
+def _metadata(doc_id: int, chunk_index: int):
+    return {"doc_id": doc_id, "chunk_index": chunk_index, "page": 1}
+
+
+def _state(index: DedupIndex):
+    return copy.deepcopy(
+        (index.signatures, index.buckets, index.duplicates, index.copies)
+    )
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(AIConfig, "DEDUP_ENABLED", True)
+    with SessionService.bind_state():
+        yield
+
+
+def _filter(chunks, doc_id: int, first_index: int = 0):
+    metadatas = [_metadata(doc_id, first_index + i) for i in range(len(chunks))]
+    return DedupService.filter(chunks, metadatas)
+
+
+def test_query_finds_near_duplicates_only():
+    index = DedupIndex(AIConfig.DEDUP_NUM_PERM, AIConfig.DEDUP_BANDS)
+    original = _text(1)
+    index.add((0, 0), DedupService._signature(original))
+
+    near = original.replace(original.split()[-1], "changed")
+    assert index.query(DedupService._signature(near), AIConfig.DEDUP_THRESHOLD) == (0, 0)
+    assert index.query(DedupService._signature(_text(2)), AIConfig.DEDUP_THRESHOLD) is None
+
+
+def test_filter_drops_copies_within_and_across_documents(session):
+    shared, own = _text(1), _text(2)
+
+    kept, _, dropped = _filter([shared, own, shared], doc_id=0)
+    assert kept == [shared, own]
+    assert dropped == [
+        {"doc_id": 0, "chunk_index": 2, "duplicate_of": {"doc_id": 0, "chunk_index": 0}}
+    ]
+
+    kept, _, dropped = _filter([_text(3), shared], doc_id=1)
+    assert kept == [_text(3)]
+    assert dropped[0]["duplicate_of"] == {"doc_id": 0, "chunk_index": 0}
+
+    index = SessionService.get_dedup_index()
+    assert index.duplicates[(0, 0)] == [(0, 2), (1, 1)]
+    assert index.copies[(1, 1)] == _metadata(1, 1)
+
+
+def test_copies_for_maps_scope_to_kept_chunks_elsewhere(session):
+    shared = _text(1)
+    _filter([shared, _text(2)], doc_id=0)
+    _filter([_text(3), shared], doc_id=1)
+    index = SessionService.get_dedup_index()
+
+    assert index.copies_for([1]) == {0: {0: _metadata(1, 1)}}
+    assert index.copies_for([0, 1]) == {}
+    assert index.copies_for([0]) == {}
+
+
+def test_removing_a_kept_chunk_reports_surviving_copies(session):
+    shared = _text(1)
+    _filter([shared, _text(2), shared], doc_id=0)
+    _filter([shared], doc_id=1)
+    index = SessionService.get_dedup_index()
+
+    removed = index.remove_document(0)
+
+    assert removed["orphans"] == [_metadata(1, 0)]
+    assert index.duplicates == {}
+    assert index.copies == {}
+    assert (0, 0) not in index.signatures
+    assert all((0, 0) not in bucket for bucket in index.buckets.values())
+
+
+def test_remove_then_restore_is_lossless(session):
+    shared = _text(1)
+    _filter([shared, _text(2), _text(3)], doc_id=0)
+    _filter([shared, _text(4)], doc_id=1)
+    index = SessionService.get_dedup_index()
+    before = _state(index)
+
+    index.restore(index.remove_chunks(0, [0, 1]))
+    assert _state(index) == before
+
+    index.restore(index.remove_document(1))
+    assert _state(index) == before
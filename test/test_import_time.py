@@ -0,0 +1,71 @@
+"""
+Import-time budget for the Streamlit entry point.
+
+Fails if a cold `import app.main` in a fresh interpreter takes longer than
+IMPORT_BUDGET_SECONDS (default 1.5s), or if it drags in a heavy backend that
+should only load on first use.
+
+    python -m pytest test/test_import_time.py
+    python test/test_import_time.py
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+parent_dir = Path(__file__).parent.parent
+
+BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.5"))
+RUNS = 3
+
+HEAVY_MODULES = [
+    "torch",
+    "transformers",
+    "sentence_transformers",
+    "langchain_huggingface",
+    "langchain_openai",
+    "langchain_groq",
+    "langchain_community",
+    "langchain_text_splitters",
+    "faiss",
+    "pdfplumber",
+    "pytesseract",
+    "paddleocr",
+]
+
+_PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(json.dumps({{"seconds": elapsed, "heavy": heavy}}))
+"""
+
+
+def _cold_import():
+    output = subprocess.check_output(
+        [sys.executable, "-c", _PROBE], cwd=parent_dir, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_import_time_budget():
+    samples = [_cold_import() for _ in range(RUNS)]
+    best = min(sample["seconds"] for sample in samples)
+
+    assert best <= BUDGET_SECONDS, (
+        f"cold `import app.main` took {best:.2f}s (budget {BUDGET_SECONDS:.2f}s)"
+    )
+
+
+def test_no_heavy_backends_at_import():
+    heavy = _cold_import()["heavy"]
+
+    assert not heavy, f"imported eagerly: {', '.join(heavy)}"
+
+
+if __name__ == "__main__":
+    for sample in [_cold_import() for _ in range(RUNS)]:
+        print(f"import app.main: {sample['seconds']:.3f}s, heavy: {sample['heavy']}")
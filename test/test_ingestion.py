@@ -0,0 +1,171 @@
+"""
+Page-level re-ingestion: re-uploading a document only touches pages whose
+content changed. Chunks shared between documents stay searchable in each.
+Runs on the sample PDF with stub embeddings.
+
+    python -m pytest test/test_ingestion.py
+"""
+import io
+
+import pytest
+
+pdfium = pytest.importorskip("pypdfium2")
+
+from app.services import (
+    ChunkStore,
+    DedupService,
+    IngestionService,
+    SessionService,
+    VectorStoreService,
+)
+from stubs import SAMPLE_PDF, StubEmbeddings, Upload
+
+
+# Text of sample page 8 (index 7), which the shared-section tests put in
+# two documents.
+SHARED_QUERY = "File Compress reduces file size and saves storage space"
+
+
+def _pdf(pages):
+    """The sample PDF with its 0-based `pages` in the given order."""
+    source = pdfium.PdfDocument(str(SAMPLE_PDF))
+    target = pdfium.PdfDocument.new()
+    target.import_pages(source, list(pages))
+    out = io.BytesIO()
+    target.save(out)
+    return out.getvalue()
+
+
+def _ingest(pages, name, embedding):
+    result = IngestionService.ingest(Upload(_pdf(pages), name), embedding)
+    assert result["status_code"] == 200
+    return result["document"]
+
+
+def _top_hit(doc_ids=None):
+    copies = DedupService.copies_for(doc_ids) if doc_ids is not None else None
+    results = SessionService.get_vector_store().search_with_similarity(
+        SHARED_QUERY, 3, doc_ids, copies
+    )
+    return ChunkStore.resolve([results[0][0]])[0]
+
+
+def _indexed_chunks(doc_id):
+    store = SessionService.get_vector_store().stores.get(doc_id)
+    return store.index.ntotal if store is not None else 0
+
+
+def _vector_count():
+    document_index = SessionService.get_vector_store()
+    return sum(store.index.ntotal for store in document_index.stores.values())
+
+
+@pytest.fixture
+def session():
+    if not SAMPLE_PDF.exists():
+        pytest.skip(f"missing {SAMPLE_PDF.name}")
+    with SessionService.bind_state():
+        yield StubEmbeddings(dim=64)
+
+
+@pytest.fixture
+def total_pages():
+    return len(pdfium.PdfDocument(str(SAMPLE_PDF)))
+
+
+def test_unchanged_upload_is_rejected(session, total_pages):
+    pdf = _pdf(range(total_pages))
+    assert IngestionService.ingest(Upload(pdf), session)["status_code"] == 200
+
+    result = IngestionService.ingest(Upload(pdf), session)
+
+    assert result["status_code"] == 409
+
+
+def test_reordered_pages_are_not_reembedded(session, total_pages):
+    IngestionService.ingest(Upload(_pdf(range(total_pages))), session)
+    vectors = _vector_count()
+
+    result = IngestionService.ingest(Upload(_pdf(reversed(range(total_pages)))), session)
+
+    assert result["status_code"] == 200
+    assert f"0 of {total_pages} page(s) re-indexed, 0 removed" in result["message"]
+    assert _vector_count() == vectors
+    pages = result["document"]["pages"]
+    assert [page["number"] for page in pages] == list(range(1, total_pages + 1))
+
+
+def test_removed_pages_delete_their_vectors(session, total_pages):
+    first = IngestionService.ingest(Upload(_pdf(range(total_pages))), session)["document"]
+    dropped = first["pages"][total_pages // 2:]
+    dropped_ids = {chunk_id for page in dropped for chunk_id in page["chunk_ids"]}
+    assert dropped_ids
+
+    result = IngestionService.ingest(Upload(_pdf(range(total_pages // 2))), session)
+
+    assert result["status_code"] == 200
+    assert f"{len(dropped)} removed" in result["message"]
+    store = SessionService.get_vector_store().stores[first["id"]]
+    assert dropped_ids.isdisjoint(store.index_to_docstore_id.values())
+    assert _vector_count() == sum(len(page["chunk_ids"]) for page in result["document"]["pages"])
+
+
+def test_failed_update_keeps_dedup_entries_of_stale_pages(session, total_pages, monkeypatch):
+    IngestionService.ingest(Upload(_pdf(range(total_pages))), session)
+    dedup_index = SessionService.get_dedup_index()
+    signatures = dict(dedup_index.signatures)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(VectorStoreService, "update_document", fail)
+    result = IngestionService.ingest(Upload(_pdf(range(total_pages // 2))), session)
+
+    assert result["status_code"] == 500
+    assert dedup_index.signatures == signatures
+
+
+def test_scoped_search_finds_chunks_kept_by_another_document(session):
+    _ingest([0, 1, 6, 7], "a.pdf", session)
+    second = _ingest([2, 3, 6, 7], "b.pdf", session)
+    assert second["duplicate_chunks"] > 0
+
+    hit = _top_hit([second["id"]])
+
+    assert hit.metadata["doc_id"] == second["id"]
+    assert hit.metadata["page"] == 4
+    assert "File Compress" in hit.page_content
+
+
+def test_removing_the_kept_document_promotes_copies(session):
+    _ingest([0, 1, 6, 7], "a.pdf", session)
+    second = _ingest([2, 3, 6, 7], "b.pdf", session)
+
+    IngestionService.remove_document(0, session)
+
+    second = SessionService.get_documents()[0]
+    all_chunks = sum(len(page["chunk_indexes"]) for page in second["pages"])
+    assert _indexed_chunks(second["id"]) == all_chunks
+    assert second["duplicate_chunks"] == 0
+    hit = _top_hit()
+    assert (hit.metadata["doc_id"], hit.metadata["page"]) == (second["id"], 4)
+
+    # Promoted chunks belong to their page: dropping it deletes them.
+    IngestionService.ingest(Upload(_pdf([2, 3]), "b.pdf"), session)
+    assert _indexed_chunks(second["id"]) == sum(
+        len(page["chunk_ids"]) for page in SessionService.get_documents()[0]["pages"]
+    )
+
+
+def test_rewriting_the_kept_pages_promotes_copies(session):
+    first = _ingest([0, 1, 6, 7], "a.pdf", session)
+    second = _ingest([2, 3, 6, 7], "b.pdf", session)
+    before, copies = _indexed_chunks(second["id"]), second["duplicate_chunks"]
+
+    result = IngestionService.ingest(Upload(_pdf([0, 1]), "a.pdf"), session)
+
+    assert result["status_code"] == 200
+    assert _indexed_chunks(second["id"]) == before + copies
+    assert second["duplicate_chunks"] == 0
+    hit = _top_hit([first["id"], second["id"]])
+    assert hit.metadata["doc_id"] == second["id"]
@@ -0,0 +1,108 @@
+"""
+LLMGateway behaviour against local stub servers (no network, no API keys).
+
+    python -m pytest test/test_llm_gateway.py
+"""
+import time
+
+import pytest
+
+from app.config import AIConfig
+from app.services.llm_gateway import LLMGateway, LLMGatewayError
+from stub_llm_server import StubLLMServer
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    openai = StubLLMServer(reply="from openai").start()
+    groq = StubLLMServer(reply="from groq").start()
+
+    monkeypatch.setattr(AIConfig, "LLM_PROVIDER", "groq")
+    monkeypatch.setattr(AIConfig, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(AIConfig, "GROQ_API_KEY", "test")
+    monkeypatch.setattr(AIConfig, "OPENAI_BASE_URL", f"{openai.url}/v1")
+    monkeypatch.setattr(AIConfig, "GROQ_BASE_URL", groq.url)
+    monkeypatch.setattr(AIConfig, "LLM_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(AIConfig, "LLM_MAX_RETRIES", 1)
+    monkeypatch.setattr(AIConfig, "LLM_FAILOVER", True)
+    monkeypatch.setattr(AIConfig, "LLM_HEDGE", False)
+    monkeypatch.setattr(AIConfig, "LLM_DEADLINE", 10.0)
+    LLMGateway.reset()
+
+    yield openai, groq
+
+    LLMGateway.reset()
+    openai.stop()
+    groq.stop()
+
+
+def test_primary_provider_answers(servers):
+    openai, groq = servers
+
+    assert LLMGateway.invoke("xin chào").content == "from groq"
+    assert openai.requests == 0
+
+
+def test_retries_transient_error(servers):
+    openai, groq = servers
+    groq.fail_next = 1
+
+    assert LLMGateway.invoke("xin chào").content == "from groq"
+    assert groq.requests == 2
+
+
+def test_retries_rate_limit(servers):
+    openai, groq = servers
+    groq.fail_next = 1
+    groq.error_status = 429
+
+    assert LLMGateway.invoke("xin chào").content == "from groq"
+    assert groq.requests == 2
+
+
+@pytest.mark.parametrize("status", [400, 401])
+def test_client_error_is_raised_at_once(servers, status):
+    openai, groq = servers
+    groq.error_rate = 1.0
+    groq.error_status = status
+
+    with pytest.raises(Exception) as raised:
+        LLMGateway.invoke("xin chào")
+
+    assert getattr(raised.value, "status_code", None) == status
+    assert groq.requests == 1
+    assert openai.requests == 0
+
+
+def test_fails_over_to_other_provider(servers):
+    openai, groq = servers
+    groq.error_rate = 1.0
+
+    assert LLMGateway.invoke("xin chào").content == "from openai"
+    assert groq.requests == AIConfig.LLM_MAX_RETRIES + 1
+
+
+def test_deadline_is_enforced(servers, monkeypatch):
+    openai, groq = servers
+    openai.latency = groq.latency = 2.0
+    monkeypatch.setattr(AIConfig, "LLM_DEADLINE", 0.5)
+
+    started = time.monotonic()
+    with pytest.raises(LLMGatewayError):
+        LLMGateway.invoke("xin chào")
+    assert time.monotonic() - started < 1.5
+
+
+def test_hedges_slow_request(servers, monkeypatch):
+    openai, groq = servers
+    monkeypatch.setattr(AIConfig, "LLM_HEDGE", True)
+    monkeypatch.setattr(AIConfig, "LLM_HEDGE_MIN_SAMPLES", 5)
+
+    for _ in range(5):
+        LLMGateway.invoke("warm up")
+
+    groq.latency = 1.5
+    started = time.monotonic()
+
+    assert LLMGateway.invoke("xin chào").content == "from openai"
+    assert time.monotonic() - started < 1.0
@@ -0,0 +1,116 @@
+"""
+Conversation memory: the history stays bounded, answering never waits on
+a summary call, and folds only summarise the turns that left the window.
+
+    python -m pytest test/test_memory.py
+"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import AIConfig
+from app.services import MemoryService, SessionService
+
+
+STANDALONE_QUESTION = "Quy định về thời gian làm việc trong công ty là gì"
+
+
+class RecordingLLM:
+    """llm_factory stand-in that records every prompt it is sent."""
+
+    def __init__(self, fail: bool = False):
+        self.prompts = []
+        self.fail = fail
+
+    def __call__(self, max_tokens=None):
+        return self
+
+    def invoke(self, prompt):
+        self.prompts.append(prompt)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return SimpleNamespace(content=f"summary {len(self.prompts)}")
+
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(AIConfig, "MEMORY_RECENT_MESSAGES", 4)
+    monkeypatch.setattr(AIConfig, "MEMORY_FOLD_BATCH", 4)
+    with SessionService.bind_state():
+        yield
+
+
+def _turn(n: int, llm: RecordingLLM):
+    """Record question/answer n and run the fold the UI triggers."""
+    SessionService.add_message("user", f"question{n}", "")
+    SessionService.add_message("assistant", f"answer{n}", "")
+    future = MemoryService.fold(llm)
+    if future is not None:
+        future.result(timeout=5)
+    return future
+
+
+def _history_messages(history: str):
+    return [line for line in history.splitlines() if not line.startswith("Tóm tắt:")]
+
+
+def test_prepare_never_calls_the_llm_for_standalone_questions(session):
+    llm = RecordingLLM()
+    for n in range(10):
+        MemoryService.prepare(STANDALONE_QUESTION, llm)
+        SessionService.add_message("user", f"question{n}", "")
+        SessionService.add_message("assistant", f"answer{n}", "")
+
+    assert llm.prompts == []
+
+
+def test_history_stays_bounded(session):
+    llm = RecordingLLM()
+    bound = AIConfig.MEMORY_RECENT_MESSAGES + AIConfig.MEMORY_FOLD_BATCH
+
+    for n in range(20):
+        _turn(n, llm)
+        history = MemoryService.prepare(STANDALONE_QUESTION, llm)["history"]
+        assert len(_history_messages(history)) <= bound
+        assert f"answer{n}" in history
+
+    assert history.startswith("Tóm tắt: summary")
+
+
+def test_folds_are_batched_and_incremental(session):
+    llm = RecordingLLM()
+
+    # 2 turns = 4 messages, all inside the recent window.
+    assert [_turn(n, llm) for n in range(2)] == [None, None]
+    # Messages leave the window two per turn; the batch of 4 fills on turn 4.
+    assert _turn(2, llm) is None
+    assert _turn(3, llm) is not None
+    assert len(llm.prompts) == 1
+    assert "question0" in llm.prompts[0] and "answer1" in llm.prompts[0]
+    assert "question2" not in llm.prompts[0]
+    assert SessionService.get_memory().summarized_until == 4
+
+    _turn(4, llm)
+    _turn(5, llm)
+
+    assert len(llm.prompts) == 2
+    second = llm.prompts[1]
+    assert "summary 1" in second
+    assert "question2" in second and "answer3" in second
+    assert "question0" not in second and "question4" not in second
+    assert SessionService.get_memory().summarized_until == 8
+
+
+def test_failed_fold_drops_turns_and_unblocks(session):
+    llm = RecordingLLM(fail=True)
+    for n in range(4):
+        _turn(n, llm)
+
+    memory = SessionService.get_memory()
+    assert len(llm.prompts) == 1
+    assert (memory.summary, memory.summarized_until, memory.folding) == ("", 4, False)
+
+    llm.fail = False
+    _turn(4, llm)
+    _turn(5, llm)
+    assert memory.summary == "summary 2"
@@ -0,0 +1,113 @@
+"""
+SessionGovernor: spilling indexes to disk and reloading them, the
+per-session cap, the idle sweep and LRU spilling under the global cap.
+Runs on the sample PDF with stub embeddings in headless sessions.
+
+    python -m pytest test/test_session_governor.py
+"""
+import gc
+import os
+
+import pytest
+
+from app.config import AIConfig
+from app.services import ChunkStore, IngestionService, SessionService
+from app.services.session_governor import SessionGovernor
+from stubs import SAMPLE_PDF, StubEmbeddings, Upload
+
+
+QUERY = "quy định về thời gian làm việc"
+_MB = 1024 * 1024
+
+
+@pytest.fixture
+def embedding():
+    if not SAMPLE_PDF.exists():
+        pytest.skip(f"missing {SAMPLE_PDF.name}")
+    # Sessions of earlier tests must not take part in sweeps.
+    gc.collect()
+    return StubEmbeddings(dim=64)
+
+
+def _session(embedding):
+    """A headless session state holding the sample PDF."""
+    with SessionService.bind_state() as state:
+        result = IngestionService.ingest(Upload(SAMPLE_PDF.read_bytes()), embedding)
+        assert result["status_code"] == 200
+    return state
+
+
+def _search():
+    results = SessionService.get_vector_store().search_with_similarity(QUERY, 5)
+    documents = ChunkStore.resolve([doc for doc, _ in results])
+    return [round(score, 5) for _, score in results], [doc.page_content for doc in documents]
+
+
+def test_spilled_index_reloads_with_the_same_results(embedding):
+    state = _session(embedding)
+    resources = state.resources
+    with SessionService.bind_state(state):
+        before = _search()
+
+    assert SessionGovernor.spill(resources)
+    spill_path = resources.spill_path
+    assert resources.vector_store is None
+    assert os.path.isdir(spill_path)
+
+    with SessionService.bind_state(state):
+        assert _search() == before
+
+    assert not resources.is_spilled
+    assert not os.path.exists(spill_path)
+
+
+def test_session_cap_refuses_growth(embedding, monkeypatch):
+    state = _session(embedding)
+    monkeypatch.setattr(AIConfig, "MAX_SESSION_MB", 1)
+
+    with SessionService.bind_state(state):
+        used = SessionService.get_memory_usage()["session_mb"] * _MB
+        SessionService.ensure_capacity(_MB - used)
+        with pytest.raises(ValueError, match="Session memory limit"):
+            SessionService.ensure_capacity(_MB - used + 1)
+
+
+def test_ingestion_over_the_session_cap_fails_cleanly(embedding, monkeypatch):
+    monkeypatch.setattr(AIConfig, "MAX_SESSION_MB", 0)
+
+    with SessionService.bind_state():
+        result = IngestionService.ingest(Upload(SAMPLE_PDF.read_bytes()), embedding)
+
+        assert result["status_code"] != 200
+        assert "Session memory limit" in result["message"]
+        assert SessionService.get_documents() == []
+
+
+def test_idle_sessions_are_spilled_by_the_next_script_run(embedding, monkeypatch):
+    monkeypatch.setattr(AIConfig, "SESSION_IDLE_SECONDS", 60)
+    idle, active = _session(embedding), _session(embedding)
+    idle.resources.last_access -= 120
+
+    with SessionService.bind_state():
+        pass  # any session's script run sweeps
+
+    assert idle.resources.is_spilled
+    assert not active.resources.is_spilled
+
+
+def test_global_cap_spills_the_least_recently_used_session(embedding, monkeypatch):
+    oldest, newer = _session(embedding), _session(embedding)
+    SessionGovernor.touch(newer.resources)
+    current = _session(embedding)
+
+    sessions = SessionGovernor._snapshot()
+    total = sum(resources.nbytes for resources in sessions)
+    # Room for everything but half of one index.
+    freed = oldest.resources.index_bytes()
+    monkeypatch.setattr(AIConfig, "MAX_TOTAL_MB", (total - freed / 2) / _MB)
+
+    SessionGovernor.sweep(current=current.resources)
+
+    assert oldest.resources.is_spilled
+    assert not newer.resources.is_spilled
+    assert not current.resources.is_spilled
@@ -0,0 +1,141 @@
+"""
+Knowledge-base snapshots: write in one session, restore into a fresh one.
+Runs on the sample PDF with stub embeddings.
+
+    python -m pytest test/test_snapshot.py
+"""
+import io
+import json
+import os
+
+import pytest
+
+from app.services import ChunkStore, IngestionService, SessionService, SnapshotService
+from app.services.snapshot_service import _PREAMBLE, _padded
+from stubs import SAMPLE_PDF, StubEmbeddings, Upload
+
+
+QUERY = "quy định về thời gian làm việc"
+
+
+def _search():
+    results = SessionService.get_vector_store().search_with_similarity(QUERY, 5)
+    documents = ChunkStore.resolve([doc for doc, _ in results])
+    return [round(score, 5) for _, score in results], [doc.page_content for doc in documents]
+
+
+@pytest.fixture
+def embedding():
+    return StubEmbeddings(dim=64)
+
+
+@pytest.fixture
+def snapshot(embedding):
+    """(snapshot bytes, documents, search results) of a one-document session."""
+    if not SAMPLE_PDF.exists():
+        pytest.skip(f"missing {SAMPLE_PDF.name}")
+
+    with SessionService.bind_state():
+        result = IngestionService.ingest(Upload(SAMPLE_PDF.read_bytes(), "handbook.pdf"), embedding)
+        assert result["status_code"] == 200
+        out = io.BytesIO()
+        SnapshotService.write(out, embedding)
+        return out.getvalue(), SessionService.get_documents(), _search()
+
+
+def test_round_trip_into_fresh_session(snapshot, embedding):
+    data, documents, results = snapshot
+
+    with SessionService.bind_state():
+        result = SnapshotService.restore(io.BytesIO(data), embedding)
+
+        assert result["status_code"] == 200
+        assert SessionService.get_documents() == documents
+        assert _search() == results
+        # Page hashes survive, so the same file is recognised as unchanged.
+        again = IngestionService.ingest(Upload(SAMPLE_PDF.read_bytes(), "handbook.pdf"), embedding)
+        assert again["status_code"] == 409
+
+
+def test_other_model_is_refused(snapshot):
+    data, _, _ = snapshot
+
+    with SessionService.bind_state():
+        result = SnapshotService.restore(io.BytesIO(data), StubEmbeddings(dim=64))
+
+        assert result["status_code"] == 409
+        assert SessionService.get_documents() == []
+
+
+def test_blob_with_wrong_hash_is_rejected(snapshot, embedding):
+    data, _, _ = snapshot
+    header, _ = SnapshotService._read_header(data)
+    original = next(iter(header["blobs"]))
+    # Same length, so the header size and segment offsets are unchanged.
+    forged = "0" * 64
+    tampered = data.replace(original.encode(), forged.encode())
+
+    with SessionService.bind_state():
+        result = SnapshotService.restore(io.BytesIO(tampered), embedding)
+
+        assert result["status_code"] == 422
+        assert not os.path.exists(ChunkStore._path(forged))
+        assert SessionService.get_documents() == []
+
+
+def _rewrite_header(data: bytes, edit) -> bytes:
+    """`data` with its header passed through `edit`; the data section is kept."""
+    header, data_start = SnapshotService._read_header(data)
+    edit(header)
+    header_bytes = json.dumps(header).encode("utf-8")
+    end = _PREAMBLE.size + len(header_bytes)
+    header_bytes += b" " * (_padded(end) - end)
+    preamble = _PREAMBLE.unpack_from(data, 0)
+    return _PREAMBLE.pack(*preamble[:2], len(header_bytes)) + header_bytes + data[data_start:]
+
+
+@pytest.mark.parametrize("blob_id", ["../../outside", "f" * 64])
+def test_chunk_pointing_outside_the_snapshot_is_rejected(snapshot, embedding, blob_id):
+    data, _, _ = snapshot
+
+    def edit(header):
+        entry = next(iter(header["indexes"].values()))
+        entry["metadatas"][0]["blob_id"] = blob_id
+
+    with SessionService.bind_state():
+        result = SnapshotService.restore(io.BytesIO(_rewrite_header(data, edit)), embedding)
+
+        assert result["status_code"] == 422
+        assert SessionService.get_documents() == []
+
+
+def test_document_ids_are_not_reused_after_restore(embedding):
+    if not SAMPLE_PDF.exists():
+        pytest.skip(f"missing {SAMPLE_PDF.name}")
+
+    with SessionService.bind_state():
+        for name in ("a.pdf", "b.pdf"):
+            assert IngestionService.ingest(Upload(SAMPLE_PDF.read_bytes(), name), embedding)["status_code"] == 200
+        IngestionService.remove_document(1, embedding)
+        out = io.BytesIO()
+        SnapshotService.write(out, embedding)
+
+    with SessionService.bind_state():
+        assert SnapshotService.restore(io.BytesIO(out.getvalue()), embedding)["status_code"] == 200
+        result = IngestionService.ingest(Upload(SAMPLE_PDF.read_bytes(), "c.pdf"), embedding)
+        assert result["document"]["id"] == 2
+
+
+def test_saved_snapshots_are_private_to_their_session(snapshot, embedding):
+    data, _, _ = snapshot
+
+    with SessionService.bind_state():
+        SnapshotService.restore(io.BytesIO(data), embedding)
+        saved = SnapshotService.save("mine", embedding)
+        assert saved["status_code"] == 200
+        assert SnapshotService.list_saved() == [saved["path"]]
+
+    with SessionService.bind_state():
+        assert SnapshotService.list_saved() == []
+        result = SnapshotService.restore(saved["path"], embedding)
+        assert result["status_code"] == 403